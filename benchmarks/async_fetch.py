@@ -0,0 +1,205 @@
+"""
+mede a api assíncrona dos modules (YouTubeModule.resolve_many) contra a de threads
+
+sobe um servidor http local que serve thumbnails com uma latência fixa e cria
+um vault com mil vídeos (por padrão) já no cache, mas sem as thumbnails. depois baixa
+todas elas duas vezes:
+    - com um pool de threads chamando get_thumbnail, como o Prefetcher faz
+    - com resolve_many rodando no AsyncRuntime, onde as thumbnails saem pelo aiohttp
+
+confere que todas as thumbnails foram salvas e compara o tempo da versão assíncrona
+com um orçamento fixo e o pico de threads do processo com um limite
+
+uso:
+    python3 -m benchmarks.async_fetch
+    python3 -m benchmarks.async_fetch --videos 2000 --latency 100
+
+sai com código 1 se a versão assíncrona passar do orçamento, usar threads demais
+ou deixar de baixar alguma thumbnail
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import argparse
+import json
+import multiprocessing
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from src.managers.models import Vault
+from src.modules.youtube.main import YouTubeModule
+from src.modules.youtube import cache
+from src.utils.aio import AsyncRuntime
+from src.utils.throttle import scheduler, HostPolicy
+
+
+BUDGET_S = 3
+
+# threads do processo durante a versão assíncrona: a principal, a do loop,
+# as do executor e alguma folga pras do próprio python
+MAX_THREADS = 16
+
+# pool da versão com threads, o mesmo tamanho padrão do Prefetcher
+THREAD_WORKERS = 8
+
+THUMBNAIL = b'\xff\xd8\xff\xe0' + b'\x00' * 4 * 1024
+
+
+class ThumbnailServer:
+    """
+    servidor local que responde qualquer GET com uma thumbnail depois de uma latência fixa
+    roda em outro processo, pra que o tempo dele não dispute o gil com o cliente medido
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.receiver, self.sender = multiprocessing.Pipe(duplex=False)
+        self.process = multiprocessing.Process(target=self._serve, daemon=True)
+        self.address = None
+
+    def _serve(self):
+        latency = self.latency
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            wbufsize = 64 * 1024
+
+            def do_GET(self):
+                time.sleep(latency)
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/jpeg')
+                self.send_header('Content-Length', str(len(THUMBNAIL)))
+                self.end_headers()
+                self.wfile.write(THUMBNAIL)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            request_queue_size = 1024
+
+        httpd = Server(('127.0.0.1', 0), Handler)
+        httpd.daemon_threads = True
+        self.sender.send(httpd.server_address)
+        httpd.serve_forever()
+
+    def __enter__(self):
+        self.process.start()
+        self.address = self.receiver.recv()
+        return self
+
+    def __exit__(self, *args):
+        self.process.terminate()
+        self.process.join()
+
+class ThreadSampler:
+    """
+    guarda o maior número de threads vivas do processo enquanto estiver ativo
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stopped.is_set():
+            # a própria thread do sampler não conta
+            self.peak = max(self.peak, threading.active_count() - 1)
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stopped.set()
+        self.thread.join()
+
+def make_vault(root: Path, videos: int, base_url: str) -> list[str]:
+    (root / '.sorted').mkdir()
+
+    ids = [f'{n:011d}' for n in range(videos)]
+    data = {
+        i: {'id': i, 'title': f'video {i}', 'thumbnail': f'{base_url}/vi/{i}/default.jpg', 'thumbnail_mq': None}
+        for i in ids
+    }
+
+    file = root / '.sorted' / 'modules' / 'youtube' / 'cache' / 'videos.json'
+    file.parent.mkdir(parents=True)
+    file.write_text(json.dumps(data))
+
+    return ids
+
+def count_thumbnails(vault: Vault, ids: list[str]) -> int:
+    return sum(cache.get_thumbnail_file(i, vault) is not None for i in ids)
+
+def clear_thumbnails(vault: Vault):
+    # todas as thumbnails do servidor têm os mesmos bytes, então também precisam sair do índice,
+    # senão a segunda rodada só reaproveitaria o arquivo da primeira
+    thumbnails = cache.get_thumbnail_store(vault)
+    with thumbnails.lock, thumbnails.connection:
+        thumbnails.connection.execute('DELETE FROM thumbnails')
+    thumbnails.memo.clear()
+    shutil.rmtree(thumbnails.directory)
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark da api assíncrona dos modules')
+    parser.add_argument('--videos', type=int, default=1000, help='quantidade de thumbnails baixadas')
+    parser.add_argument('--latency', type=float, default=50, help='latência simulada de cada resposta, em ms')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root, ThumbnailServer(args.latency / 1000) as server:
+        root = Path(root)
+        host, port = server.address
+        ids = make_vault(root, args.videos, f'http://{host}:{port}')
+
+        vault = Vault(root)
+        youtube = YouTubeModule(vault)
+
+        # o servidor local não tem os limites do youtube, senão o benchmark mediria o token bucket
+        scheduler.configure(host, HostPolicy(
+            rate=100000, burst=100000, max_concurrency=512, initial_concurrency=512
+        ))
+
+        # threads
+        start = time.perf_counter()
+        with ThreadSampler() as sampler, ThreadPoolExecutor(max_workers=THREAD_WORKERS) as executor:
+            list(executor.map(youtube.get_thumbnail, [cache.get_video_from_cache(i, vault) for i in ids]))
+        elapsed = time.perf_counter() - start
+
+        saved = count_thumbnails(vault, ids)
+        print(f'     threads ({THREAD_WORKERS}): {elapsed:.2f} s, pico de {sampler.peak} threads, {saved}/{len(ids)} thumbnails')
+
+        clear_thumbnails(vault)
+
+        # asyncio
+        runtime = AsyncRuntime()
+        urls = [f'https://www.youtube.com/watch?v={i}' for i in ids]
+
+        start = time.perf_counter()
+        with ThreadSampler() as sampler:
+            results = runtime.run(youtube.resolve_many(urls))
+        elapsed = time.perf_counter() - start
+
+        runtime.run(youtube.close_async())
+        runtime.close()
+
+        saved = count_thumbnails(vault, ids)
+        resolved = sum(1 for r in results.values() if r and r['data'])
+
+        ok = elapsed <= BUDGET_S and sampler.peak <= MAX_THREADS and saved == len(ids) and resolved == len(ids)
+        print(
+            f'{"ok" if ok else "FAIL":4} asyncio: {elapsed:.2f} s (orçamento {BUDGET_S} s), '
+            f'pico de {sampler.peak} threads (máximo {MAX_THREADS}), {saved}/{len(ids)} thumbnails'
+        )
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+mede a tabela colunar dos vídeos (VideoColumns) numa collection sintética grande
+
+uso:
+    python3 -m benchmarks.columns
+    python3 -m benchmarks.columns --entries 500000
+
+sai com código 1 se alguma operação passar do orçamento
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from src.modules.youtube.columns import VideoColumns, parse_filters
+
+
+# os filtros rodam a cada tecla digitada na busca, então precisam caber num frame
+# a ordenação acontece num clique, e pode levar um pouco mais
+FILTER_BUDGET_MS = 16
+SORT_BUDGET_MS = 50
+
+QUERIES = ['duration>20m', 'duration>20m date=2024', 'views>=1m likes>10k', 'date=2023-06']
+
+def build_videos(count: int) -> tuple[list[tuple[str, str]], dict[str, dict]]:
+    """
+    gera entries e vídeos com contagens, durações e datas aleatórias
+    alguns vídeos ficam sem dados, como acontece com vídeos que não estão no cache
+    """
+
+    rng = random.Random(0)
+
+    entries = []
+    videos = {}
+    for n in range(count):
+        video_id = f'video{n:07d}'
+        entries.append((f'entry{n:07d}', video_id))
+
+        if n % 50 == 0:
+            continue
+
+        videos[video_id] = {
+            'id': video_id,
+            'view_count': int(rng.paretovariate(1.2) * 1000),
+            'duration': rng.randint(10, 4 * 3600),
+            'upload_date': f'{rng.randint(2010, 2025)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}',
+            'like_count': int(rng.paretovariate(1.2) * 50),
+            'comment_count': rng.randint(0, 5000)
+        }
+
+    return entries, videos
+
+def measure(function, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return max(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark da tabela colunar')
+    parser.add_argument('--entries', type=int, default=100000, help='quantidade de entries')
+    parser.add_argument('--runs', type=int, default=5, help='repetições por operação, a pior é usada')
+    args = parser.parse_args()
+
+    entries, videos = build_videos(args.entries)
+
+    start = time.perf_counter()
+    table = VideoColumns.from_entries(entries, videos)
+    print(f'tabela montada em {(time.perf_counter() - start) * 1000:.1f} ms ({args.entries} entries)')
+
+    # nome -> (operação, orçamento)
+    operations = {
+        'sort views': (lambda: table.sort('view_count', descending=True), SORT_BUDGET_MS),
+        'sort date': (lambda: table.sort('upload_date'), SORT_BUDGET_MS),
+        'aggregate': (lambda: table.aggregate(), FILTER_BUDGET_MS)
+    }
+    for query in QUERIES:
+        ranges, _ = parse_filters(query)
+        operations[f'filter {query!r}'] = (lambda r=ranges: table.filter(r), FILTER_BUDGET_MS)
+        operations[f'sort + filter {query!r}'] = (lambda r=ranges: table.sort('duration', True, r), SORT_BUDGET_MS)
+
+    failed = False
+    for name, (function, budget) in operations.items():
+        worst = measure(function, args.runs)
+        status = 'ok' if worst <= budget else 'FAIL'
+        failed = failed or status == 'FAIL'
+        print(f'{status:4} {name}: {worst:.2f} ms (orçamento {budget} ms)')
+
+    # atualizações incrementais, como acontecem quando a collection ou o cache mudam
+    data = videos['video0000001']
+    start = time.perf_counter()
+    for n in range(1000):
+        table.append(f'new{n}', 'video0000001', data)
+    print(f'append: {(time.perf_counter() - start):.3f} ms por entry')
+
+    start = time.perf_counter()
+    table.remove_many([f'entry{n * 7:07d}' for n in range(1000)])
+    print(f'remove de 1000 entries: {(time.perf_counter() - start) * 1000:.2f} ms')
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+mede o custo de cada chamada ao daemon de extração contra o de fazer a busca no próprio processo
+
+cria um vault com vídeos no cache, sobe um daemon num socket temporário e mede:
+    - o custo fixo de um processo novo que busca sem o daemon: importar o yt-dlp
+      e criar o YoutubeDL, pago por toda chamada da cli num loop
+    - o tempo de uma chamada ao daemon (conectar, pedir e receber a resposta),
+      com lookup e com fetch de vídeos que já estão no cache
+
+a busca de verdade depende da rede, então as duas medições param antes dela:
+o que o daemon economiza é justamente o que vem antes
+
+uso:
+    python3 -m benchmarks.daemon
+    python3 -m benchmarks.daemon --calls 1000
+
+sai com código 1 se o p95 de uma chamada ao daemon passar do orçamento
+"""
+
+from pathlib import Path
+import argparse
+import json
+import multiprocessing
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from src.managers.models import Vault
+from src.modules.youtube.daemon import DaemonClient, ExtractionDaemon
+
+
+# p95 de uma chamada completa ao daemon, com a conexão
+BUDGET_MS = 10
+
+COLD_START = '''
+import time
+start = time.perf_counter()
+from src.modules.youtube.api import instance_ytdl, SETTINGS
+instance_ytdl(SETTINGS)
+print(time.perf_counter() - start)
+'''
+
+
+def make_vault(root: Path, videos: int) -> list[str]:
+    ids = [f'{n:011d}' for n in range(videos)]
+    data = {i: {'id': i, 'title': f'video {i}', 'thumbnail': None, 'thumbnail_mq': None} for i in ids}
+
+    file = root / '.sorted' / 'modules' / 'youtube' / 'cache' / 'videos.json'
+    file.parent.mkdir(parents=True)
+    file.write_text(json.dumps(data))
+
+    return ids
+
+def serve(path: Path):
+    # as extrações nem chegam a acontecer, então o pool não precisa subir
+    ExtractionDaemon(path, processes=0).serve_forever()
+
+def measure_cold_start(runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', COLD_START], capture_output=True, text=True, check=True).stdout
+        times.append(float(output))
+
+    return statistics.median(times)
+
+def measure_calls(path: Path, vault: Vault, ids: list[str], calls: int, op: str) -> list[float]:
+    times = []
+    for n in range(calls):
+        batch = [ids[n % len(ids)]]
+
+        # cada chamada é uma conexão nova, como a de um processo da cli
+        start = time.perf_counter()
+        client = DaemonClient(path)
+        getattr(client, op)(vault, batch)
+        client.close()
+        times.append(time.perf_counter() - start)
+
+    return times
+
+def p95(times: list[float]) -> float:
+    return sorted(times)[int(len(times) * 0.95)]
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark do daemon de extração')
+    parser.add_argument('--videos', type=int, default=5000, help='vídeos no cache do vault')
+    parser.add_argument('--calls', type=int, default=500, help='chamadas medidas de cada tipo')
+    parser.add_argument('--cold-runs', type=int, default=3, help='processos novos medidos sem o daemon')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        root = Path(root)
+        ids = make_vault(root, args.videos)
+        vault = Vault(root)
+
+        cold = measure_cold_start(args.cold_runs)
+        print(f'     sem daemon: {cold * 1000:.0f} ms pra importar o yt-dlp e criar o YoutubeDL')
+
+        path = root / 'daemon.sock'
+        process = multiprocessing.Process(target=serve, args=(path,), daemon=True)
+        process.start()
+
+        # espera o socket aparecer e a primeira chamada carregar o vault no daemon
+        client = None
+        while client is None:
+            time.sleep(0.05)
+            client = DaemonClient.connect(path)
+        client.lookup(vault, ids[:1])
+
+        ok = True
+        for op in ('lookup', 'fetch'):
+            times = measure_calls(path, vault, ids, args.calls, op)
+            passed = p95(times) * 1000 <= BUDGET_MS
+            ok = ok and passed
+
+            print(
+                f'{"ok" if passed else "FAIL":4} {op} pelo daemon: mediana {statistics.median(times) * 1000:.2f} ms, '
+                f'p95 {p95(times) * 1000:.2f} ms (orçamento {BUDGET_MS} ms), '
+                f'{cold / statistics.median(times):.0f}x menos que o processo novo'
+            )
+
+        client.stop()
+        process.join()
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
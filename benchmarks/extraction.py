@@ -0,0 +1,129 @@
+"""
+mede as extrações do Prefetcher em threads contra o ExtractionPool (processos)
+
+a extração de verdade depende da rede, então cada vídeo passa por uma extração
+sintética que só gasta cpu, como a parte do yt-dlp que processa o json e o
+javascript da página. os mesmos vídeos são buscados duas vezes:
+    - com as extrações nas threads do Prefetcher, disputando o gil
+    - com as extrações no ExtractionPool, um processo por núcleo
+
+compara a aceleração com o que os núcleos disponíveis permitem
+
+uso:
+    python3 -m benchmarks.extraction
+    python3 -m benchmarks.extraction --videos 400 --processes 4
+
+sai com código 1 se a aceleração ficar abaixo do mínimo ou algum vídeo não for salvo
+"""
+
+from pathlib import Path
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+from src.managers.models import Vault
+from src.modules.youtube.main import YouTubeModule
+from src.modules.youtube.models import Video
+from src.modules.youtube.workers import ExtractionPool
+from src.modules.youtube import prefetch
+
+
+# fração da aceleração ideal (uma vez por núcleo) que o pool precisa atingir
+# com um núcleo só o pool não tem como ganhar, então só não pode perder muito
+MIN_EFFICIENCY = 0.6
+
+# tamanho da página sintética, ~10 ms de cpu por vídeo
+PAGE_ITEMS = 2500
+
+FORMAT_PATTERN = re.compile(r'"itag": (\d+)')
+
+
+def synthetic_raw(video_id: str) -> dict:
+    """
+    monta e processa uma página falsa do tamanho de uma resposta do youtube
+    retorna dados no formato bruto do yt-dlp
+    """
+
+    page = json.dumps({
+        'formats': [{'itag': n, 'url': f'https://example.com/{video_id}/{n}', 'bitrate': n * 1000} for n in range(PAGE_ITEMS)]
+    })
+
+    formats = json.loads(page)['formats']
+    itags = FORMAT_PATTERN.findall(page)
+
+    return {
+        'id': video_id,
+        'title': f'video {video_id}',
+        'uploader': 'benchmark',
+        'duration': len(itags),
+        'view_count': sum(f['bitrate'] for f in formats),
+        'thumbnails': [{'url': f'https://i.ytimg.com/vi/{video_id}/mqdefault.jpg'}],
+        'thumbnail': f'https://i.ytimg.com/vi/{video_id}/maxresdefault.jpg'
+    }
+
+def synthetic_extract(video_id: str) -> dict:
+    # roda no worker, igual a workers.extract_normalized
+    return Video.normalize_ytdl_data(synthetic_raw(video_id))
+
+def make_vault(root: Path) -> Vault:
+    (root / '.sorted').mkdir(exist_ok=True)
+    return Vault(root)
+
+def run(vault: Vault, ids: list[str], workers: int, pool: ExtractionPool | None) -> tuple[float, int]:
+    youtube = YouTubeModule(vault)
+
+    start = time.perf_counter()
+    prefetcher = prefetch.Prefetcher(youtube, max_workers=workers, thumbnails=False, pool=pool)
+    futures = prefetcher.submit(ids)
+    prefetcher.close()
+    elapsed = time.perf_counter() - start
+
+    return elapsed, sum(f.result() for f in futures.values())
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark das extrações em processos')
+    parser.add_argument('--videos', type=int, default=200, help='quantidade de vídeos extraídos')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='processos do pool')
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    ids = [f'{n:011d}' for n in range(args.videos)]
+
+    # as threads usam a mesma extração sintética, no lugar da do yt-dlp
+    prefetch.extract_video_info = lambda url, ytdl: synthetic_raw(url.rsplit('=', 1)[-1])
+    prefetch.instance_ytdl = lambda options: None
+
+    with tempfile.TemporaryDirectory() as threads_root, tempfile.TemporaryDirectory() as pool_root:
+        workers = max(8, args.processes)
+
+        elapsed_threads, saved = run(make_vault(Path(threads_root)), ids, workers, None)
+        print(f'     threads ({workers}): {elapsed_threads:.2f} s, {saved}/{len(ids)} vídeos salvos')
+
+        # os workers sobem antes da medição, ela é do pool já aquecido
+        start = time.perf_counter()
+        pool = ExtractionPool(args.processes, function=synthetic_extract)
+        for f in [pool.submit('aquecimento') for _ in range(args.processes)]:
+            f.result()
+        startup = time.perf_counter() - start
+
+        elapsed_pool, saved_pool = run(make_vault(Path(pool_root)), ids, workers, pool)
+        pool.close()
+
+    speedup = elapsed_threads / elapsed_pool
+    minimum = MIN_EFFICIENCY * min(args.processes, cpus)
+
+    ok = speedup >= minimum and saved == saved_pool == len(ids)
+    print(
+        f'{"ok" if ok else "FAIL":4} processos ({args.processes}): {elapsed_pool:.2f} s '
+        f'(+{startup:.2f} s pra subir os workers), {saved_pool}/{len(ids)} vídeos salvos, '
+        f'aceleração {speedup:.1f}x (mínimo {minimum:.1f}x com {cpus} núcleos)'
+    )
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
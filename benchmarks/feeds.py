@@ -0,0 +1,239 @@
+"""
+mede a consulta dos feeds dos canais inscritos (YouTubeModule.poll_subscriptions)
+
+sobe um servidor http local que imita o feed atom do youtube, inscreve uma
+collection em centenas de canais e faz três passadas:
+    - a primeira baixa todos os feeds
+    - a segunda não tem nada novo, todos os feeds voltam como 304
+    - na terceira uma parte dos canais publicou um vídeo novo
+
+confere que só os vídeos ainda não vistos foram inseridos e compara o tempo
+de cada passada com um orçamento fixo
+
+uso:
+    python3 -m benchmarks.feeds
+    python3 -m benchmarks.feeds --channels 1000 --latency 50
+
+sai com código 1 se alguma passada passar do orçamento ou inserir vídeos errados
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+from urllib.request import Request, urlopen
+import argparse
+import json
+import multiprocessing
+import sys
+import tempfile
+import threading
+import time
+
+from src.managers.models import Collection, Vault
+from src.modules.youtube.main import YouTubeModule
+from src.modules.youtube.feeds import FeedWatcher
+from src.utils.throttle import scheduler, HostPolicy
+
+
+BUDGET_S = 3
+
+FEED_SIZE = 15
+
+# proporção dos canais que publicam um vídeo entre a segunda e a terceira passada
+UPDATED_RATIO = 0.1
+
+
+def build_feed(channel_id: str, video_ids: list[str]) -> bytes:
+    entries = ''.join(
+        f'<entry><id>yt:video:{v}</id><yt:videoId>{v}</yt:videoId>'
+        f'<yt:channelId>{channel_id}</yt:channelId><title>video {v}</title>'
+        f'<published>2025-01-01T00:00:00+00:00</published></entry>'
+        for v in video_ids
+    )
+
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns="http://www.w3.org/2005/Atom">'
+        f'<title>{channel_id}</title>{entries}</feed>'
+    ).encode()
+
+class FeedServer:
+    """
+    servidor local com um feed por canal, que responde 304 quando o etag enviado é o atual
+
+    roda em outro processo, pra que o tempo dele não dispute o gil com o cliente medido
+    o benchmark controla ele pelas rotas /publish e /requests
+    """
+
+    def __init__(self, channels: list[str], latency: float):
+        self.channels = channels
+        self.latency = latency
+
+        # a porta é escolhida pelo sistema no processo filho e mandada de volta pelo pipe
+        self.receiver, self.sender = multiprocessing.Pipe(duplex=False)
+        self.process = multiprocessing.Process(target=self._serve, daemon=True)
+        self.address = None
+
+    def _serve(self):
+        feeds = {c: [f'{c[-6:]}v{n:04d}' for n in range(FEED_SIZE, 0, -1)] for c in self.channels}
+        versions = {c: 0 for c in self.channels}
+        counter = {'requests': 0}
+        lock = threading.Lock()
+        latency = self.latency
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1' # mantém a conexão aberta pro pool do cliente
+
+            # cabeçalhos e corpo saem numa única escrita. em duas, o nagle e o ack atrasado
+            # seguram cada resposta por ~40 ms numa conexão reaproveitada
+            wbufsize = 64 * 1024
+
+            def send_body(self, status: int, body: bytes, headers: dict | None = None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                # um upload novo entra no topo do feed e o mais antigo sai
+                channel_id = parse_qs(urlparse(self.path).query).get('channel_id', [None])[0]
+                with lock:
+                    feeds[channel_id] = [f'{channel_id[-6:]}n{versions[channel_id]:04d}'] + feeds[channel_id][:-1]
+                    versions[channel_id] += 1
+                self.send_body(204, b'')
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == '/requests':
+                    self.send_body(200, str(counter['requests']).encode())
+                    return
+
+                channel_id = parse_qs(url.query).get('channel_id', [None])[0]
+                time.sleep(latency)
+
+                with lock:
+                    counter['requests'] += 1
+                    video_ids = feeds.get(channel_id)
+                    etag = f'"{channel_id}-{versions.get(channel_id)}"'
+
+                if video_ids is None:
+                    self.send_body(404, b'')
+                    return
+
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+
+                self.send_body(200, build_feed(channel_id, video_ids), {
+                    'Content-Type': 'application/atom+xml',
+                    'ETag': etag
+                })
+
+            def log_message(self, *args):
+                pass
+
+        httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        httpd.daemon_threads = True
+        self.sender.send(httpd.server_address)
+        httpd.serve_forever()
+
+    @property
+    def base_url(self):
+        host, port = self.address
+        return f'http://{host}:{port}'
+
+    @property
+    def feed_url(self):
+        return f'{self.base_url}/feeds/videos.xml?channel_id={{}}'
+
+    @property
+    def requests(self) -> int:
+        with urlopen(f'{self.base_url}/requests') as response:
+            return int(response.read())
+
+    def publish(self, channel_id: str):
+        urlopen(Request(f'{self.base_url}/publish?channel_id={channel_id}', method='POST')).close()
+
+    def __enter__(self):
+        self.process.start()
+        self.address = self.receiver.recv()
+        return self
+
+    def __exit__(self, *args):
+        self.process.terminate()
+        self.process.join()
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark da consulta dos feeds dos canais')
+    parser.add_argument('--channels', type=int, default=300, help='quantidade de canais inscritos')
+    parser.add_argument('--latency', type=float, default=20, help='latência simulada de cada resposta, em ms')
+    parser.add_argument('--connections', type=int, default=32, help='feeds consultados ao mesmo tempo')
+    args = parser.parse_args()
+
+    channels = [f'UC{n:022d}' for n in range(args.channels)]
+    updated = channels[:int(len(channels) * UPDATED_RATIO)]
+
+    with tempfile.TemporaryDirectory() as root, FeedServer(channels, args.latency / 1000) as server:
+        root = Path(root)
+        (root / '.sorted').mkdir()
+
+        file = root / 'inscricoes.json'
+        file.write_text(json.dumps({'id': 'feeds', 'version': '1', 'created_at': '', 'entries': {}}))
+
+        vault = Vault(root)
+        vault.references.rebuild(vault.collection_files())
+        youtube = YouTubeModule(vault)
+
+        collection = Collection.from_file(file, vault)
+        for c in channels:
+            youtube.subscribe(c, collection)
+
+        # o servidor local faz o papel do youtube, mas sem os limites de taxa dele,
+        # senão o benchmark mediria o token bucket em vez da consulta dos feeds
+        scheduler.configure('127.0.0.1', HostPolicy(
+            rate=10000, burst=10000, max_concurrency=args.connections, initial_concurrency=args.connections
+        ))
+
+        watcher = FeedWatcher(max_workers=args.connections, feed_url=server.feed_url)
+
+        passes = [
+            ('primeira passada', None, len(channels) * FEED_SIZE),
+            ('sem novidades', None, 0),
+            ('com uploads novos', updated, len(updated))
+        ]
+
+        failed = False
+        for name, publish, expected in passes:
+            for c in publish or []:
+                server.publish(c)
+
+            requests = server.requests
+            start = time.perf_counter()
+            results = youtube.poll_subscriptions(watcher)
+            elapsed = time.perf_counter() - start
+
+            added = sum(len(r['entries']) for r in results)
+            errors = sum(r['status'] == 'failed' for r in results)
+
+            ok = elapsed <= BUDGET_S and added == expected and not errors
+            failed = failed or not ok
+
+            print(
+                f'{"ok" if ok else "FAIL":4} {name}: {elapsed:.2f} s (orçamento {BUDGET_S} s), '
+                f'{server.requests - requests} requisições, {added} vídeos inseridos (esperado {expected}), '
+                f'{errors} falhas'
+            )
+
+        watcher.close()
+
+        total = Collection.from_file(file, vault).entry_count
+        print(f'{total} entries na collection')
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
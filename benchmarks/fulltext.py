@@ -0,0 +1,117 @@
+"""
+mede o índice full-text do youtube (VideoTextIndex) com um cache sintético grande
+
+o ranking é feito entre todos os vídeos que casam com a query, e o fts lê a lista
+de vídeos de cada termo inteira, então uma query com um termo que aparece em quase
+todo vídeo custa proporcional ao tamanho do vault. o orçamento de cada query é
+BUDGET_MS mais MATCH_BUDGET_MS por vídeo na lista de cada termo dela
+
+uso:
+    python3 -m benchmarks.fulltext
+    python3 -m benchmarks.fulltext --videos 500000
+
+sai com código 1 se alguma query passar do orçamento
+"""
+
+from itertools import accumulate
+from pathlib import Path
+import argparse
+import random
+import string
+import sys
+import tempfile
+import time
+
+from src.modules.youtube.fulltext import VideoTextIndex
+from src.utils.generic import tokenize_text
+
+
+BUDGET_MS = 50
+
+# custo de ler e pontuar pelo bm25 cada vídeo na lista de um termo da query
+MATCH_BUDGET_MS = 0.001
+
+QUERIES = ['python', 'tutorial python', 'sao paulo', 'mus', 'ao vivo', 'a', 'xyzxyz']
+
+def build_videos(count: int) -> dict[str, dict]:
+    """
+    gera vídeos com título, autor e descrição seguindo uma distribuição de zipf
+    """
+
+    rng = random.Random(0)
+
+    vocabulary = [
+        ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10)))
+        for _ in range(50000)
+    ]
+    vocabulary += ['São', 'Paulo', 'tutorial', 'python', 'música', 'ao', 'vivo']
+    # acumulados uma vez só, senão cada choices refaz a soma do vocabulário inteiro
+    weights = list(accumulate(1 / (n + 1) for n in range(len(vocabulary))))
+
+    videos = {}
+    for n in range(count):
+        video_id = f'video{n:07d}'
+        videos[video_id] = {
+            'id': video_id,
+            'title': ' '.join(rng.choices(vocabulary, cum_weights=weights, k=8)),
+            'uploader': f'canal {n % 2000}',
+            'description': ' '.join(rng.choices(vocabulary, cum_weights=weights, k=120))
+        }
+
+    return videos
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark do índice full-text')
+    parser.add_argument('--videos', type=int, default=200000, help='quantidade de vídeos no índice')
+    parser.add_argument('--runs', type=int, default=5, help='repetições por query, a pior é usada')
+    args = parser.parse_args()
+
+    videos = build_videos(args.videos)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = VideoTextIndex(Path(tmp) / 'search.sqlite')
+
+        start = time.perf_counter()
+        index.rebuild(videos)
+        print(f'índice montado em {time.perf_counter() - start:.2f} s ({args.videos} vídeos)')
+
+        # atualização incremental, como acontece no write_video_to_cache
+        start = time.perf_counter()
+        for v in list(videos.values())[:200]:
+            index.upsert(v)
+        print(f'upsert: {(time.perf_counter() - start) / 200 * 1000:.2f} ms por vídeo')
+
+        # a palavra mais frequente do vocabulário casa com quase todos os vídeos
+        # e é o pior caso pro ranking
+        common = videos['video0000000']['description'].split()
+        common = max(set(common), key=common.count)
+
+        failed = False
+        for query in QUERIES + [common, common[:2], f'{common} python']:
+            timings = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                results = index.search(query)
+                timings.append((time.perf_counter() - start) * 1000)
+
+            # vídeos que casam com cada termo sozinho, que são os que o fts lê
+            postings = sum(
+                index.connection.execute(
+                    'SELECT count(*) FROM videos WHERE videos MATCH ?', (index.build_match_query(t),)
+                ).fetchone()[0]
+                for t in tokenize_text(query)
+            )
+
+            worst = max(timings)
+            budget = BUDGET_MS + postings * MATCH_BUDGET_MS
+            status = 'ok' if worst <= budget else 'FAIL'
+            failed = failed or status == 'FAIL'
+            print(
+                f'{status:4} {query!r}: {worst:.2f} ms, {len(results)} resultados, '
+                f'{postings} vídeos nas listas dos termos (orçamento {budget:.0f} ms)'
+            )
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
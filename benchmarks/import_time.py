@@ -0,0 +1,84 @@
+"""
+mede o tempo de importação dos pontos de entrada headless
+
+cada alvo é importado num processo novo, várias vezes, e a mediana é comparada
+com um orçamento fixo. também confere que nenhum módulo proibido (ex: PyQt6)
+foi carregado no caminho headless
+
+uso:
+    python3 -m benchmarks.import_time
+    python3 -m benchmarks.import_time --runs 10
+
+sai com código 1 se algum alvo passar do orçamento ou importar algo proibido
+"""
+
+from pathlib import Path
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# módulo -> (orçamento em ms, módulos que não podem ser carregados)
+# as dependências pesadas são importadas sob demanda (src/utils/lazy.py),
+# então nenhuma delas pode aparecer só por importar os módulos
+HEAVY = ['PyQt6', 'yt_dlp', 'requests', 'rich', 'numerize', 'numpy']
+
+TARGETS = {
+    'src.modules.youtube.main': (60, HEAVY),
+    'src.modules.youtube.cache': (60, HEAVY),
+    'src.managers.models': (40, HEAVY),
+}
+
+# código rodado no processo filho
+# imprime o tempo da importação e os módulos proibidos que acabaram carregados
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+loaded = [m for m in {forbidden!r} if m in sys.modules]
+print(json.dumps({{'elapsed': elapsed, 'loaded': loaded}}))
+'''
+
+def measure(module: str, forbidden: list[str]) -> dict:
+    """
+    importa um módulo num interpretador novo e retorna o tempo e os módulos proibidos carregados
+    """
+
+    code = PROBE.format(module=module, forbidden=forbidden)
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark de tempo de importação headless')
+    parser.add_argument('--runs', type=int, default=5, help='quantidade de processos por alvo')
+    args = parser.parse_args()
+
+    failed = False
+
+    for module, (budget, forbidden) in TARGETS.items():
+        samples = [measure(module, forbidden) for _ in range(args.runs)]
+
+        median = statistics.median(s['elapsed'] for s in samples)
+        loaded = sorted({m for s in samples for m in s['loaded']})
+
+        status = 'ok'
+        if median > budget or loaded:
+            status = 'FAIL'
+            failed = True
+
+        extra = f' carregou {", ".join(loaded)}' if loaded else ''
+        print(f'{status:4} {module}: {median:.1f} ms (orçamento {budget} ms){extra}')
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+compara o tamanho e o tempo de leitura e escrita dos arquivos json em cada formato do json_io
+
+gera um videos.json e uma collection sintéticos, com os campos, urls e autores
+repetidos como nos de verdade, e escreve e lê cada um em texto puro, gzip e zstd.
+mede também o pico de memória de cada leitura, que nos formatos comprimidos
+precisa ficar perto do texto puro: o arquivo é descomprimido conforme o json
+é lido, sem os bytes comprimidos inteiros na memória
+
+serve pra escolher o formato de cada tipo de arquivo:
+    python3 -m src.cli compression --videos zstd --collections plain
+
+uso:
+    python3 -m benchmarks.json_compression
+    python3 -m benchmarks.json_compression --videos 50000 --entries 100000
+
+sai com código 1 se algum formato não devolver os mesmos dados
+ou passar do limite de memória na leitura
+"""
+
+from pathlib import Path
+import argparse
+import gc
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from src.utils import json_io
+
+
+# pico de memória de uma leitura comprimida em relação à do texto puro
+MAX_MEMORY_RATIO = 1.2
+
+RUNS = 3
+
+
+def build_videos(count: int) -> dict:
+    rng = random.Random(0)
+    uploaders = [f'canal {n}' for n in range(count // 20 or 1)]
+
+    videos = {}
+    for n in range(count):
+        i = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_') for _ in range(11))
+        videos[i] = {
+            'id': i,
+            'title': f'vídeo {n} {rng.choice(["tutorial", "ao vivo", "review", "música"])}',
+            'uploader': rng.choice(uploaders),
+            'view_count': rng.randint(0, 10**7),
+            'duration': rng.randint(10, 7200),
+            'upload_date': f'20{rng.randint(10, 25)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}',
+            'like_count': rng.randint(0, 10**5),
+            'comment_count': rng.randint(0, 10**4),
+            'thumbnail': f'https://i.ytimg.com/vi/{i}/maxresdefault.jpg',
+            'thumbnail_mq': f'https://i.ytimg.com/vi/{i}/mqdefault.jpg'
+        }
+
+    return videos
+
+def build_collection(count: int) -> dict:
+    rng = random.Random(1)
+
+    entries = {}
+    for n in range(count):
+        entry_id = f'{rng.getrandbits(64):016x}'
+        entries[entry_id] = {
+            'id': entry_id,
+            'created_at': f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00',
+            'module': 'youtube',
+            'type': 'video',
+            'reference': f'{rng.getrandbits(64):011x}'[:11]
+        }
+
+    return {'id': 'benchmark', 'version': '1', 'created_at': '2024-01-01T00:00:00', 'entries': entries}
+
+def measure(file: Path, data: dict, codec: str) -> dict:
+    write = read = float('inf')
+    for _ in range(RUNS):
+        file.unlink(missing_ok=True)
+        start = time.perf_counter()
+        json_io.write_json(file, data, codec)
+        write = min(write, time.perf_counter() - start)
+
+        gc.collect()
+        start = time.perf_counter()
+        loaded = json_io.read_json(file)
+        read = min(read, time.perf_counter() - start)
+
+    del loaded
+    gc.collect()
+    tracemalloc.start()
+    loaded = json_io.read_json(file)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {'size': file.stat().st_size, 'write': write, 'read': read, 'peak': peak, 'ok': loaded == data}
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark da compressão dos arquivos json')
+    parser.add_argument('--videos', type=int, default=20000, help='vídeos no videos.json')
+    parser.add_argument('--entries', type=int, default=50000, help='entries na collection')
+    args = parser.parse_args()
+
+    ok = True
+    with tempfile.TemporaryDirectory() as root:
+        for kind, data in [('videos', build_videos(args.videos)), ('collections', build_collection(args.entries))]:
+            print(kind)
+
+            results = {c: measure(Path(root) / f'{kind}.json', data, c) for c in json_io.CODECS}
+            plain = results['plain']
+
+            for codec, r in results.items():
+                passed = r['ok'] and r['peak'] <= MAX_MEMORY_RATIO * plain['peak']
+                ok = ok and passed
+
+                print(
+                    f'{"ok" if passed else "FAIL":4} {codec:5} {r["size"] / 2**20:6.2f} MB ({r["size"] / plain["size"]:4.0%}), '
+                    f'escrita {r["write"] * 1000:5.0f} ms, leitura {r["read"] * 1000:5.0f} ms '
+                    f'({r["read"] / plain["read"]:.2f}x), pico na leitura {r["peak"] / 2**20:.1f} MB'
+                )
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+mede a leitura do videos.json com as descrições dentro dos registros contra sem elas
+
+cria um vault com um videos.json no formato antigo, com a descrição em cada registro,
+e mede o tempo de leitura e a memória dos registros carregados. depois deixa o
+load_videos migrar as descrições pro store frio (cold.sqlite) e mede de novo
+
+também confere que as descrições continuam acessíveis: pelos detalhes do vídeo,
+pela busca full-text e pelo texto do filtro da gui
+
+uso:
+    python3 -m benchmarks.records
+    python3 -m benchmarks.records --videos 50000 --description 4000
+
+sai com código 1 se a leitura ou a memória não caírem o suficiente,
+ou se alguma descrição não for encontrada
+"""
+
+from pathlib import Path
+import argparse
+import gc
+import json
+import random
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from src.managers.models import Vault, Entry
+from src.modules.youtube.main import YouTubeModule
+from src.modules.youtube import cache
+from src.utils import json_io
+
+
+# fração máxima do tempo de leitura e da memória do formato antigo
+MAX_RATIO = 0.5
+
+# medições de tempo de cada formato, vale a melhor
+RUNS = 3
+
+
+def make_vault(root: Path, videos: int, description: int) -> list[str]:
+    rng = random.Random(0)
+    vocabulary = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10))) for _ in range(5000)]
+
+    ids = [f'{n:011d}' for n in range(videos)]
+    data = {}
+    for n, i in enumerate(ids):
+        text = ' '.join(rng.choices(vocabulary, k=description // 7))
+        data[i] = {
+            'id': i,
+            'title': f'video {n}',
+            'description': f'{text} marcador{n}',
+            'uploader': f'canal {n % 300}',
+            'view_count': n * 100,
+            'duration': 60 + n % 3600,
+            'upload_date': '20240101',
+            'like_count': n,
+            'comment_count': n % 50,
+            'thumbnail': f'https://i.ytimg.com/vi/{i}/maxresdefault.jpg',
+            'thumbnail_mq': f'https://i.ytimg.com/vi/{i}/mqdefault.jpg'
+        }
+
+    file = root / '.sorted' / 'modules' / 'youtube' / 'cache' / 'videos.json'
+    file.parent.mkdir(parents=True)
+    json_io.write_json(file, data)
+
+    return ids
+
+def measure(file: Path) -> tuple[float, int]:
+    """
+    returns:
+        tupla (melhor tempo de leitura em segundos, bytes dos registros carregados)
+    """
+
+    best = float('inf')
+    for _ in range(RUNS):
+        gc.collect()
+        start = time.perf_counter()
+        json_io.read_json(file)
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    data = json_io.read_json(file)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del data
+
+    return best, size
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark da separação dos campos frios')
+    parser.add_argument('--videos', type=int, default=20000, help='vídeos no cache')
+    parser.add_argument('--description', type=int, default=2000, help='tamanho aproximado de cada descrição, em caracteres')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        root = Path(root)
+        ids = make_vault(root, args.videos, args.description)
+        vault = Vault(root)
+        file = cache._get_videos_file(vault)
+
+        legacy_size = file.stat().st_size
+        legacy_time, legacy_memory = measure(file)
+        print(
+            f'     com descrições: {legacy_size / 2**20:.1f} MB no disco, '
+            f'leitura {legacy_time * 1000:.0f} ms, {legacy_memory / 2**20:.1f} MB na memória'
+        )
+
+        start = time.perf_counter()
+        cache.load_videos(vault)
+        migration = time.perf_counter() - start
+
+        hot_size = file.stat().st_size
+        hot_time, hot_memory = measure(file)
+        cold_size = (file.parent / 'cold.sqlite').stat().st_size
+
+        ok = hot_time <= MAX_RATIO * legacy_time and hot_memory <= MAX_RATIO * legacy_memory
+        print(
+            f'{"ok" if ok else "FAIL":4} sem descrições: {hot_size / 2**20:.1f} MB no disco '
+            f'(+{cold_size / 2**20:.1f} MB comprimidos no cold.sqlite), leitura {hot_time * 1000:.0f} ms '
+            f'({hot_time / legacy_time:.0%}), {hot_memory / 2**20:.1f} MB na memória ({hot_memory / legacy_memory:.0%}), '
+            f'migração única de {migration * 1000:.0f} ms'
+        )
+
+        # as descrições continuam acessíveis por quem precisa delas
+        youtube = YouTubeModule(vault)
+        sample = random.Random(1).sample(range(args.videos), 20)
+
+        found = 0
+        for n in sample:
+            i = ids[n]
+            entry = Entry(id=f'e{n}', created_at='2024-01-01', module='youtube', type='video', reference=i)
+            details = cache.get_video_details(i, vault)
+            text = youtube.get_search_text(entry)
+            results = youtube.search(f'marcador{n}', limit=1)
+
+            found += (
+                f'marcador{n}' in (details.get('description') or '')
+                and f'marcador{n}' in (text or '')
+                and bool(results) and results[0]['id'] == i
+            )
+
+        ok = ok and found == len(sample)
+        print(f'{"ok" if found == len(sample) else "FAIL":4} descrições encontradas: {found}/{len(sample)}')
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
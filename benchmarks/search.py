@@ -0,0 +1,72 @@
+"""
+mede o filtro de busca da gui (SearchIndex) numa collection sintética grande
+
+simula a digitação de algumas queries, uma letra por vez, e compara o pior
+tempo por tecla com o orçamento de um frame (16 ms)
+
+uso:
+    python3 -m benchmarks.search
+    python3 -m benchmarks.search --entries 100000
+
+sai com código 1 se alguma tecla passar do orçamento
+"""
+
+import argparse
+import random
+import string
+import sys
+import time
+
+from src.managers.search import SearchIndex
+
+
+BUDGET_MS = 16
+
+QUERIES = ['sao paulo', 'tutorial de python', 'a', 'musica ao vivo']
+
+def build_documents(entries: int) -> dict[str, str]:
+    """
+    gera documentos parecidos com título + autor + descrição de vídeos
+    as palavras seguem uma distribuição de zipf, como num texto real
+    """
+
+    rng = random.Random(0)
+
+    vocabulary = [
+        ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10)))
+        for _ in range(30000)
+    ]
+    vocabulary += ['São', 'Paulo', 'tutorial', 'python', 'música', 'ao', 'vivo']
+    weights = [1 / (n + 1) for n in range(len(vocabulary))]
+
+    return {
+        f'entry{n:07d}': ' '.join(rng.choices(vocabulary, weights, k=170))
+        for n in range(entries)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark do filtro de busca')
+    parser.add_argument('--entries', type=int, default=50000, help='quantidade de entries')
+    args = parser.parse_args()
+
+    documents = build_documents(args.entries)
+
+    start = time.perf_counter()
+    index = SearchIndex.from_documents(documents)
+    print(f'índice montado em {time.perf_counter() - start:.2f} s ({args.entries} entries)')
+
+    worst = 0.0
+    for query in QUERIES:
+        # cada prefixo da query é uma tecla digitada
+        for n in range(1, len(query) + 1):
+            start = time.perf_counter()
+            index.search(query[:n])
+            worst = max(worst, (time.perf_counter() - start) * 1000)
+
+    status = 'ok' if worst <= BUDGET_MS else 'FAIL'
+    print(f'{status:4} pior tecla: {worst:.2f} ms (orçamento {BUDGET_MS} ms)')
+
+    sys.exit(0 if status == 'ok' else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+"""
+benchmark reproduzível de inicialização da gui
+
+monta um vault temporário com todos os vídeos já no cache e mede:
+- o custo de importação de src.gui.main, via python -X importtime
+- o tempo de parede desde o spawn do processo até a primeira pintura da janela,
+  tanto a frio (sem snapshot) quanto a quente (com o snapshot salvo ao fechar)
+- quais dependências pesadas já estavam carregadas na primeira pintura
+
+com tudo no cache, yt-dlp e requests não deveriam aparecer nessa lista
+
+uso:
+    python3 -m benchmarks.startup
+    python3 -m benchmarks.startup --entries 500 --save startup.json
+    python3 -m benchmarks.startup --compare startup.json
+
+com --compare, sai com código 1 se alguma métrica piorar além da tolerância
+"""
+
+from pathlib import Path
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY = ['yt_dlp', 'requests', 'rich', 'numerize']
+
+# código rodado no processo filho
+# abre a janela, espera o primeiro ciclo do event loop e imprime quando isso aconteceu
+PROBE = '''
+import json, sys, time
+from pathlib import Path
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QTimer
+
+from src.gui.main import MainWindow
+from src.managers.cache import GlobalCache
+from src.managers.snapshot import read_snapshot
+
+app = QApplication([])
+
+root = Path({root!r})
+collection = Path({collection!r})
+
+snapshot = read_snapshot(GlobalCache().snapshot_file) if {warm!r} else None
+window = MainWindow(collection, root, snapshot)
+window.show()
+
+def painted():
+    result = {{
+        'painted_at': time.time(),
+        'loaded': [m for m in {heavy!r} if m in sys.modules]
+    }}
+
+    # fechar salva o snapshot usado pela rodada a quente
+    window.close()
+    print(json.dumps(result))
+    app.quit()
+
+QTimer.singleShot(0, painted)
+app.exec()
+'''
+
+def build_vault(directory: Path, entries: int) -> tuple[Path, Path]:
+    """
+    cria um vault com uma collection e todos os vídeos e thumbnails já no cache
+
+    returns:
+        tupla (root do vault, arquivo da collection)
+    """
+
+    from PyQt6.QtCore import QBuffer, QByteArray, QIODevice
+    from PyQt6.QtGui import QColor, QImage
+
+    root = directory / 'vault'
+    cache = root / '.sorted' / 'modules' / 'youtube' / 'cache'
+    thumbnails = cache / 'thumbnails'
+    thumbnails.mkdir(parents=True)
+
+    # uma thumbnail real, pra que a decodificação conte no tempo de pintura
+    image = QImage(320, 180, QImage.Format.Format_RGB32)
+    image.fill(QColor('steelblue'))
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buffer, 'JPG')
+    jpg = bytes(data)
+
+    videos = {}
+    collection_entries = {}
+
+    for n in range(entries):
+        video_id = f'video{n:07d}'
+        videos[video_id] = {
+            'id': video_id,
+            'title': f'vídeo de teste {n}',
+            'description': 'descrição ' * 50,
+            'uploader': f'canal {n % 40}',
+            'view_count': n * 1000,
+            'duration': 60 + n,
+            'upload_date': '20240101',
+            'like_count': n,
+            'comment_count': n,
+            'thumbnail': None,
+            'thumbnail_mq': None
+        }
+        (thumbnails / f'{video_id}.jpg').write_bytes(jpg)
+
+        entry_id = f'entry{n:07d}'
+        collection_entries[entry_id] = {
+            'id': entry_id,
+            'created_at': '2024-01-01T00:00:00',
+            'module': 'youtube',
+            'type': 'video',
+            'reference': video_id
+        }
+
+    (cache / 'videos.json').write_text(json.dumps(videos), encoding='utf-8')
+
+    # as thumbnails e as descrições são escritas no layout antigo e migradas aqui, pra que
+    # as migrações (que só acontecem uma vez por vault) não entrem no tempo medido
+    from src.managers.models import Vault
+    from src.modules.youtube import cache as youtube_cache
+
+    vault = Vault(root)
+    youtube_cache.get_thumbnail_store(vault)
+    youtube_cache.load_videos(vault)
+
+    collection = root / 'benchmark.json'
+    collection.write_text(json.dumps({
+        'id': 'benchmark',
+        'version': '1',
+        'created_at': '2024-01-01T00:00:00',
+        'entries': collection_entries
+    }), encoding='utf-8')
+
+    return root, collection
+
+def measure_importtime(env: dict) -> dict:
+    """
+    roda python -X importtime e resume a saída
+
+    returns:
+        total em ms e os módulos com maior tempo próprio
+    """
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import src.gui.main'],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+
+    # formato: 'import time: self [us] | cumulative | imported package'
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        self_us, cumulative_us, name = line.removeprefix('import time:').split('|')
+
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+
+    total = sum(m[1] for m in modules) / 1000
+
+    # ordenado pelo tempo próprio, o cumulativo repetiria os pais de cada submódulo
+    top = sorted(modules, key=lambda m: m[1], reverse=True)[:10]
+
+    return {
+        'import_ms': total,
+        'top': [{'module': m[0], 'self_ms': m[1] / 1000} for m in top]
+    }
+
+def measure_first_paint(root: Path, collection: Path, env: dict, warm: bool) -> dict:
+    code = PROBE.format(root=str(root), collection=str(collection), warm=warm, heavy=HEAVY)
+
+    start = time.time()
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+
+    return {
+        'first_paint_ms': (data['painted_at'] - start) * 1000,
+        'loaded': data['loaded']
+    }
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """
+    compara as métricas com um resultado salvo antes
+
+    returns:
+        verdadeiro se nenhuma métrica piorou além da tolerância
+    """
+
+    ok = True
+
+    for key in ['import_ms', 'cold_first_paint_ms', 'warm_first_paint_ms']:
+        old = baseline.get(key)
+        new = results.get(key)
+        if old is None or new is None:
+            continue
+
+        limit = old * (1 + tolerance)
+        status = 'ok'
+        if new > limit:
+            status = 'FAIL'
+            ok = False
+
+        print(f'{status:4} {key}: {new:.1f} ms (antes {old:.1f} ms, limite {limit:.1f} ms)')
+
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark de inicialização da gui')
+    parser.add_argument('--entries', type=int, default=200, help='quantidade de entries no vault de teste')
+    parser.add_argument('--runs', type=int, default=3, help='rodadas por métrica, a mediana é usada')
+    parser.add_argument('--save', type=Path, help='salva o resultado num json')
+    parser.add_argument('--compare', type=Path, help='compara com um resultado salvo')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='piora relativa aceita no --compare')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        # o home temporário isola o cache global (~/.cache/sorted) do benchmark
+        env = dict(os.environ)
+        env['HOME'] = str(tmp / 'home')
+        env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+        root, collection = build_vault(tmp, args.entries)
+
+        imports = [measure_importtime(env) for _ in range(args.runs)]
+        cold = [measure_first_paint(root, collection, env, warm=False) for _ in range(args.runs)]
+        warm = [measure_first_paint(root, collection, env, warm=True) for _ in range(args.runs)]
+
+    results = {
+        'entries': args.entries,
+        'import_ms': statistics.median(i['import_ms'] for i in imports),
+        'cold_first_paint_ms': statistics.median(c['first_paint_ms'] for c in cold),
+        'warm_first_paint_ms': statistics.median(w['first_paint_ms'] for w in warm),
+        'loaded_at_first_paint': sorted({m for c in cold for m in c['loaded']}),
+        'top_imports': imports[0]['top']
+    }
+
+    print(f'entries: {results["entries"]}')
+    print(f'importação de src.gui.main: {results["import_ms"]:.1f} ms')
+    print(f'primeira pintura a frio: {results["cold_first_paint_ms"]:.1f} ms')
+    print(f'primeira pintura a quente: {results["warm_first_paint_ms"]:.1f} ms')
+    print(f'carregados na primeira pintura: {", ".join(results["loaded_at_first_paint"]) or "nenhum"}')
+    print('maiores importações:')
+    for t in results['top_imports']:
+        print(f'    {t["self_ms"]:8.1f} ms  {t["module"]}')
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=4), encoding='utf-8')
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding='utf-8'))
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+mede o escalonador de requisições de saída (src/utils/throttle.py) contra um host simulado
+
+o host aceita poucas requisições simultâneas e uma taxa máxima por segundo,
+e responde 429 pro que passar disso, como o youtube faz. várias threads disparam
+requisições o mais rápido que conseguem, primeiro sem o escalonador e depois com ele
+
+compara a vazão com a capacidade do host e a proporção de 429 com um limite fixo
+
+uso:
+    python3 -m benchmarks.throttle
+    python3 -m benchmarks.throttle --requests 2000 --threads 64
+
+sai com código 1 se o escalonador passar do limite de 429 ou ficar abaixo da vazão mínima
+"""
+
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.utils.throttle import HostLimiter, HostPolicy
+
+
+# capacidade do host simulado
+CAPACITY = 6 # requisições simultâneas
+RATE_LIMIT = 150 # requisições por segundo
+SERVICE_TIME = 0.02 # segundos por requisição, cresce com a carga
+
+MAX_THROTTLED_RATIO = 0.05
+MIN_THROUGHPUT_RATIO = 0.6
+
+
+class SimulatedHost:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.window: list[float] = [] # horários das requisições aceitas no último segundo
+
+    def request(self) -> int:
+        now = time.monotonic()
+
+        with self.lock:
+            self.window = [t for t in self.window if now - t < 1]
+            if self.in_flight >= CAPACITY or len(self.window) >= RATE_LIMIT:
+                rejected = True
+            else:
+                rejected = False
+                self.in_flight += 1
+                self.window.append(now)
+                load = self.in_flight
+
+        if rejected:
+            time.sleep(0.002)
+            return 429
+
+        time.sleep(SERVICE_TIME * (1 + 0.1 * load))
+
+        with self.lock:
+            self.in_flight -= 1
+
+        return 200
+
+def run(requests: int, threads: int, limiter: HostLimiter | None) -> tuple[float, int, int]:
+    host = SimulatedHost()
+    counter = {'ok': 0, 'throttled': 0}
+    remaining = [requests]
+    lock = threading.Lock()
+
+    def worker():
+        # cada thread repete até conseguir sua parte das respostas 200, como um cliente que tenta de novo
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+
+            while True:
+                if limiter is None:
+                    status = host.request()
+                else:
+                    with limiter.slot() as slot:
+                        status = host.request()
+                        if status == 429:
+                            slot.throttled()
+
+                with lock:
+                    counter['ok' if status == 200 else 'throttled'] += 1
+                if status == 200:
+                    break
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for _ in range(threads):
+            executor.submit(worker)
+    elapsed = time.perf_counter() - start
+
+    return elapsed, counter['ok'], counter['throttled']
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark do escalonador de requisições de saída')
+    parser.add_argument('--requests', type=int, default=1000, help='respostas 200 necessárias')
+    parser.add_argument('--threads', type=int, default=32, help='threads disparando requisições')
+    args = parser.parse_args()
+
+    # a capacidade real do host é a menor entre a concorrência e a taxa
+    ideal = min(CAPACITY / SERVICE_TIME, RATE_LIMIT)
+
+    # o circuito não abre aqui: cada 429 seguido de uma resposta boa zera as falhas,
+    # e o que interessa medir é o ajuste da concorrência
+    policy = HostPolicy(rate=RATE_LIMIT * 2, burst=RATE_LIMIT, max_concurrency=args.threads, initial_concurrency=4, failure_threshold=10**9)
+
+    failed = False
+    for name, limiter in [('sem escalonador', None), ('com escalonador', HostLimiter('simulado', policy))]:
+        elapsed, ok, throttled = run(args.requests, args.threads, limiter)
+        throughput = ok / elapsed
+        ratio = throttled / (ok + throttled)
+
+        if limiter is None:
+            print(f'     {name}: {throughput:.0f} req/s, {ratio:.1%} de 429')
+            continue
+
+        good = ratio <= MAX_THROTTLED_RATIO and throughput >= ideal * MIN_THROUGHPUT_RATIO
+        failed = not good
+        print(
+            f'{"ok" if good else "FAIL":4} {name}: {throughput:.0f} req/s '
+            f'(mínimo {ideal * MIN_THROUGHPUT_RATIO:.0f}, capacidade {ideal:.0f}), '
+            f'{ratio:.1%} de 429 (máximo {MAX_THROTTLED_RATIO:.0%}), limite final {limiter.limit:.1f}'
+        )
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,819 @@
+"""
+interface de linha de comando do sorted, sem depender do qt
+
+a entrada é lida do stdin como um fluxo, uma linha por item, e a saída é escrita
+em ndjson (um objeto json por linha) conforme cada lote termina. isso deixa os
+comandos serem encadeados com pipes sem carregar tudo na memória, ex:
+
+    cat urls.txt | python3 -m src.cli add vault/videos.json
+    python3 -m src.cli list vault/videos.json --where 'duration>20m' | python3 -m src.cli move vault/videos.json vault/longos.json
+
+cada linha da entrada pode ser um valor puro (url, id) ou um objeto json,
+como os que o próprio list escreve
+"""
+
+from concurrent.futures import as_completed
+from dataclasses import asdict
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator
+import argparse
+import json
+import sys
+
+from .utils.generic import generate_random_id, get_iso_datetime
+from .managers.models import Collection, Vault, Entry, ModuleRegistry
+from .managers.jobs import Job, JobRunner
+from .modules.youtube.main import YouTubeModule
+from .modules.youtube.columns import FIELDS, FIELD_ALIASES, parse_filters
+from .modules.youtube.prefetch import Prefetcher
+from .modules.youtube.feeds import FeedWatcher
+from . import logger
+
+
+# quantidade de itens escritos na collection de uma vez
+# cada lote é uma escrita do arquivo inteiro e uma transação em cada índice do vault,
+# então lotes pequenos demais fazem uma importação grande reescrever o arquivo muitas vezes
+BATCH_SIZE = 20000
+
+
+def emit(data: dict):
+    """
+    escreve um objeto como uma linha de ndjson no stdout
+    """
+
+    sys.stdout.write(json.dumps(data, ensure_ascii=False) + '\n')
+
+def read_items(values: list[str]) -> Iterator[str | dict]:
+    """
+    retorna os itens passados como argumento ou, se não houver nenhum, os lidos do stdin
+
+    as linhas do stdin são lidas uma de cada vez, e as que começam com '{'
+    são interpretadas como json
+    """
+
+    if values:
+        yield from values
+        return
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        if line.startswith('{'):
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logger.error(f'linha json inválida: {line}')
+            continue
+
+        yield line
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+class VaultNotFound(Exception):
+    """
+    levantada quando o comando não recebeu --vault e nenhum .sorted existe acima do caminho dele
+    """
+
+
+def find_vault_root(path: Path) -> Path | None:
+    """
+    procura o vault de uma collection (ou diretório) subindo pelos diretórios até achar um .sorted
+    retorna None se nenhum for encontrado
+    """
+
+    path = path.resolve()
+    for parent in [path, *path.parents]:
+        if (parent / '.sorted').is_dir():
+            return parent
+
+def open_vault(args) -> tuple[Vault, ModuleRegistry]:
+    # comandos que valem pro vault inteiro não recebem uma collection, então partem do diretório atual
+    if args.vault:
+        root = Path(args.vault)
+    else:
+        path = Path(getattr(args, 'collection', None) or Path.cwd())
+        root = find_vault_root(path)
+
+        # um .sorted novo no meio de outro diretório seria um vault vazio, sem as collections de verdade.
+        # um vault só é criado quando pedido com --vault
+        if root is None:
+            raise VaultNotFound(f'nenhum vault (.sorted) encontrado acima de {path}, use --vault pra indicar ou criar um')
+
+    vault = Vault(root)
+    registry = ModuleRegistry()
+
+    youtube = YouTubeModule(vault=vault)
+    registry.register(youtube)
+
+    # com um daemon rodando, as buscas são feitas por ele, que já tem o yt-dlp carregado
+    if not args.no_daemon:
+        from .modules.youtube.daemon import DaemonClient
+        youtube.daemon = DaemonClient.connect()
+
+    # as extrações dos prefetchers passam a rodar em processos, um núcleo por processo
+    if args.processes and youtube.daemon is None:
+        from .modules.youtube.workers import ExtractionPool
+        youtube.extraction_pool = ExtractionPool(args.processes)
+
+    # um vault que nunca foi indexado precisa do índice de referências pra detectar duplicatas
+    if vault.references.is_empty():
+        vault.references.rebuild(vault.collection_files())
+
+    return vault, registry
+
+def open_collection(file: str, vault: Vault) -> Collection | None:
+    file = Path(file)
+    if not file.is_file():
+        logger.error(f'collection {file} não encontrada')
+        return
+
+    return Collection.from_file(file, vault)
+
+def get_entry_id(item: str | dict) -> str | None:
+    # aceita tanto o id puro quanto as linhas escritas pelo list
+    if isinstance(item, dict):
+        return item.get('entry_id') or item.get('id')
+
+    return item
+
+def command_list(args) -> int:
+    vault, registry = open_vault(args)
+    collection = open_collection(args.collection, vault)
+    if collection is None:
+        return 1
+
+    order = list(collection.entries)
+
+    if args.sort or args.where:
+        try:
+            ranges, _ = parse_filters(args.where or '')
+        except ValueError as err:
+            logger.error(str(err))
+            return 1
+
+        columns = registry.get('youtube').build_columns(list(collection.entries.values()))
+
+        if args.sort:
+            field = FIELD_ALIASES.get(args.sort, args.sort)
+            if field not in FIELDS:
+                logger.error(f'campo de ordenação desconhecido: {args.sort}')
+                return 1
+
+            selected = columns.sort(field, args.desc, ranges)
+        else:
+            selected = columns.filter(ranges)
+
+        # sem filtro, as entries que a tabela não conhece (outros modules) ficam no final
+        if not ranges:
+            known = set(selected)
+            selected += [i for i in order if i not in known]
+
+        order = selected
+
+    fields = args.fields.split(',') if args.fields else None
+
+    for i in islice(order, args.limit):
+        entry = collection.entries[i]
+        module = registry.get_for_entry(entry)
+
+        data = {
+            'entry_id': entry.id,
+            'created_at': entry.created_at,
+            'module': entry.module,
+            'type': entry.type,
+            'reference': entry.reference
+        }
+
+        extra = module.get_entry_data(entry) if module else None
+        for key, value in (extra or {}).items():
+            data.setdefault(key, value)
+
+        if fields:
+            data = {k: data.get(k) for k in fields}
+
+        emit(data)
+
+    return 0
+
+def command_add(args) -> int:
+    vault, registry = open_vault(args)
+    collection = open_collection(args.collection, vault)
+    if collection is None:
+        return 1
+
+    failed = False
+    for batch in batched(read_items(args.items), args.batch_size):
+        entries = []
+        results = []
+        pending = set() # referências desse lote que ainda não estão na collection
+
+        for item in batch:
+            if isinstance(item, dict):
+                value = item.get('url') or item.get('reference')
+            else:
+                value = item
+
+            resolved = None
+            for m in registry.modules:
+                received = m.receive_url(value) if value else None
+                if received is not None:
+                    resolved = (m.id, *received)
+                    break
+
+            if resolved is None:
+                results.append({'input': value, 'status': 'invalid'})
+                continue
+
+            module, type, reference = resolved
+            if (module, type, reference) in pending or collection.contains_reference(module, type, reference):
+                results.append({'input': value, 'reference': reference, 'status': 'duplicate'})
+                continue
+
+            entry = Entry(
+                id=generate_random_id(),
+                created_at=get_iso_datetime(),
+                module=module,
+                type=type,
+                reference=reference
+            )
+            entries.append(entry)
+            pending.add((module, type, reference))
+            results.append({'input': value, 'reference': reference, 'entry_id': entry.id, 'status': 'added'})
+
+        # o status do lote só é escrito depois da escrita na collection,
+        # e as entries de um lote que não foi salvo saem como 'failed'
+        saved = not entries or collection.write_entries(entries)
+        failed = failed or not saved
+
+        for r in results:
+            if not saved and r['status'] == 'added':
+                r['status'] = 'failed'
+            emit(r)
+
+    return 1 if failed else 0
+
+def command_remove(args) -> int:
+    vault, _ = open_vault(args)
+    collection = open_collection(args.collection, vault)
+    if collection is None:
+        return 1
+
+    failed = False
+    for batch in batched(read_items(args.items), args.batch_size):
+        ids = [get_entry_id(i) for i in batch]
+        found = [i for i in ids if i in collection.entries]
+
+        saved = not found or collection.erase_entries(found)
+        failed = failed or not saved
+
+        for i in ids:
+            if i not in found:
+                emit({'entry_id': i, 'status': 'missing'})
+            else:
+                emit({'entry_id': i, 'status': 'removed' if saved else 'failed'})
+
+    return 1 if failed else 0
+
+def transfer_entries(args, erase: bool) -> int:
+    # move e copy só diferem em apagar ou não as entries da collection de origem
+    vault, _ = open_vault(args)
+
+    source = open_collection(args.collection, vault)
+    destination = open_collection(args.destination, vault)
+    if source is None or destination is None:
+        return 1
+
+    failed = False
+    for batch in batched(read_items(args.items), args.batch_size):
+        entries = []
+        results = []
+        pending = set()
+
+        for i in map(get_entry_id, batch):
+            entry = source.entries.get(i)
+            if entry is None:
+                results.append({'entry_id': i, 'status': 'missing'})
+                continue
+
+            key = (entry.module, entry.type, entry.reference)
+            if key in pending or destination.contains_reference(*key):
+                results.append({'entry_id': i, 'reference': entry.reference, 'status': 'duplicate'})
+                continue
+
+            entries.append(entry)
+            pending.add(key)
+            results.append({'entry_id': i, 'reference': entry.reference, 'status': None})
+
+        # a origem só perde as entries depois que o destino foi salvo com elas.
+        # se o destino falha nada muda, e se só a origem falha as entries ficam nas duas
+        status = 'moved' if erase else 'copied'
+        if entries and not destination.write_entries(entries):
+            status = 'failed'
+        elif entries and erase and not source.erase_entries([e.id for e in entries]):
+            status = 'copied'
+            failed = True
+        failed = failed or status == 'failed'
+
+        for r in results:
+            if r['status'] is None:
+                r['status'] = status
+            emit(r)
+
+    return 1 if failed else 0
+
+def command_move(args) -> int:
+    return transfer_entries(args, erase=True)
+
+def command_copy(args) -> int:
+    return transfer_entries(args, erase=False)
+
+def prefetch_videos(prefetcher: Prefetcher, references: dict[str, list[str]]) -> bool:
+    """
+    busca os vídeos em paralelo e escreve cada resultado assim que ele fica pronto
+
+    args:
+        references:
+            id do vídeo -> ids das entries que apontam pra ele
+
+    returns:
+        True se algum vídeo falhou
+    """
+
+    futures = prefetcher.submit(list(references))
+
+    for reference, entry_ids in references.items():
+        if reference not in futures:
+            for i in entry_ids:
+                emit({'entry_id': i, 'reference': reference, 'status': 'cached'})
+
+    failed = False
+    by_future = {f: r for r, f in futures.items()}
+    for future in as_completed(by_future):
+        reference = by_future[future]
+        ok = future.result()
+        failed = failed or not ok
+
+        for i in references[reference]:
+            emit({'entry_id': i, 'reference': reference, 'status': 'fetched' if ok else 'failed'})
+
+        # um download pode demorar, então cada resultado sai assim que fica pronto
+        sys.stdout.flush()
+
+    return failed
+
+def command_prefetch(args) -> int:
+    vault, registry = open_vault(args)
+    collection = open_collection(args.collection, vault)
+    if collection is None:
+        return 1
+
+    if args.all:
+        ids = list(collection.entries)
+    else:
+        ids = map(get_entry_id, read_items(args.items))
+
+    youtube = registry.get('youtube')
+    prefetcher = None if args.queue else Prefetcher(youtube, max_workers=args.workers)
+
+    failed = False
+    for batch in batched(ids, args.batch_size):
+        # os vídeos do youtube são buscados em paralelo, os outros modules um de cada vez
+        videos = {}
+
+        for i in batch:
+            entry = collection.entries.get(i)
+            module = registry.get_for_entry(entry) if entry else None
+            if module is None:
+                emit({'entry_id': i, 'status': 'missing'})
+                continue
+
+            if module is youtube:
+                videos.setdefault(entry.reference, []).append(i)
+                continue
+
+            if module.get_entry_data(entry):
+                emit({'entry_id': i, 'reference': entry.reference, 'status': 'cached'})
+                continue
+
+            ok = module.prefetch_entry(entry)
+            failed = failed or not ok
+            emit({'entry_id': i, 'reference': entry.reference, 'status': 'fetched' if ok else 'failed'})
+
+        if prefetcher is None:
+            queued = set(youtube.enqueue_videos(list(videos)))
+            for reference, entry_ids in videos.items():
+                for i in entry_ids:
+                    emit({'entry_id': i, 'reference': reference, 'status': 'queued' if reference in queued else 'cached'})
+            continue
+
+        failed = prefetch_videos(prefetcher, videos) or failed
+
+    if prefetcher is not None:
+        prefetcher.close()
+    return 1 if failed else 0
+
+def command_import(args) -> int:
+    vault, registry = open_vault(args)
+    collection = open_collection(args.collection, vault)
+    if collection is None:
+        return 1
+
+    youtube = registry.get('youtube')
+
+    result = youtube.import_playlist(args.url, collection)
+    if result is None:
+        return 1
+
+    # as entries já estão salvas, o resumo sai antes dos metadados começarem a ser buscados
+    emit({
+        'playlist_id': result['playlist_id'],
+        'title': result['title'],
+        'count': len(result['ids']),
+        'added': len(result['entries']),
+        'duplicates': result['duplicates']
+    })
+    sys.stdout.flush()
+
+    if args.no_prefetch:
+        return 0
+
+    return prefetch_new_entries(youtube, result['entries'], args)
+
+def prefetch_new_entries(youtube: YouTubeModule, entries: list[Entry], args) -> int:
+    # busca os metadados das entries que acabaram de ser inseridas por uma playlist
+    references = {}
+    for e in entries:
+        references.setdefault(e.reference, []).append(e.id)
+
+    # com --queue a busca fica pra fila do vault (comando work ou a gui) e o comando termina aqui
+    if args.queue:
+        youtube.enqueue_videos(list(references))
+        return 0
+
+    prefetcher = Prefetcher(youtube, max_workers=args.workers)
+    failed = prefetch_videos(prefetcher, references)
+    prefetcher.close()
+
+    return 1 if failed else 0
+
+def command_mirror(args) -> int:
+    vault, registry = open_vault(args)
+    collection = open_collection(args.collection, vault)
+    if collection is None:
+        return 1
+
+    youtube = registry.get('youtube')
+    if youtube.link_mirror(args.url, collection) is None:
+        return 1
+
+    # a primeira sincronização é a importação da playlist inteira
+    return sync_mirror(args, youtube, collection)
+
+def command_sync(args) -> int:
+    vault, registry = open_vault(args)
+    collection = open_collection(args.collection, vault)
+    if collection is None:
+        return 1
+
+    return sync_mirror(args, registry.get('youtube'), collection)
+
+def sync_mirror(args, youtube: YouTubeModule, collection: Collection) -> int:
+    result = youtube.sync_mirror(collection)
+    if result is None:
+        return 1
+
+    emit({
+        'playlist_id': result['playlist_id'],
+        'title': result['title'],
+        'count': result['count'],
+        'added': len(result['entries']),
+        'removed': len(result['erased']),
+        'unchanged': result['unchanged']
+    })
+    sys.stdout.flush()
+
+    if args.no_prefetch or not result['entries']:
+        return 0
+
+    # só os vídeos que entraram na playlist desde a última sincronização são buscados
+    return prefetch_new_entries(youtube, result['entries'], args)
+
+def command_subscribe(args) -> int:
+    vault, registry = open_vault(args)
+    collection = open_collection(args.collection, vault)
+    if collection is None:
+        return 1
+
+    subscription = registry.get('youtube').subscribe(args.channel, collection)
+    if subscription is None:
+        return 1
+
+    emit({'channel_id': subscription.channel_id, 'collections': subscription.collections})
+    return 0
+
+def command_unsubscribe(args) -> int:
+    vault, registry = open_vault(args)
+    collection = open_collection(args.collection, vault)
+    if collection is None:
+        return 1
+
+    if not registry.get('youtube').unsubscribe(args.channel, collection):
+        logger.error(f'a collection {collection.file} não está inscrita no canal {args.channel}')
+        return 1
+
+    return 0
+
+def command_poll(args) -> int:
+    _, registry = open_vault(args)
+    youtube = registry.get('youtube')
+
+    watcher = FeedWatcher(max_workers=args.connections)
+    results = youtube.poll_subscriptions(watcher)
+    watcher.close()
+
+    entries = []
+    for result in results:
+        emit({'channel_id': result['channel_id'], 'status': result['status'], 'added': len(result['entries'])})
+        entries.extend(result['entries'])
+    sys.stdout.flush()
+
+    failed = any(r['status'] == 'failed' for r in results)
+    if entries and not args.no_prefetch:
+        failed = prefetch_new_entries(youtube, entries, args) or failed
+
+    return 1 if failed else 0
+
+def command_jobs(args) -> int:
+    vault, _ = open_vault(args)
+
+    if args.failed:
+        for j in vault.jobs.failed():
+            emit({'key': j.key, 'attempts': j.attempts, 'error': j.last_error})
+        return 0
+
+    counts = vault.jobs.counts()
+    emit({s: counts.get(s, 0) for s in ('pending', 'running', 'failed')})
+    return 0
+
+def command_work(args) -> int:
+    vault, registry = open_vault(args)
+
+    def on_done(job: Job, error: str | None):
+        if error is None:
+            status = 'done'
+        else:
+            status = 'failed' if job.attempts >= job.max_attempts else 'retry'
+
+        emit({'key': job.key, 'status': status, 'error': error})
+        sys.stdout.flush()
+
+    runner = JobRunner(vault.jobs, registry, batch_size=args.batch_size, on_done=on_done)
+
+    # jobs esperando o backoff de uma falha também são esperados, a menos que o comando seja interrompido
+    try:
+        runner.run_until_idle()
+    except KeyboardInterrupt:
+        return 1
+
+    return 0
+
+def command_stats(args) -> int:
+    vault, _ = open_vault(args)
+    collection = open_collection(args.collection, vault)
+    if collection is None:
+        return 1
+
+    if args.recompute:
+        collection.recompute_stats()
+
+    stats = collection.get_stats()
+    if stats is None:
+        logger.error(f'a collection {collection.file} não tem id, então não tem totais no catálogo')
+        return 1
+
+    data = asdict(stats)
+    data['unique_uploaders'] = stats.unique_uploaders
+    if not args.uploaders:
+        del data['uploaders']
+
+    emit({'collection': collection.name, **data})
+    return 0
+
+def command_daemon(args) -> int:
+    from .modules.youtube.daemon import DaemonClient, ExtractionDaemon
+
+    client = DaemonClient.connect()
+
+    if args.status or args.stop:
+        if client is None:
+            emit({'running': False})
+            return 1
+
+        status = client.ping()
+        if args.stop:
+            client.stop()
+        emit({'running': not args.stop, **status})
+        return 0
+
+    if client is not None:
+        logger.error(f'o daemon já está rodando (pid {client.ping()["pid"]})')
+        return 1
+
+    try:
+        ExtractionDaemon(processes=args.processes).serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+def command_store(args) -> int:
+    from .managers.cache import GlobalCache
+    from .managers.store import ContentStore
+
+    cache = GlobalCache()
+    if args.enable or args.disable:
+        cache.write_content_store_enabled(args.enable)
+
+    if not cache.content_store_enabled:
+        if args.publish:
+            logger.error('o store global está desligado, use --enable')
+            return 1
+
+        emit({'enabled': False})
+        return 0
+
+    if args.publish:
+        _, registry = open_vault(args)
+        emit({'published': registry.get('youtube').publish_to_store()})
+
+    emit({'enabled': True, **ContentStore(cache.store_dir).stats()})
+    return 0
+
+def command_compression(args) -> int:
+    from .managers.cache import GlobalCache, COMPRESSION_KINDS
+    from .modules.youtube import cache as youtube_cache
+    from .utils.file_lock import file_lock, LockTimeout
+    from .utils import json_io
+
+    cache = GlobalCache()
+    for kind in COMPRESSION_KINDS:
+        codec = getattr(args, kind)
+        if codec is not None:
+            cache.write_compression(kind, None if codec == 'default' else codec)
+
+    compression = cache.compression
+    emit({kind: compression.get(kind, 'default') for kind in COMPRESSION_KINDS})
+
+    if not args.apply:
+        return 0
+
+    # reescreve os arquivos do vault que já existem no formato escolhido
+    vault, _ = open_vault(args)
+    files = [('videos', youtube_cache._get_videos_file(vault))]
+    files += [('collections', f) for f in vault.collection_files()]
+
+    for kind, file in files:
+        codec = compression.get(kind)
+        if codec is None or not file.is_file():
+            continue
+
+        lock_file = vault.get_lock_file(file) if kind == 'collections' else None
+        try:
+            with file_lock(file, lock_file=lock_file):
+                data = json_io.read_json(file)
+                # outros json que estejam no vault (configs de editores etc) ficam como estão
+                if data is None or (kind == 'collections' and not (isinstance(data, dict) and 'entries' in data)):
+                    continue
+
+                before = file.stat().st_size
+                json_io.write_json(file, data, codec)
+        except LockTimeout as err:
+            logger.error(str(err))
+            continue
+
+        emit({'file': str(file), 'compression': codec, 'before': before, 'after': file.stat().st_size})
+
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='sorted', description='gerencia collections de um vault sem abrir a gui')
+    parser.add_argument('--vault', help='raiz do vault, criado se ainda não existir. o padrão é o primeiro diretório acima da collection com um .sorted')
+    parser.add_argument('--processes', type=int, help='extrai os vídeos em N processos em vez de threads, pra usar mais de um núcleo')
+    parser.add_argument('--no-daemon', action='store_true', help='faz as buscas nesse processo mesmo com o daemon rodando')
+
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_command(name: str, help: str, function, items: str | None = None, destination: bool = False):
+        command = commands.add_parser(name, help=help)
+        command.add_argument('collection', help='arquivo da collection')
+        if destination:
+            command.add_argument('destination', help='arquivo da collection de destino')
+        if items:
+            command.add_argument('items', nargs='*', help=f'{items}. se nenhum for passado, são lidos do stdin')
+            command.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='itens escritos por vez')
+        command.set_defaults(function=function)
+        return command
+
+    command = add_command('list', 'lista as entries em ndjson', command_list)
+    command.add_argument('--sort', help=f'campo de ordenação ({", ".join(FIELD_ALIASES)})')
+    command.add_argument('--desc', action='store_true', help='ordena do maior pro menor')
+    command.add_argument('--where', help="filtros de intervalo, ex: 'duration>20m date=2024 views>=1k'")
+    command.add_argument('--fields', help='campos escritos em cada linha, separados por vírgula')
+    command.add_argument('--limit', type=int, help='quantidade máxima de entries')
+
+    add_command('add', 'adiciona itens a partir de urls ou ids', command_add, items='urls ou ids')
+    add_command('remove', 'remove entries', command_remove, items='ids das entries')
+    add_command('move', 'move entries pra outra collection', command_move, items='ids das entries', destination=True)
+    add_command('copy', 'copia entries pra outra collection', command_copy, items='ids das entries', destination=True)
+
+    command = add_command('prefetch', 'baixa os metadados e thumbnails que faltam no cache', command_prefetch, items='ids das entries')
+    command.add_argument('--all', action='store_true', help='baixa todas as entries da collection, sem ler o stdin')
+    command.add_argument('--workers', type=int, default=8, help='vídeos baixados ao mesmo tempo')
+    command.add_argument('--queue', action='store_true', help='coloca os downloads na fila do vault em vez de esperar por eles')
+
+    command = add_command('import', 'importa uma playlist do youtube', command_import)
+    command.add_argument('url', help='url ou id da playlist')
+    command.add_argument('--workers', type=int, default=8, help='vídeos baixados ao mesmo tempo')
+    command.add_argument('--queue', action='store_true', help='coloca os downloads na fila do vault em vez de esperar por eles')
+    command.add_argument('--no-prefetch', action='store_true', help='só insere os vídeos, sem baixar os metadados')
+
+    command = add_command('mirror', 'liga a collection a uma playlist do youtube e sincroniza ela', command_mirror)
+    command.add_argument('url', help='url ou id da playlist')
+    command.add_argument('--workers', type=int, default=8, help='vídeos baixados ao mesmo tempo')
+    command.add_argument('--queue', action='store_true', help='coloca os downloads na fila do vault em vez de esperar por eles')
+    command.add_argument('--no-prefetch', action='store_true', help='só insere os vídeos, sem baixar os metadados')
+
+    command = add_command('sync', 'aplica o que mudou na playlist espelhada desde a última sincronização', command_sync)
+    command.add_argument('--workers', type=int, default=8, help='vídeos baixados ao mesmo tempo')
+    command.add_argument('--queue', action='store_true', help='coloca os downloads na fila do vault em vez de esperar por eles')
+    command.add_argument('--no-prefetch', action='store_true', help='só aplica as mudanças, sem baixar os metadados')
+
+    command = add_command('subscribe', 'inscreve a collection num canal do youtube', command_subscribe)
+    command.add_argument('channel', help='url ou id do canal')
+
+    command = add_command('unsubscribe', 'cancela a inscrição da collection num canal', command_unsubscribe)
+    command.add_argument('channel', help='url ou id do canal')
+
+    command = commands.add_parser('poll', help='insere os uploads novos dos canais inscritos nas collections do vault')
+    command.add_argument('--connections', type=int, default=32, help='feeds consultados ao mesmo tempo')
+    command.add_argument('--workers', type=int, default=8, help='vídeos baixados ao mesmo tempo')
+    command.add_argument('--queue', action='store_true', help='coloca os downloads na fila do vault em vez de esperar por eles')
+    command.add_argument('--no-prefetch', action='store_true', help='só insere os vídeos, sem baixar os metadados')
+    command.set_defaults(function=command_poll)
+
+    command = commands.add_parser('jobs', help='mostra a fila de downloads do vault')
+    command.add_argument('--failed', action='store_true', help='lista os jobs que esgotaram as tentativas')
+    command.set_defaults(function=command_jobs)
+
+    command = commands.add_parser('work', help='executa a fila de downloads do vault até ela esvaziar')
+    command.add_argument('--batch-size', type=int, default=16, help='jobs executados por vez')
+    command.set_defaults(function=command_work)
+
+    command = add_command('stats', 'mostra os totais da collection', command_stats)
+    command.add_argument('--recompute', action='store_true', help='recalcula os totais do zero')
+    command.add_argument('--uploaders', action='store_true', help='inclui a contagem de entries por autor')
+
+    command = commands.add_parser('store', help='mostra o store global de metadados e thumbnails, compartilhado pelos vaults')
+    command.add_argument('--enable', action='store_true', help='liga o store global')
+    command.add_argument('--disable', action='store_true', help='desliga o store global')
+    command.add_argument('--publish', action='store_true', help='copia os vídeos e thumbnails do vault pro store')
+    command.set_defaults(function=command_store)
+
+    command = commands.add_parser('compression', help='escolhe a compressão do cache de vídeos e das collections')
+    for kind in ('videos', 'collections'):
+        command.add_argument(f'--{kind}', choices=['plain', 'gzip', 'zstd', 'default'], help=f'formato dos arquivos de {kind}. default mantém o formato de cada arquivo')
+    command.add_argument('--apply', action='store_true', help='reescreve agora os arquivos do vault no formato escolhido')
+    command.set_defaults(function=command_compression)
+
+    command = commands.add_parser('daemon', help='mantém o yt-dlp carregado e faz as buscas pedidas pelos outros comandos e pela gui')
+    command.add_argument('--status', action='store_true', help='mostra se o daemon está rodando, sem iniciar um')
+    command.add_argument('--stop', action='store_true', help='para o daemon que estiver rodando')
+    command.set_defaults(function=command_daemon)
+
+    return parser
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    try:
+        code = args.function(args)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # quem lia a saída fechou o pipe (ex: '| head'), não é um erro
+        # o stdout é trocado pra que o flush na saída do interpretador não falhe de novo
+        sys.stdout = open('/dev/null', 'w')
+        code = 0
+    except VaultNotFound as err:
+        logger.error(str(err))
+        code = 1
+
+    return code
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+from concurrent.futures import Future
+from typing import Callable, Coroutine
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from ..utils.aio import AsyncRuntime
+
+
+class AsyncBridge(QObject):
+    """
+    liga o loop do asyncio (AsyncRuntime, numa thread própria) ao loop do qt
+
+    as corrotinas rodam no loop do asyncio, e o callback de cada uma é chamado
+    na thread da gui quando ela termina, então ele pode mexer nos widgets.
+    o qt nunca espera o asyncio e o asyncio nunca toca nos widgets
+
+    uso:
+        bridge = AsyncBridge(runtime, parent=window)
+        bridge.run(module.resolve_many(urls), window.on_resolved)
+
+    args:
+        runtime:
+            loop onde as corrotinas vão rodar
+
+        parent:
+            dono do bridge no qt, os callbacks rodam na thread dele
+    """
+
+    # emitido pela thread do loop, entregue na thread da gui: callback, resultado, erro
+    finished = pyqtSignal(object, object, object)
+
+    def __init__(self, runtime: AsyncRuntime, parent: QObject | None = None):
+        super().__init__(parent)
+
+        self.runtime = runtime
+        self.pending: set[Future] = set()
+
+        # o sinal é emitido de outra thread, então a conexão vira uma fila
+        # processada pelo loop do qt
+        self.finished.connect(self._deliver)
+
+    def run(self, coro: Coroutine, callback: Callable[[object, BaseException | None], None] | None = None) -> Future:
+        """
+        agenda uma corrotina no loop do asyncio
+
+        args:
+            callback:
+                opcional. chamado na thread da gui com (resultado, erro)
+                o erro é None se a corrotina terminou normalmente
+
+        returns:
+            future com o resultado, pode ser cancelado
+        """
+
+        future = self.runtime.submit(coro)
+        self.pending.add(future)
+        future.add_done_callback(lambda f: self._on_done(f, callback))
+
+        return future
+
+    def _on_done(self, future: Future, callback):
+        # roda na thread do loop
+        if future.cancelled():
+            return
+
+        error = future.exception()
+        self.finished.emit(callback, None if error else future.result(), error)
+
+    def _deliver(self, callback, result, error):
+        self.pending = {f for f in self.pending if not f.done()}
+
+        if callback is not None:
+            callback(result, error)
+
+    def cancel_all(self):
+        """
+        cancela as corrotinas que ainda não terminaram, os callbacks delas não são chamados
+        """
+
+        for f in self.pending:
+            f.cancel()
+        self.pending.clear()
@@ -8,12 +8,20 @@ from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QTreeWidget, QTreeView
 )
 from PyQt6.QtGui import QFileSystemModel, QFont, QIcon, QPixmap
-from PyQt6.QtCore import Qt, QSize
-
-from ..utils.generic import generate_random_id, get_iso_datetime
-from ..managers.models import Collection, Vault, Entry, ModuleRegistry
+from PyQt6.QtCore import Qt, QSize, QThread, QTimer, pyqtSignal
+
+from ..utils.generic import generate_random_id, get_iso_datetime, format_total_duration
+from .. import logger
+from ..managers.models import Collection, Vault, Entry, EntryDiff, ModuleRegistry
+from ..managers.cache import GlobalCache
+from ..managers.snapshot import Snapshot, read_snapshot, write_snapshot
+from ..managers.search import SearchIndex
+from ..managers.jobs import Job, JobRunner
 from ..modules.youtube.main import YouTubeModule
-from ..modules.youtube.api import extract_video_info, instance_ytdl
+from ..modules.youtube.columns import VideoColumns, parse_filters
+from ..modules.youtube.utils import format_upload_date
+from ..modules.youtube.widgets import YouTubePresenter
+from .watcher import VaultWatcher
 
 
 # TODO: documentação
@@ -23,31 +31,175 @@ class Controller:
     def __init__(self, collection: Collection):
         self.collection = collection
 
-    def write_entry(self, module: str, type: str, reference: str):
-        entry = Entry(
-            id=generate_random_id(),
-            created_at=get_iso_datetime(),
-            module=module,
-            type=type,
-            reference=reference
-        )
-        self.collection.write_entry(entry)
+    def write_entry(self, module: str, type: str, reference: str) -> bool:
+        return self.write_entries([(module, type, reference)])
+
+    def write_entries(self, items: list[tuple[str, str, str]]) -> bool:
+        # cada item é (module, type, reference), todos salvos com uma única escrita
+        # retorna False se a collection não pôde ser salva (o erro já foi pro log)
+        entries = []
+        seen = set()
+        for module, type, reference in items:
+            # o mesmo item não é inserido duas vezes na mesma collection
+            if (module, type, reference) in seen or self.collection.contains_reference(module, type, reference):
+                logger.warning(f'{module}.{type} {reference} já está na collection')
+                continue
+            seen.add((module, type, reference))
 
-    def erase_entries(self, ids: list[str]):
-        for i in ids:
-            self.collection.erase_entry(i)
+            entries.append(Entry(
+                id=generate_random_id(),
+                created_at=get_iso_datetime(),
+                module=module,
+                type=type,
+                reference=reference
+            ))
+
+        if not entries:
+            return True
+
+        return self.collection.write_entries(entries)
+
+    def erase_entries(self, ids: list[str]) -> bool:
+        return self.collection.erase_entries(ids)
+
+class ReconcileWorker(QThread):
+    """
+    lê a collection e monta as rows de exibição fora da thread da ui
+
+    usado depois de pintar a lista a partir do snapshot, pra conferir
+    os dados exibidos com os arquivos reais sem travar a janela
+    """
+
+    reconciled = pyqtSignal(object, object) # collection, rows por id da entry
+
+    def __init__(self, file: Path, vault: Vault, module_registry: ModuleRegistry, parent=None):
+        super().__init__(parent)
+
+        self.file = file
+        self.vault = vault
+        self.module_registry = module_registry
+
+    def run(self):
+        collection = Collection.from_file(self.file, self.vault)
+
+        rows = {}
+        for e in collection.entries.values():
+            module = self.module_registry.get_for_entry(e)
+            if not module:
+                continue
+
+            row = module.build_entry_row(e)
+            if row:
+                rows[e.id] = row
+
+        self.reconciled.emit(collection, rows)
+
+class SearchIndexWorker(QThread):
+    """
+    monta o índice de busca de uma collection fora da thread da ui
+    """
+
+    built = pyqtSignal(object) # SearchIndex
+
+    def __init__(self, entries: list[Entry], module_registry: ModuleRegistry, parent=None):
+        super().__init__(parent)
+
+        self.entries = entries
+        self.module_registry = module_registry
+
+    def run(self):
+        documents = {}
+        for module, entries in self.module_registry.group_by_module(self.entries).items():
+            documents.update(module.get_search_texts(entries))
+
+        self.built.emit(SearchIndex.from_documents(documents))
+
+class ReferenceIndexWorker(QThread):
+    """
+    reconstrói o índice de referências do vault fora da thread da ui
+    """
+
+    def __init__(self, vault: Vault, parent=None):
+        super().__init__(parent)
+
+        self.vault = vault
+
+    def run(self):
+        self.vault.references.rebuild(self.vault.collection_files())
 
 class MainWindow(QMainWindow):
-    def __init__(self, scol: Path, root: Path):
+    # emitido pela thread da JobRunner quando um job termina: job, erro
+    job_done = pyqtSignal(object, object)
+
+    # quantidade de thumbnails decodificadas por vez depois de pintar o snapshot
+    THUMBNAIL_BATCH_SIZE = 32
+
+    # tempo juntando os jobs terminados antes de reconstruir as rows deles
+    JOBS_DEBOUNCE_MS = 250
+
+    # tempo sem digitar antes do filtro de busca ser aplicado
+    SEARCH_DEBOUNCE_MS = 150
+
+    # opções de ordenação da lista: (texto, campo, decrescente)
+    # sem campo, a lista segue a ordem da collection
+    SORT_OPTIONS = [
+        ('Collection order', None, False),
+        ('Most viewed', 'view_count', True),
+        ('Least viewed', 'view_count', False),
+        ('Longest', 'duration', True),
+        ('Shortest', 'duration', False),
+        ('Newest', 'upload_date', True),
+        ('Oldest', 'upload_date', False),
+        ('Most liked', 'like_count', True)
+    ]
+
+    def __init__(self, scol: Path, root: Path, snapshot: Snapshot | None = None):
         super().__init__()
 
+        self.global_cache = GlobalCache()
+
         # FIXME: TEMPORÁRIO
+        self.vault = Vault(root)
         self.module_registry = ModuleRegistry()
-        self.module_registry.register(YouTubeModule(vault=Vault(root)))
+        youtube = YouTubeModule(vault=self.vault)
+        self.module_registry.register(youtube)
+
+        # com um daemon rodando (python3 -m src.cli daemon), as buscas dos jobs
+        # e dos vídeos exibidos são feitas por ele
+        from ..modules.youtube.daemon import DaemonClient
+        youtube.daemon = DaemonClient.connect()
+
+        # camada de apresentação de cada module, indexada pelo id dele
+        self.presenters = {'youtube': YouTubePresenter()}
+
+        # um vault que nunca foi indexado precisa do índice de referências montado do zero
+        if self.vault.references.is_empty():
+            ReferenceIndexWorker(self.vault, parent=self).start()
+
+        # downloads pendentes (metadados, thumbnails) rodam em segundo plano pela fila do vault
+        # as rows dos itens baixados são reconstruídas em lote, quando os jobs terminam
+        self.finished_references: set[tuple[str, str]] = set()
+        self.jobs_timer = QTimer(self)
+        self.jobs_timer.setSingleShot(True)
+        self.jobs_timer.setInterval(self.JOBS_DEBOUNCE_MS)
+        self.jobs_timer.timeout.connect(self.apply_finished_jobs)
+        self.job_done.connect(self.on_job_done)
+
+        self.job_runner = JobRunner(self.vault.jobs, self.module_registry, on_done=self.job_done.emit)
+
+        # api assíncrona dos modules, usada pra buscar na hora os itens inseridos pela janela
+        # o loop do asyncio só sobe (e o asyncio só é importado) na primeira inserção
+        self.async_bridge = None
     
         # dados e api
         self.scol = scol
-        self.collection = Collection.from_file(self.scol)
+
+        # com um snapshot, a collection em memória vem dele e é trocada pela real
+        # assim que a reconciliação em segundo plano terminar
+        if snapshot is not None:
+            self.collection = Collection.from_dict(snapshot.collection, self.scol, self.vault)
+        else:
+            self.collection = Collection.from_file(self.scol, self.vault)
         
         self.controller = Controller(self.collection)
 
@@ -67,10 +219,39 @@ class MainWindow(QMainWindow):
         #self.combo_box_type.setCurrentText('youtube.video')
 
         self.input_insert = QLineEdit()
+
+        # busca, filtra a lista enquanto o texto é digitado
+        # além do texto, aceita filtros de intervalo (ex: 'duration>20m date=2024')
+        self.input_search = QLineEdit()
+        self.input_search.setPlaceholderText('Search (ex: python duration>20m date=2024)')
+        self.input_search.setClearButtonEnabled(True)
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.apply_search_filter)
+        self.input_search.textChanged.connect(self.search_timer.start)
+
+        self.search_index: SearchIndex | None = None
+        self.search_index_worker = None
+        self.search_dirty: set[str] = set() # entries alteradas enquanto o índice era montado
+        self.hidden_ids: set[str] = set()
+
+        # ordenação, feita pela tabela colunar dos vídeos
+        # a tabela só é montada quando uma ordenação ou filtro de intervalo é usado
+        self.combo_box_sort = QComboBox()
+        for text, _, _ in self.SORT_OPTIONS:
+            self.combo_box_sort.addItem(text)
+        self.combo_box_sort.currentIndexChanged.connect(self.apply_sort)
+
+        self.columns: VideoColumns | None = None
         
         # info
         self.label_title = QLabel()
         self.label_entry_count = QLabel()
+        self.label_watch_time = QLabel()
+        self.label_uploaders = QLabel()
+        self.label_date_range = QLabel()
         self.label_type = QLabel()
 
         font = QFont()
@@ -86,7 +267,29 @@ class MainWindow(QMainWindow):
         self.header.addLayout(self.compose_control_panel())
 
         self.qlist = self.compose_list_widget()
-        self.load_list_contents() # carregar o conteúdo pela primeira vez
+        self.list_items: dict[str, QListWidgetItem] = {} # id da entry -> item da lista
+        self.list_rows: dict[str, dict] = {} # id da entry -> row de exibição
+
+        self.pending_thumbnails: list[str] = []
+        self.reconcile_worker = None
+
+        # carregar o conteúdo pela primeira vez
+        if snapshot is not None:
+            self.load_snapshot_contents(snapshot)
+        else:
+            self.load_list_contents()
+
+        # recarrega a collection e o cache quando forem alterados por outro processo
+        self.watcher = VaultWatcher(self.vault.root, self.vault.context, parent=self)
+        self.watcher.watch_collection(self.scol)
+        for m in self.module_registry.modules:
+            self.watcher.watch_cache_files(m.cache_files())
+
+        self.watcher.collection_changed.connect(self.on_collection_file_changed)
+        self.watcher.cache_changed.connect(self.on_cache_file_changed)
+
+        # começa depois da lista carregada, que já enfileira o que falta das entries exibidas
+        self.job_runner.start()
 
         # file tree
         self.root = str(root) # carregar o último root que foi usado
@@ -109,7 +312,12 @@ class MainWindow(QMainWindow):
         widget_contents = QWidget()
         contents = QVBoxLayout(widget_contents)
 
+        hbox_search = QHBoxLayout()
+        hbox_search.addWidget(self.input_search)
+        hbox_search.addWidget(self.combo_box_sort)
+
         contents.addLayout(self.header)
+        contents.addLayout(hbox_search)
         contents.addWidget(self.qlist)
 
         widget_sidebar = QWidget()
@@ -136,6 +344,9 @@ class MainWindow(QMainWindow):
         vbox_info.addLayout(hbox_sub_info)
         
         hbox_sub_info.addWidget(self.label_entry_count)
+        hbox_sub_info.addWidget(self.label_watch_time)
+        hbox_sub_info.addWidget(self.label_uploaders)
+        hbox_sub_info.addWidget(self.label_date_range)
         hbox_sub_info.addWidget(self.label_type)
 
         return vbox_info
@@ -183,37 +394,438 @@ class MainWindow(QMainWindow):
 
         return tree
 
+    def build_row(self, entry: Entry):
+        # tenta obter o módulo certo pra lidar com essa entry
+        module = self.module_registry.get_for_entry(entry)
+        if not module:
+            return
+        
+        return module.build_entry_row(entry)
+
+    def insert_list_row(self, row: dict, position: int | None = None, load_thumbnail: bool = True):
+        presenter = self.presenters.get(row.get('module'))
+        if not presenter:
+            return
+
+        # espera o result em vez de desenpacotar de uma vez
+        # pra não quebrar com 'cannot unpack non-iterable NoneType object'
+        result = presenter.build_row_widget(row, load_thumbnail)
+        if not result:
+            return
+        item, widget = result
+
+        if position is None:
+            self.qlist.addItem(item)
+        else:
+            self.qlist.insertItem(position, item)
+        self.qlist.setItemWidget(item, widget)
+
+        entry_id = row.get('entry_id')
+        self.list_items[entry_id] = item
+        self.list_rows[entry_id] = row
+
+    def insert_list_item(self, entry: Entry, position: int | None = None):
+        row = self.build_row(entry)
+        if row:
+            self.insert_list_row(row, position)
+
+    def remove_list_item(self, entry_id: str) -> int | None:
+        # retorna a linha onde o item estava, pra que ele possa ser reinserido no mesmo lugar
+        self.list_rows.pop(entry_id, None)
+        item = self.list_items.pop(entry_id, None)
+        if item is None:
+            return
+        
+        position = self.qlist.row(item)
+        self.qlist.takeItem(position)
+        self.hidden_ids.discard(entry_id)
+
+        return position
+
     def load_list_contents(self):
         self.qlist.clear()
+        self.list_items.clear()
+        self.list_rows.clear()
+        self.hidden_ids.clear()
+        self.columns = None
         
-        entries = self.collection.entries
-        for e in entries.values():
-            # tenta obter o módulo certo pra lidar com essa entry
-            module = self.module_registry.get_for_entry(e)
-            if not module:
-                continue
-            
-            # espera o result em vez de desenpacotar de uma vez
-            # pra não quebrar com 'cannot unpack non-iterable NoneType object'
-            result = module.build_entry_widget(e)
-            if not result:
+        for e in self.collection.entries.values():
+            self.insert_list_item(e)
+
+        self.build_search_index()
+
+        if self.combo_box_sort.currentIndex() > 0:
+            self.apply_sort()
+
+    def load_snapshot_contents(self, snapshot: Snapshot):
+        """
+        pinta a lista direto com as rows do snapshot
+
+        só as thumbnails que estavam visíveis são decodificadas agora,
+        as demais são carregadas aos poucos depois que a janela aparecer
+        """
+
+        self.qlist.clear()
+        self.list_items.clear()
+        self.list_rows.clear()
+        self.columns = None
+
+        visible = set(snapshot.visible)
+        for r in snapshot.rows:
+            self.insert_list_row(r, load_thumbnail=r.get('entry_id') in visible)
+
+        self.pending_thumbnails = [i for i in self.list_rows if i not in visible]
+        QTimer.singleShot(0, self.load_pending_thumbnails)
+
+        self.build_search_index()
+
+        # confere o que foi pintado com os arquivos reais sem travar a ui
+        self.reconcile_worker = ReconcileWorker(self.scol, self.vault, self.module_registry, parent=self)
+        self.reconcile_worker.reconciled.connect(self.on_reconciled)
+        self.reconcile_worker.start()
+
+    def load_pending_thumbnails(self):
+        batch = self.pending_thumbnails[:self.THUMBNAIL_BATCH_SIZE]
+        self.pending_thumbnails = self.pending_thumbnails[self.THUMBNAIL_BATCH_SIZE:]
+
+        for i in batch:
+            item = self.list_items.get(i)
+            if item is None:
                 continue
-            item, widget = result
-        
-            self.qlist.addItem(item)
-            self.qlist.setItemWidget(item, widget)
 
-            print('adicionado')
+            row = self.list_rows[i]
+            presenter = self.presenters.get(row.get('module'))
+            if presenter:
+                presenter.load_row_thumbnail(self.qlist.itemWidget(item), row)
+
+        if self.pending_thumbnails:
+            QTimer.singleShot(0, self.load_pending_thumbnails)
+
+    def on_reconciled(self, collection: Collection, rows: dict[str, dict]):
+        # a collection pode ter sido trocada enquanto a reconciliação rodava
+        if collection.file != self.scol:
+            return
+
+        old = self.list_rows
+        diff = EntryDiff(
+            added=[i for i in rows if i not in old],
+            removed=[i for i in old if i not in rows],
+            changed=[i for i in rows if i in old and rows[i] != old[i]]
+        )
+
+        self.collection = collection
+        self.controller = Controller(self.collection)
+
+        self.update_list_items(diff, rows)
+        self.load_info_labels()
+
+    def update_list_items(self, diff: EntryDiff, rows: dict[str, dict] | None = None):
+        # aplica só as mudanças necessárias, sem reconstruir a lista inteira
+        # se as rows não forem passadas, elas são montadas a partir da collection atual
+        def get_row(entry_id: str):
+            if rows is not None:
+                return rows.get(entry_id)
+            return self.build_row(self.collection.entries[entry_id])
+
+        for i in diff.removed:
+            self.remove_list_item(i)
+
+        for i in diff.changed:
+            position = self.remove_list_item(i)
+            row = get_row(i)
+            if row:
+                self.insert_list_row(row, position)
+
+        for i in diff.added:
+            row = get_row(i)
+            if row:
+                self.insert_list_row(row)
+
+        self.update_search_index(diff.added + diff.changed + diff.removed)
+        self.update_columns(diff)
+
+        # itens novos ou reconstruídos também precisam respeitar o filtro atual
+        if self.input_search.text():
+            self.apply_search_filter()
+
+    def build_search_index(self):
+        """
+        monta o índice de busca da collection atual em segundo plano
+        enquanto ele não fica pronto, o filtro simplesmente não é aplicado
+        """
+
+        self.search_index = None
+        self.search_dirty.clear()
+
+        # um worker antigo ainda rodando só tem o resultado ignorado
+        if self.search_index_worker is not None:
+            self.search_index_worker.built.disconnect()
+
+        worker = SearchIndexWorker(list(self.collection.entries.values()), self.module_registry, parent=self)
+        worker.built.connect(self.on_search_index_built)
+        worker.finished.connect(worker.deleteLater)
+        worker.start()
+
+        self.search_index_worker = worker
+
+    def on_search_index_built(self, index: SearchIndex):
+        self.search_index = index
+        self.search_index_worker = None
+
+        # aplica o que mudou na collection enquanto o índice era montado
+        dirty = self.search_dirty
+        self.search_dirty = set()
+        self.update_search_index(list(dirty))
+
+        if self.input_search.text():
+            self.apply_search_filter()
+
+    def update_search_index(self, ids: list[str]):
+        # atualiza só os documentos das entries passadas
+        if self.search_index is None:
+            self.search_dirty.update(ids)
+            return
+
+        entries = [self.collection.entries[i] for i in ids if i in self.collection.entries]
+
+        texts = {}
+        for module, group in self.module_registry.group_by_module(entries).items():
+            texts.update(module.get_search_texts(group))
+
+        for i in ids:
+            text = texts.get(i)
+            if text:
+                self.search_index.add(i, text)
+            else:
+                self.search_index.remove(i)
+
+    def get_columns(self) -> VideoColumns:
+        # montada no primeiro uso, depois só é atualizada incrementalmente
+        if self.columns is None:
+            youtube = self.module_registry.get('youtube')
+            self.columns = youtube.build_columns(list(self.collection.entries.values()))
+
+        return self.columns
+
+    def update_columns(self, diff: EntryDiff):
+        # uma tabela que ainda não foi montada não tem o que atualizar
+        if self.columns is None:
+            return
+
+        youtube = self.module_registry.get('youtube')
+
+        self.columns.remove_many(diff.removed)
+
+        for i in diff.added + diff.changed:
+            entry = self.collection.entries.get(i)
+            if entry is not None:
+                youtube.update_columns(self.columns, entry)
+
+    def apply_sort(self):
+        """
+        reordena a lista de acordo com a opção de ordenação escolhida
+
+        a ordem é calculada pela tabela colunar, e os widgets são recriados
+        na ordem nova a partir das rows já montadas, com as thumbnails carregadas aos poucos
+        """
+
+        _, field, descending = self.SORT_OPTIONS[self.combo_box_sort.currentIndex()]
+
+        if field is None:
+            order = list(self.collection.entries)
+        else:
+            order = self.get_columns().sort(field, descending)
+
+        # entries que a tabela não conhece (outros modules) ficam no final
+        known = set(order)
+        order = [i for i in order if i in self.list_rows]
+        order += [i for i in self.list_rows if i not in known]
+
+        rows = self.list_rows
+        self.qlist.clear()
+        self.list_items.clear()
+        self.list_rows = {}
+
+        for i in order:
+            self.insert_list_row(rows[i], load_thumbnail=False)
+            if i in self.hidden_ids:
+                self.list_items[i].setHidden(True)
+
+        self.pending_thumbnails = order
+        QTimer.singleShot(0, self.load_pending_thumbnails)
+
+    def apply_search_filter(self):
+        """
+        esconde os itens da lista que não casam com o texto da busca
+
+        os filtros de intervalo da busca (ex: 'duration>20m') são aplicados
+        pela tabela colunar, e o resto do texto pelo índice de busca
+        """
+
+        text = self.input_search.text()
+
+        try:
+            ranges, text = parse_filters(text)
+        except ValueError as e:
+            # um filtro ainda incompleto (ex: 'date=20') não esconde nada até ficar válido
+            logger.warning(str(e))
+            return
+
+        matches = None
+        if text:
+            if self.search_index is None:
+                return
+            matches = self.search_index.search(text)
+
+        if ranges:
+            in_range = set(self.get_columns().filter(ranges))
+            matches = in_range if matches is None else matches & in_range
+
+        hidden = set()
+        if matches is not None:
+            hidden = self.list_items.keys() - matches
+
+        # só mexe nos itens que mudaram de estado desde o último filtro
+        for i in hidden ^ self.hidden_ids:
+            item = self.list_items.get(i)
+            if item is not None:
+                item.setHidden(i in hidden)
+
+        self.hidden_ids = hidden
+
+    def on_collection_file_changed(self, file: Path):
+        if file != self.scol or not file.is_file():
+            return
+
+        fresh = Collection.from_file(file, self.vault)
+        diff = self.collection.diff(fresh)
+
+        # a alteração não passou pelo write_entry, então o índice e os totais precisam ser sincronizados
+        if not diff.is_empty and fresh.is_indexed:
+            self.vault.references.index_collection(fresh)
+            fresh.recompute_stats()
+
+        self.collection = fresh
+        self.controller = Controller(self.collection)
+
+        if diff.is_empty:
+            return
+
+        self.update_list_items(diff)
+        self.load_info_labels()
+
+    def on_cache_file_changed(self, file: Path):
+        # só as entries que apontam pros dados alterados são reconstruídas
+        changed = set()
+        for m in self.module_registry.modules:
+            if file in m.cache_files():
+                changed |= m.reload_cache()
+
+        if not changed:
+            return
+
+        ids = [e.id for e in self.collection.entries.values() if e.reference in changed]
+        self.update_list_items(EntryDiff(changed=ids))
+
+    def on_job_done(self, job: Job, error: str | None):
+        # um job que falhou volta pra fila sozinho, a row continua como está
+        if error is not None:
+            return
+
+        self.finished_references.add((job.module, job.payload.get('reference')))
+        self.jobs_timer.start()
+
+    def apply_finished_jobs(self):
+        finished = self.finished_references
+        self.finished_references = set()
+
+        ids = [e.id for e in self.collection.entries.values() if (e.module, e.reference) in finished]
+        if not ids:
+            return
+
+        self.update_list_items(EntryDiff(changed=ids))
+        self.load_info_labels()
 
     def load_info_labels(self):
         # atualiza os dados exibidos sobre a collection
         self.label_title.setText(self.collection.name)
         self.label_entry_count.setText(str(self.collection.entry_count))
+
+        # os totais vêm do catálogo do vault, sem ler os vídeos da collection
+        stats = self.collection.get_stats()
+        if stats is None or not stats.count:
+            for label in [self.label_watch_time, self.label_uploaders, self.label_date_range]:
+                label.clear()
+            return
+
+        self.label_watch_time.setText(format_total_duration(stats.total_duration))
+        self.label_uploaders.setText(f'{stats.unique_uploaders} uploaders')
+
+        if stats.first_upload_date:
+            first = format_upload_date(stats.first_upload_date)
+            last = format_upload_date(stats.last_upload_date)
+            self.label_date_range.setText(first if first == last else f'{first} – {last}')
+        else:
+            self.label_date_range.clear()
     
     def refresh(self):
         self.load_list_contents()
         self.load_info_labels()
 
+        # as escritas feitas pela própria janela não precisam ser recarregadas pelo watcher
+        self.watcher.acknowledge(self.scol)
+
+    def get_visible_ids(self) -> list[str]:
+        # entries cujo item aparece, mesmo que parcialmente, na área visível da lista
+        viewport = self.qlist.viewport().rect()
+        return [
+            i for i, item in self.list_items.items()
+            if self.qlist.visualItemRect(item).intersects(viewport)
+        ]
+
+    def save_snapshot(self):
+        """
+        salva o estado atual da lista pra próxima inicialização pintar direto dele
+        """
+
+        self.global_cache.write_last_accessed_vault(self.vault.root)
+        self.global_cache.write_last_accessed_collection(self.scol)
+
+        # sempre na ordem da collection, a ordenação escolhida não é salva
+        order = list(self.collection.entries)
+
+        snapshot = Snapshot(
+            vault=str(self.vault.root.resolve()),
+            collection_file=str(self.scol.resolve()),
+            collection=self.collection.to_dict(),
+            rows=[self.list_rows[i] for i in order if i in self.list_rows],
+            visible=self.get_visible_ids()
+        )
+        write_snapshot(self.global_cache.snapshot_file, snapshot)
+
+    def closeEvent(self, event):
+        # o lote de jobs em andamento termina de salvar antes de fechar, o resto fica na fila
+        self.job_runner.stop()
+
+        # as buscas assíncronas ainda em andamento são abandonadas, os jobs delas continuam na fila
+        if self.async_bridge is not None:
+            self.async_bridge.cancel_all()
+
+            runtime = self.async_bridge.runtime
+            for m in self.module_registry.modules:
+                runtime.run(m.close_async())
+            runtime.close()
+
+        # os workers precisam terminar antes da janela ser destruída
+        # e a reconciliação antes do snapshot, senão ele sairia com dados velhos
+        for t in self.findChildren(QThread):
+            t.wait()
+
+        if self.scol.is_file():
+            self.save_snapshot()
+
+        super().closeEvent(event)
+
     def get_selected_ids(self):
         # espera que todo item tenha um userrole (valor oculto)
         # que indique qual entry ele representa
@@ -251,18 +863,66 @@ class MainWindow(QMainWindow):
             
             self.load_table_contents()
 
+    def get_async_bridge(self):
+        if self.async_bridge is None:
+            from ..utils.aio import get_runtime
+            from .bridge import AsyncBridge
+
+            self.async_bridge = AsyncBridge(get_runtime(), parent=self)
+
+        return self.async_bridge
+
     def action_insert(self):
         # obtém o conteúdo do input de texto e adiciona na collection
-        value = self.input_insert.text()
-        if not value:
+        # aceita várias urls separadas por espaço
+        values = self.input_insert.text().split()
+        if not values:
             return
         
-        # FIXME: TEMPORÁRIO
-        info = extract_video_info(value, instance_ytdl())
-        
-        self.controller.write_entry(module='youtube', type='video', reference=info.get('id'))
+        # as urls são reconhecidas sem acessar a rede, então a lista já mostra as entries novas
+        items = []
+        urls: dict[str, list[str]] = {} # id do module -> urls dele
+        for value in values:
+            for m in self.module_registry.modules:
+                received = m.receive_url(value)
+                if received:
+                    break
+            else:
+                logger.warning(f'{value} não foi reconhecido por nenhum module')
+                continue
+
+            type, reference = received
+            items.append((m.id, type, reference))
+            urls.setdefault(m.id, []).append(value)
+
+        if not items:
+            return
+
+        saved = self.controller.write_entries(items)
         self.refresh()
 
+        # sem as entries salvas não há o que buscar
+        if not saved:
+            return
+
+        # os dados dos itens são buscados na hora, todos ao mesmo tempo, pela api assíncrona
+        # os jobs que a lista enfileirou pra eles terminam sem baixar nada de novo
+        bridge = self.get_async_bridge()
+        for module_id, module_urls in urls.items():
+            module = self.module_registry.get(module_id)
+            bridge.run(module.resolve_many(module_urls), lambda result, error, m=module_id: self.on_urls_resolved(m, result, error))
+
+    def on_urls_resolved(self, module_id: str, results: dict | None, error: BaseException | None):
+        if error is not None:
+            logger.error(f'erro ao buscar os itens inseridos: {error}')
+            return
+
+        # as rows são reconstruídas junto com as dos jobs terminados
+        for r in results.values():
+            if r is not None and r.get('data'):
+                self.finished_references.add((module_id, r['reference']))
+        self.jobs_timer.start()
+
     def action_change_collection(self, index):
         # obtém o caminho de um arquivo clicado na file tree
         # e se for uma collection válida, atualiza a visualização pra ela
@@ -275,9 +935,10 @@ class MainWindow(QMainWindow):
         #    return
 
         self.scol = dest
-        self.collection = Collection.from_file(self.scol)
+        self.collection = Collection.from_file(self.scol, self.vault)
         self.controller = Controller(self.collection) # tbm precisa ser atualizado
-        #cache.write_last_collection(dest)
+        self.watcher.watch_collection(self.scol)
+        self.global_cache.write_last_accessed_collection(dest)
 
         self.refresh()
     
@@ -302,7 +963,7 @@ class MainWindow(QMainWindow):
             self.model.setRootPath(root)
             self.file_tree.setRootIndex(self.model.index(root))
         
-        cache.write_last_root(Path(root))
+        self.global_cache.write_last_accessed_vault(Path(root))
     
     def action_create_collection(self):
         text, ok = QInputDialog.getText(
@@ -318,17 +979,41 @@ class MainWindow(QMainWindow):
                 output_directory=Path(self.root)
             )
 
+def find_initial_collection(root: Path, global_cache: GlobalCache) -> Path:
+    # a última collection aberta só vale se ela for desse vault
+    last = global_cache.last_accessed_collection
+    if last is not None and last.is_relative_to(root.resolve()):
+        return last
+
+    collections = sorted(root.glob('*.json'))
+    if collections:
+        return collections[0]
+
+    return root / 'untitled.json'
+
 def main():
     app = QApplication([])
 
-    file = Path('/mnt/seagate/workspace/coding/experimental/exp-sorted-py/testei/eumerlyteste.json')
-    #file = None
+    global_cache = GlobalCache()
+
+    root = global_cache.last_accessed_vault
+    if root is None:
+        picked = QFileDialog.getExistingDirectory(caption='Pick vault')
+        if not picked:
+            return
+        root = Path(picked)
+
+    file = find_initial_collection(root, global_cache)
 
-    root = Path('/mnt/seagate/workspace/coding/experimental/exp-sorted-py/testei')
+    # snapshot de outro vault ou collection não serve pra nada
+    snapshot = read_snapshot(global_cache.snapshot_file)
+    if snapshot is not None and not snapshot.matches(root, file):
+        snapshot = None
 
-    main_window = MainWindow(file, root)
+    main_window = MainWindow(file, root, snapshot)
     main_window.show()
 
     app.exec()
 
-main()
\ No newline at end of file
+if __name__ == '__main__':
+    main()
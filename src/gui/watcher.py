@@ -0,0 +1,145 @@
+from pathlib import Path
+
+from PyQt6.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+
+class VaultWatcher(QObject):
+    """
+    observa os arquivos de um vault e avisa quando algo foi alterado por fora
+
+    usa o QFileSystemWatcher (inotify no linux) pra observar o root do vault,
+    a collection aberta e os arquivos de cache dos modules dentro do .sorted
+
+    os eventos são agrupados por um debounce, então uma sequência de escritas
+    no mesmo arquivo (ex: um sync tool reescrevendo tudo) vira um único aviso
+
+    args:
+        root:
+            diretório raiz do vault
+
+        context:
+            diretório oculto do vault (.sorted)
+
+        debounce_ms:
+            tempo de espera sem novos eventos antes de avisar sobre as mudanças
+    """
+
+    collection_changed = pyqtSignal(object) # path da collection alterada
+    cache_changed = pyqtSignal(object) # path do arquivo de cache alterado
+
+    def __init__(self, root: Path, context: Path, debounce_ms: int = 250, parent: QObject | None = None):
+        super().__init__(parent)
+
+        self.root = root
+        self.context = context
+
+        # arquivos que devem ser observados, mesmo que ainda não existam
+        # alguns programas salvam escrevendo num arquivo temporário e renomeando,
+        # o que faz o inotify parar de observar o original
+        self.collection_file: Path | None = None
+        self.cache_files: set[Path] = set()
+
+        # último (mtime, tamanho) visto de cada arquivo
+        # serve pra ignorar eventos de diretório que não mudaram nada nos arquivos relevantes
+        self.stats: dict[Path, tuple[int, int] | None] = {}
+
+        self.pending: set[Path] = set()
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self.flush)
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.on_file_changed)
+        self.watcher.directoryChanged.connect(self.on_directory_changed)
+
+        self.add_path(self.root)
+        self.add_path(self.context)
+
+    def add_path(self, path: Path):
+        if path.exists() and str(path) not in self.watcher.files() + self.watcher.directories():
+            self.watcher.addPath(str(path))
+
+    def watch_collection(self, file: Path):
+        """
+        troca a collection observada pela nova collection aberta
+        """
+
+        if self.collection_file is not None and self.collection_file not in self.cache_files:
+            self.watcher.removePath(str(self.collection_file))
+
+        self.collection_file = file
+        self.stats[file] = self.get_stat(file)
+        self.add_path(file)
+
+    def watch_cache_files(self, files: list[Path]):
+        """
+        adiciona arquivos de cache de modules pra serem observados
+        o diretório pai também é observado, pra perceber quando o arquivo é recriado
+        """
+
+        for f in files:
+            self.cache_files.add(f)
+            self.stats[f] = self.get_stat(f)
+            self.add_path(f.parent)
+            self.add_path(f)
+
+    @staticmethod
+    def get_stat(file: Path) -> tuple[int, int] | None:
+        try:
+            stat = file.stat()
+        except FileNotFoundError:
+            return None
+
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def on_file_changed(self, path: str):
+        self.schedule(Path(path))
+
+    def on_directory_changed(self, path: str):
+        # um evento de diretório pode significar que um arquivo observado foi substituído
+        # então verifica quais arquivos conhecidos desse diretório mudaram de fato
+        directory = Path(path)
+
+        for f in self.known_files():
+            if f.parent == directory and self.get_stat(f) != self.stats.get(f):
+                self.schedule(f)
+
+    def known_files(self) -> list[Path]:
+        files = list(self.cache_files)
+        if self.collection_file is not None:
+            files.append(self.collection_file)
+
+        return files
+
+    def schedule(self, file: Path):
+        # reinicia o timer a cada evento, então só dispara depois que as escritas acabarem
+        self.pending.add(file)
+        self.timer.start()
+
+    def flush(self):
+        pending = self.pending
+        self.pending = set()
+
+        for f in pending:
+            stat = self.get_stat(f)
+            if stat == self.stats.get(f):
+                continue
+            self.stats[f] = stat
+
+            # se o arquivo foi substituído, o inotify perdeu ele e precisa ser readicionado
+            self.add_path(f)
+
+            if f in self.cache_files:
+                self.cache_changed.emit(f)
+            elif f == self.collection_file:
+                self.collection_changed.emit(f)
+
+    def acknowledge(self, file: Path):
+        """
+        marca o estado atual de um arquivo como já conhecido
+        usado depois de escritas feitas pela própria aplicação, que não precisam ser recarregadas
+        """
+
+        self.stats[file] = self.get_stat(file)
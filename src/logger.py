@@ -1,7 +1,10 @@
-from rich.console import Console
-from rich.text import Text
-from rich.markup import escape
-from rich.panel import Panel
+from .utils.lazy import lazy_import
+
+# o rich só é importado na primeira mensagem impressa
+rich_console = lazy_import('rich.console')
+rich_text = lazy_import('rich.text')
+rich_markup = lazy_import('rich.markup')
+rich_panel = lazy_import('rich.panel')
 
 def message_formatter(message, level: str = 'info', mode: str = 'panel', shorten: bool = True):
     lvl_colors = {
@@ -39,8 +42,8 @@ def message_formatter(message, level: str = 'info', mode: str = 'panel', shorten
     # iniciar a formatação da mensagem
     # escape é usado pra que o rich não reconheça caracteres do texto como parte da formatação
     # str é usado pra garantir que qualquer coisa seja printável
-    message = escape(str(message))
-    formatted = Text()
+    message = rich_markup.escape(str(message))
+    formatted = rich_text.Text()
 
     # se a mensagem tiver mais de uma linha, tratar essas linhas extras
     lines = message.splitlines()
@@ -58,7 +61,7 @@ def message_formatter(message, level: str = 'info', mode: str = 'panel', shorten
     printable = None
     if mode == 'panel':
         # o modo painel usa o panel do rich
-        panel = Panel(
+        panel = rich_panel.Panel(
             formatted,
             title=level,
             title_align='left',
@@ -73,16 +76,17 @@ def message_formatter(message, level: str = 'info', mode: str = 'panel', shorten
         # nesse modo, também deixa o indicador do level em negrito
         # além de adicionar uma separação entre o level e o texto
         handle_color = color + ' bold'
-        level_display = Text(level, handle_color)
+        level_display = rich_text.Text(level, handle_color)
         
-        text = Text()
+        text = rich_text.Text()
         text.append(level_display)
         text.append(' | ')
         text.append(formatted)
 
         printable = text
 
-    console = Console()
+    # os logs vão pro stderr, o stdout fica livre pra saída de dados (ex: ndjson da cli)
+    console = rich_console.Console(stderr=True)
     console.print(printable)
 
 def warning(message):
@@ -1,6 +1,8 @@
 from pathlib import Path
+from typing import Callable
 
 from ..utils.generic import ensure_directory, normalize_json_file
+from ..utils.file_lock import file_lock, LockTimeout
 from ..utils import json_io
 from .. import logger
 
@@ -55,7 +57,22 @@ class GlobalCache:
             dicionário com os dados armazenados no cache json
         """
         
-        return json_io.read_json(self.cache_file)
+        return json_io.read_json_locked(self.cache_file)
+
+    def _update(self, change: Callable[[dict], None]):
+        # a gui, a cli e o daemon escrevem no mesmo arquivo: a alteração é aplicada
+        # em cima do que está no disco agora, com o lock, e não em cima do que foi
+        # lido quando esse objeto foi criado, senão a escrita de um apagaria a do outro
+        try:
+            with file_lock(self.cache_file):
+                data = json_io.read_json(self.cache_file)
+                change(data)
+                json_io.write_json(self.cache_file, data)
+        except LockTimeout as err:
+            logger.error(str(err))
+            return
+
+        self.data = data
 
     @staticmethod
     def get_cache_dir() -> Path:
@@ -102,5 +119,121 @@ class GlobalCache:
             logger.error(f'{root} não é um diretório')
             return
         
-        self.data['last_accessed_vault'] = str(root.resolve())
-        json_io.write_json(self.cache_file, self.data)
\ No newline at end of file
+        path = str(root.resolve())
+        self._update(lambda data: data.update(last_accessed_vault=path))
+
+    @property
+    def last_accessed_collection(self) -> Path | None:
+        """
+        retorna a última collection aberta salva no cache global
+        verifica se o arquivo ainda existe antes de retornar
+        """
+
+        raw_path = self.data.get('last_accessed_collection')
+        if raw_path is None:
+            return
+
+        collection = Path(raw_path)
+        if not collection.is_file():
+            logger.error(f'{collection} não é um arquivo')
+            return
+
+        return collection
+
+    def write_last_accessed_collection(self, file: Path):
+        """
+        salva a última collection aberta no cache global
+
+        args:
+            file:
+                caminho do arquivo da collection
+        """
+
+        if not file.is_file():
+            logger.error(f'{file} não é um arquivo')
+            return
+
+        path = str(file.resolve())
+        self._update(lambda data: data.update(last_accessed_collection=path))
+
+    @property
+    def snapshot_file(self) -> Path:
+        """
+        retorna o arquivo do snapshot de inicialização da gui
+        """
+
+        return self.get_cache_dir() / 'snapshot.bin'
+
+    @property
+    def store_dir(self) -> Path:
+        """
+        retorna o diretório do store global de conteúdo, ver store.ContentStore
+        """
+
+        return self.get_cache_dir() / 'store'
+
+    @property
+    def content_store_enabled(self) -> bool:
+        """
+        retorna se os vaults compartilham os metadados e as thumbnails pelo store global
+        """
+
+        return bool(self.data.get('content_store', False))
+
+    def write_content_store_enabled(self, enabled: bool):
+        """
+        liga ou desliga o store global de conteúdo
+        vale pros processos abertos depois disso, os que já estão rodando continuam como estavam
+        """
+
+        self._update(lambda data: data.update(content_store=enabled))
+
+    @property
+    def compression(self) -> dict[str, str]:
+        """
+        retorna o formato de compressão escolhido pra cada tipo de arquivo (ver COMPRESSION_KINDS)
+        tipos que não estão aqui mantêm o formato que o arquivo já tem
+        """
+
+        return dict(self.data.get('compression', {}))
+
+    def write_compression(self, kind: str, codec: str | None):
+        """
+        escolhe o formato de compressão de um tipo de arquivo, ou volta pro padrão com None
+        vale pras próximas escritas, os arquivos que já existem só mudam quando forem reescritos
+        """
+
+        if kind not in COMPRESSION_KINDS or (codec is not None and codec not in json_io.CODECS):
+            logger.error(f'compressão inválida: {kind}={codec}')
+            return
+
+        def change(data: dict):
+            compression = data.setdefault('compression', {})
+            if codec is None:
+                compression.pop(kind, None)
+            else:
+                compression[kind] = codec
+
+        self._update(change)
+
+
+# tipos de arquivo com formato de compressão configurável
+COMPRESSION_KINDS = ('videos', 'collections')
+
+# formatos escolhidos no cache global, lidos uma vez por processo
+_compression: dict[str, str] | None = None
+
+def get_compression(kind: str) -> str | None:
+    """
+    retorna o formato de compressão escolhido pra um tipo de arquivo
+
+    returns:
+        'plain', 'gzip', 'zstd' ou None, se o arquivo deve manter o formato que já tem
+    """
+
+    global _compression
+
+    if _compression is None:
+        _compression = GlobalCache().compression
+
+    return _compression.get(kind)
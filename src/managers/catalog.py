@@ -0,0 +1,249 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+import sqlite3
+import threading
+
+
+# as datas e os autores ficam com uma contagem por valor, e não só o mínimo, o máximo
+# ou o total de autores distintos. assim apagar uma entry também é O(1): o mínimo e o
+# máximo saem do índice da chave primária, sem precisar percorrer as entries que sobraram
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS stats (
+    collection_id TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    total_duration INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS uploaders (
+    collection_id TEXT NOT NULL,
+    uploader TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (collection_id, uploader)
+);
+
+CREATE TABLE IF NOT EXISTS dates (
+    collection_id TEXT NOT NULL,
+    upload_date TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (collection_id, upload_date)
+);
+'''
+
+
+@dataclass
+class CollectionStats:
+    """
+    totais de uma collection exibidos no cabeçalho da gui
+
+    as datas ficam no formato do yt-dlp (yyyymmdd), e são None
+    se nenhuma entry da collection tiver dados
+    """
+
+    count: int = 0
+    total_duration: int = 0
+    first_upload_date: str | None = None
+    last_upload_date: str | None = None
+    uploaders: dict[str, int] = field(default_factory=dict) # autor -> quantidade de entries
+
+    @property
+    def unique_uploaders(self):
+        return len(self.uploaders)
+
+
+class VaultCatalog:
+    """
+    totais persistentes de cada collection do vault
+
+    cada entry contribui com os dados retornados por Module.entry_stats
+    (duração, data de upload, autor). inserir ou apagar uma entry só soma ou
+    subtrai a contribuição dela, então o cabeçalho não precisa ler todos os vídeos
+    da collection a cada atualização
+
+    os totais de uma collection só são recalculados do zero com recompute,
+    quando ela ainda não tem nenhum ou quando os dados de um item mudam no cache
+
+    args:
+        file:
+            arquivo sqlite do catálogo, normalmente dentro do .sorted
+    """
+
+    def __init__(self, file: Path):
+        self.file = file
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.file, check_same_thread=False, timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    @staticmethod
+    def _summarize(stats: list[dict | None]) -> tuple[int, dict[str, int], dict[str, int]]:
+        # junta as contribuições de várias entries: duração total e contagem por autor e por data
+        total_duration = 0
+        uploaders = {}
+        dates = {}
+
+        for s in stats:
+            s = s or {}
+            total_duration += s.get('duration') or 0
+
+            if s.get('uploader'):
+                uploaders[s['uploader']] = uploaders.get(s['uploader'], 0) + 1
+            if s.get('upload_date'):
+                dates[s['upload_date']] = dates.get(s['upload_date'], 0) + 1
+
+        return total_duration, uploaders, dates
+
+    def _apply(self, collection_id: str, stats: list[dict | None], sign: int) -> bool:
+        # precisa rodar dentro de uma transação
+        # sign é 1 pra somar a contribuição das entries e -1 pra subtrair
+        # as contribuições são somadas antes, então um lote custa poucas queries, não várias por entry
+        total_duration, uploaders, dates = self._summarize(stats)
+
+        updated = self.connection.execute(
+            'UPDATE stats SET count = count + ?, total_duration = total_duration + ? WHERE collection_id = ?',
+            (sign * len(stats), sign * total_duration, collection_id)
+        ).rowcount
+
+        # uma collection que nunca foi calculada não tem de onde partir
+        # os totais dela vão ser montados do zero no próximo recompute
+        if not updated:
+            return False
+
+        for table, column, counts in [('uploaders', 'uploader', uploaders), ('dates', 'upload_date', dates)]:
+            if not counts:
+                continue
+
+            self.connection.executemany(
+                f'INSERT INTO {table} VALUES (?, ?, ?) '
+                f'ON CONFLICT (collection_id, {column}) DO UPDATE SET count = count + excluded.count',
+                [(collection_id, value, sign * count) for value, count in counts.items()]
+            )
+
+            # só uma subtração pode zerar uma contagem
+            if sign < 0:
+                self.connection.executemany(
+                    f'DELETE FROM {table} WHERE collection_id = ? AND {column} = ? AND count <= 0',
+                    [(collection_id, value) for value in counts]
+                )
+
+        return True
+
+    def add(self, collection_id: str, stats: dict | None):
+        """
+        soma a contribuição de uma entry inserida na collection
+
+        args:
+            stats:
+                dados da entry vindos de Module.entry_stats, None se não houver
+                a entry ainda conta no total de entries
+        """
+
+        self.add_many(collection_id, [stats])
+
+    def add_many(self, collection_id: str, stats: list[dict | None]):
+        """
+        soma a contribuição de várias entries numa única transação
+        """
+
+        with self.lock, self.connection:
+            self._apply(collection_id, stats, 1)
+
+    def remove(self, collection_id: str, stats: dict | None):
+        """
+        subtrai a contribuição de uma entry apagada da collection
+        """
+
+        self.remove_many(collection_id, [stats])
+
+    def remove_many(self, collection_id: str, stats: list[dict | None]):
+        """
+        subtrai a contribuição de várias entries numa única transação
+        """
+
+        with self.lock, self.connection:
+            self._apply(collection_id, stats, -1)
+
+    def replace(self, collection_id: str, old: dict | None, new: dict | None, times: int = 1):
+        """
+        troca a contribuição antiga de um item pela nova, numa única transação
+
+        args:
+            times:
+                quantidade de entries da collection que apontam pro item
+        """
+
+        with self.lock, self.connection:
+            if self._apply(collection_id, [old] * times, -1):
+                self._apply(collection_id, [new] * times, 1)
+
+    def recompute(self, collection_id: str, stats: list[dict | None]):
+        """
+        substitui os totais de uma collection pelos calculados a partir de todas as entries
+
+        args:
+            stats:
+                dados de cada entry da collection, vindos de Module.entry_stats
+        """
+
+        total_duration, uploaders, dates = self._summarize(stats)
+
+        with self.lock, self.connection:
+            self._forget(collection_id)
+
+            self.connection.execute(
+                'INSERT INTO stats VALUES (?, ?, ?)',
+                (collection_id, len(stats), total_duration)
+            )
+            self.connection.executemany(
+                'INSERT INTO uploaders VALUES (?, ?, ?)',
+                [(collection_id, u, c) for u, c in uploaders.items()]
+            )
+            self.connection.executemany(
+                'INSERT INTO dates VALUES (?, ?, ?)',
+                [(collection_id, d, c) for d, c in dates.items()]
+            )
+
+    def _forget(self, collection_id: str):
+        for table in ('stats', 'uploaders', 'dates'):
+            self.connection.execute(f'DELETE FROM {table} WHERE collection_id = ?', (collection_id,))
+
+    def forget(self, collection_id: str):
+        """
+        descarta os totais de uma collection
+        o próximo get retorna None e eles precisam ser recalculados
+        """
+
+        with self.lock, self.connection:
+            self._forget(collection_id)
+
+    def get(self, collection_id: str) -> CollectionStats | None:
+        """
+        retorna os totais de uma collection
+
+        returns:
+            CollectionStats ou None se eles ainda não foram calculados
+        """
+
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT count, total_duration FROM stats WHERE collection_id = ?', (collection_id,)
+            ).fetchone()
+            if row is None:
+                return
+
+            first, last = self.connection.execute(
+                'SELECT min(upload_date), max(upload_date) FROM dates WHERE collection_id = ?',
+                (collection_id,)
+            ).fetchone()
+
+            uploaders = dict(self.connection.execute(
+                'SELECT uploader, count FROM uploaders WHERE collection_id = ?', (collection_id,)
+            ).fetchall())
+
+        return CollectionStats(
+            count=row[0],
+            total_duration=row[1],
+            first_upload_date=first,
+            last_upload_date=last,
+            uploaders=uploaders
+        )
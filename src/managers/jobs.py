@@ -0,0 +1,443 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from .. import logger
+
+if TYPE_CHECKING:
+    from .models import ModuleRegistry
+
+
+# os jobs terminados são apagados, então a tabela só guarda o que falta fazer
+# e os que esgotaram as tentativas (status 'failed'), pra poderem ser consultados
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    module TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    claimed_by INTEGER,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, priority DESC, available_at, id);
+'''
+
+# espera antes de cada nova tentativa: BACKOFF_BASE * 2^(tentativas - 1), até BACKOFF_MAX
+BACKOFF_BASE = 5
+BACKOFF_MAX = 60 * 60
+
+MAX_ATTEMPTS = 5
+
+
+@dataclass
+class Job:
+    """
+    um trabalho de rede pendente (ex: baixar os metadados ou a thumbnail de um vídeo)
+
+    quem executa é o module dono do job, por Module.run_jobs
+    """
+
+    id: int
+    key: str # identifica o trabalho, o mesmo key nunca fica duas vezes na fila
+    module: str
+    kind: str # tipo do trabalho dentro do module (ex: 'metadata', 'thumbnail')
+    payload: dict = field(default_factory=dict) # 'reference' é o item que o job atualiza (ex: id do vídeo)
+    priority: int = 0
+    attempts: int = 0 # tentativas já feitas, contando a atual
+    max_attempts: int = MAX_ATTEMPTS
+    last_error: str | None = None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+class JobQueue:
+    """
+    fila persistente dos trabalhos de rede do vault
+
+    os jobs ficam num sqlite dentro do .sorted, então o que estava na fila continua lá
+    se o app fechar, e é retomado na próxima vez que uma JobRunner rodar
+
+    cada job tem uma prioridade (maior sai primeiro) e um key: enfileirar um key que
+    já está na fila só aumenta a prioridade do que existe. um job que falha volta
+    pra fila com uma espera que dobra a cada tentativa, até esgotar as tentativas
+
+    args:
+        file:
+            arquivo sqlite da fila, normalmente dentro do .sorted
+    """
+
+    def __init__(self, file: Path):
+        self.file = file
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.file, check_same_thread=False, timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+        # avisa as JobRunner desse processo que um job novo entrou, sem esperar o próximo ciclo
+        self.changed = threading.Event()
+
+    @staticmethod
+    def _from_row(row) -> Job:
+        return Job(
+            id=row[0],
+            key=row[1],
+            module=row[2],
+            kind=row[3],
+            payload=json.loads(row[4]),
+            priority=row[5],
+            attempts=row[6],
+            max_attempts=row[7],
+            last_error=row[8]
+        )
+
+    def enqueue(self, module: str, kind: str, payload: dict, key: str | None = None, priority: int = 0):
+        """
+        coloca um job na fila
+
+        args:
+            key:
+                identifica o trabalho. o padrão é 'module:kind:payload'
+                um job com o mesmo key que já esteja na fila não é duplicado, só fica
+                com a maior das duas prioridades. um que tenha falhado de vez volta pra fila
+
+            priority:
+                jobs com prioridade maior são executados antes
+        """
+
+        self.enqueue_many(module, kind, [payload], [key] if key else None, priority)
+
+    def enqueue_many(
+        self,
+        module: str,
+        kind: str,
+        payloads: list[dict],
+        keys: list[str] | None = None,
+        priority: int = 0
+    ):
+        """
+        coloca vários jobs do mesmo tipo na fila, numa única transação
+        """
+
+        if not payloads:
+            return
+
+        now = time.time()
+        rows = []
+        for n, payload in enumerate(payloads):
+            data = json.dumps(payload, sort_keys=True)
+            key = keys[n] if keys else f'{module}:{kind}:{data}'
+            rows.append((key, module, kind, data, priority, MAX_ATTEMPTS, now, now))
+
+        # no update, 'status' e 'attempts' ainda são os valores antigos da linha
+        with self.lock, self.connection:
+            self.connection.executemany(
+                '''
+                INSERT INTO jobs (key, module, kind, payload, priority, max_attempts, available_at, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    priority = max(priority, excluded.priority),
+                    attempts = CASE WHEN status = 'failed' THEN 0 ELSE attempts END,
+                    available_at = CASE WHEN status = 'failed' THEN excluded.available_at ELSE available_at END,
+                    status = CASE WHEN status = 'failed' THEN 'pending' ELSE status END
+                ''',
+                rows
+            )
+
+        self.changed.set()
+
+    def claim(self, limit: int = 1) -> list[Job]:
+        """
+        pega os próximos jobs disponíveis e marca eles como em andamento por esse processo
+
+        a seleção e a marcação são uma única query, então dois processos
+        consultando a mesma fila nunca pegam o mesmo job
+
+        returns:
+            até limit jobs, da maior prioridade pra menor
+        """
+
+        with self.lock, self.connection:
+            rows = self.connection.execute(
+                '''
+                UPDATE jobs SET status = 'running', attempts = attempts + 1, claimed_by = ?
+                WHERE id IN (
+                    SELECT id FROM jobs
+                    WHERE status = 'pending' AND available_at <= ?
+                    ORDER BY priority DESC, id
+                    LIMIT ?
+                )
+                RETURNING id, key, module, kind, payload, priority, attempts, max_attempts, last_error
+                ''',
+                (os.getpid(), time.time(), limit)
+            ).fetchall()
+
+        # o RETURNING não garante a ordem do SELECT
+        jobs = [self._from_row(r) for r in rows]
+        jobs.sort(key=lambda j: (-j.priority, j.id))
+
+        return jobs
+
+    def complete(self, job_ids: list[int]):
+        """
+        tira da fila os jobs que terminaram
+        """
+
+        with self.lock, self.connection:
+            self.connection.executemany('DELETE FROM jobs WHERE id = ?', [(i,) for i in job_ids])
+
+    def fail(self, job: Job, error: str):
+        """
+        devolve um job que falhou pra fila, com uma espera antes da próxima tentativa
+        se ele já esgotou as tentativas, fica marcado como 'failed' e não roda mais
+        """
+
+        if job.attempts >= job.max_attempts:
+            status, available_at = 'failed', time.time()
+        else:
+            # o fator aleatório espalha as novas tentativas de jobs que falharam juntos
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (job.attempts - 1)) * random.uniform(0.5, 1)
+            status, available_at = 'pending', time.time() + delay
+
+        with self.lock, self.connection:
+            self.connection.execute(
+                'UPDATE jobs SET status = ?, available_at = ?, last_error = ?, claimed_by = NULL WHERE id = ?',
+                (status, available_at, error, job.id)
+            )
+
+        if status == 'pending':
+            logger.warning(f'job {job.key} falhou ({error}), tentativa {job.attempts} de {job.max_attempts}')
+        else:
+            logger.error(f'job {job.key} falhou ({error}) e esgotou as tentativas')
+
+    def recover(self) -> int:
+        """
+        devolve pra fila os jobs que estavam em andamento num processo que não existe mais
+        (ex: o app fechou ou caiu no meio de um download)
+
+        a tentativa interrompida não conta como falha
+
+        returns:
+            quantidade de jobs devolvidos
+        """
+
+        with self.lock, self.connection:
+            owners = [r[0] for r in self.connection.execute(
+                "SELECT DISTINCT claimed_by FROM jobs WHERE status = 'running'"
+            )]
+            dead = [(p,) for p in owners if p is None or not _pid_alive(p)]
+
+            recovered = 0
+            for (pid,) in dead:
+                recovered += self.connection.execute(
+                    "UPDATE jobs SET status = 'pending', attempts = max(attempts - 1, 0), claimed_by = NULL "
+                    "WHERE status = 'running' AND claimed_by IS ?",
+                    (pid,)
+                ).rowcount
+
+        if recovered:
+            self.changed.set()
+
+        return recovered
+
+    def next_available_at(self) -> float | None:
+        """
+        retorna quando o próximo job pendente fica disponível (timestamp), None se não houver nenhum
+        """
+
+        with self.lock:
+            return self.connection.execute(
+                "SELECT min(available_at) FROM jobs WHERE status = 'pending'"
+            ).fetchone()[0]
+
+    def counts(self) -> dict[str, int]:
+        """
+        retorna a quantidade de jobs por status ('pending', 'running', 'failed')
+        """
+
+        with self.lock:
+            return dict(self.connection.execute('SELECT status, count(*) FROM jobs GROUP BY status').fetchall())
+
+    def failed(self) -> list[Job]:
+        """
+        retorna os jobs que esgotaram as tentativas
+        """
+
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT id, key, module, kind, payload, priority, attempts, max_attempts, last_error '
+                "FROM jobs WHERE status = 'failed' ORDER BY id"
+            ).fetchall()
+
+        return [self._from_row(r) for r in rows]
+
+class JobRunner:
+    """
+    executa os jobs da fila do vault em segundo plano
+
+    cada worker pega um lote de jobs, separa por module e entrega cada grupo
+    pro Module.run_jobs do dono. o que terminou sai da fila, o que falhou volta
+    com backoff. jobs que ficaram em andamento quando o processo anterior fechou
+    são retomados no start
+
+    args:
+        queue:
+            fila de onde os jobs são lidos
+
+        registry:
+            modules que executam os jobs, pelo id
+
+        workers:
+            quantidade de lotes executados ao mesmo tempo
+
+        batch_size:
+            quantidade de jobs pegos por vez por cada worker
+
+        on_done:
+            opcional. chamado com (job, erro) depois de cada job, erro é None se deu certo
+            roda na thread do worker
+    """
+
+    # intervalo máximo entre duas consultas da fila, pra ver jobs enfileirados por outros processos
+    POLL_INTERVAL = 2.0
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        registry: 'ModuleRegistry',
+        workers: int = 2,
+        batch_size: int = 16,
+        on_done: Callable[[Job, str | None], None] | None = None
+    ):
+        self.queue = queue
+        self.registry = registry
+        self.workers = workers
+        self.batch_size = batch_size
+        self.on_done = on_done
+
+        self.stopping = threading.Event()
+        self.threads: list[threading.Thread] = []
+
+    def run_batch(self) -> int:
+        """
+        pega e executa um lote de jobs na thread atual
+
+        returns:
+            quantidade de jobs executados, 0 se não havia nenhum disponível
+        """
+
+        jobs = self.queue.claim(self.batch_size)
+
+        groups: dict[str, list[Job]] = {}
+        for j in jobs:
+            groups.setdefault(j.module, []).append(j)
+
+        for module_id, group in groups.items():
+            module = self.registry.get(module_id)
+            if module is None:
+                results = {j.id: f'module {module_id} não carregado' for j in group}
+            else:
+                try:
+                    results = module.run_jobs(group)
+                except Exception as err:
+                    results = {j.id: str(err) or type(err).__name__ for j in group}
+
+            done = []
+            for j in group:
+                error = results.get(j.id)
+                if error is None:
+                    done.append(j.id)
+                else:
+                    self.queue.fail(j, error)
+
+            self.queue.complete(done)
+
+            if self.on_done is not None:
+                for j in group:
+                    self.on_done(j, results.get(j.id))
+
+        return len(jobs)
+
+    def _wait(self):
+        # dorme até o próximo job ficar disponível, um job novo entrar ou o runner parar
+        next_at = self.queue.next_available_at()
+        timeout = self.POLL_INTERVAL if next_at is None else min(self.POLL_INTERVAL, max(next_at - time.time(), 0.05))
+
+        self.queue.changed.wait(timeout)
+        self.queue.changed.clear()
+
+    def _loop(self):
+        while not self.stopping.is_set():
+            try:
+                ran = self.run_batch()
+            except Exception as err:
+                logger.error(f'erro ao executar os jobs: {err}')
+                ran = 0
+
+            if not ran:
+                self._wait()
+
+    def start(self):
+        """
+        retoma os jobs interrompidos e começa a executar a fila em segundo plano
+        """
+
+        self.queue.recover()
+
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f'jobs-{n}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self, wait: bool = True):
+        """
+        para os workers depois do lote atual
+        os jobs que não chegaram a ser pegos continuam na fila pra próxima vez
+        """
+
+        self.stopping.set()
+        self.queue.changed.set()
+
+        if wait:
+            for t in self.threads:
+                t.join()
+        self.threads.clear()
+
+    def run_until_idle(self):
+        """
+        executa a fila na thread atual até não sobrar nenhum job pendente
+        jobs esperando o backoff de uma falha são esperados também
+        """
+
+        self.queue.recover()
+
+        while not self.stopping.is_set():
+            if self.run_batch():
+                continue
+
+            if self.queue.next_available_at() is None:
+                return
+
+            self._wait()
@@ -1,11 +1,21 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Callable
+import os
 
 from ..utils.generic import ensure_directory, normalize_json_file
+from ..utils.file_lock import file_lock, get_lock_file, LockTimeout
 from ..utils import json_io
-from .cache import VaultCache
+from .. import logger
+from .cache import VaultCache, get_compression
+from .references import ReferenceIndex
+from .catalog import VaultCatalog, CollectionStats
+from .jobs import JobQueue, Job
 
 
+# extensões dos arquivos de collection (ver Collection.from_file)
+COLLECTION_SUFFIXES = ('.json', '.scol')
+
 class Vault:
     """
     representa um vault de trabalho e gerencia sua estrutura interna
@@ -33,6 +43,116 @@ class Vault:
         ensure_directory(self.context)
 
         self.cache = VaultCache(self.context)
+
+        self._references = None
+        self._catalog = None
+        self._jobs = None
+
+        # modules carregados nesse vault, indexados pelo id
+        # cada Module se registra aqui quando é criado
+        self.modules: dict[str, 'Module'] = {}
+    
+    @property
+    def references(self) -> ReferenceIndex:
+        """
+        retorna o índice de referências do vault (quais collections contêm cada item)
+        o banco só é aberto no primeiro acesso
+        """
+
+        if self._references is None:
+            self._references = ReferenceIndex(self.context / 'references.sqlite')
+
+        return self._references
+
+    @property
+    def catalog(self) -> VaultCatalog:
+        """
+        retorna o catálogo do vault, com os totais de cada collection
+        o banco só é aberto no primeiro acesso
+        """
+
+        if self._catalog is None:
+            self._catalog = VaultCatalog(self.context / 'catalog.sqlite')
+
+        return self._catalog
+
+    @property
+    def jobs(self) -> JobQueue:
+        """
+        retorna a fila persistente dos trabalhos de rede do vault
+        o banco só é aberto no primeiro acesso
+        """
+
+        if self._jobs is None:
+            self._jobs = JobQueue(self.context / 'jobs.sqlite')
+
+        return self._jobs
+
+    def collection_files(self) -> list[Path]:
+        """
+        retorna os arquivos do vault que podem ser collections, em qualquer subdiretório
+
+        o conteúdo não é lido: outros json (configs, listas) também entram,
+        e quem lê os arquivos ignora os que não têm entries
+        """
+
+        files = []
+        for directory, directories, names in os.walk(self.root):
+            # o .sorted guarda cache e arquivos internos (milhares de thumbnails), nada ali é collection
+            directories[:] = [d for d in directories if d != '.sorted']
+            files += [Path(directory, n) for n in names if os.path.splitext(n)[1] in COLLECTION_SUFFIXES]
+
+        return files
+
+    def entry_stats(self, entry: 'Entry') -> dict | None:
+        """
+        retorna a contribuição de uma entry pros totais da collection
+        None se o module dela não estiver carregado ou não tiver dados locais
+        """
+
+        module = self.modules.get(entry.module)
+        if module is None:
+            return
+
+        return module.entry_stats(entry)
+
+    def update_stats(self, module: str, type: str, reference: str, old: dict | None, new: dict | None):
+        """
+        troca a contribuição de um item em todas as collections que têm ele
+        usado quando um item aparece no cache pela primeira vez, sem recalcular as collections inteiras
+
+        args:
+            old:
+                contribuição com que o item estava contado, None se ele não tinha dados
+
+            new:
+                contribuição atual do item
+        """
+
+        for collection_id, entry_ids in self.references.lookup(module, type, reference).items():
+            self.catalog.replace(collection_id, old, new, len(entry_ids))
+
+    def recompute_stats(self, module: str, type: str, references: list[str]):
+        """
+        recalcula do zero os totais de todas as collections que têm algum dos itens
+        usado quando os dados desses itens mudam no cache
+
+        args:
+            references:
+                referências (ex: ids de vídeos) cujos dados mudaram
+        """
+
+        collection_ids = set()
+        for r in references:
+            collection_ids |= self.references.lookup(module, type, r).keys()
+
+        for i in collection_ids:
+            file = self.references.collection_file(i)
+            if file is None or not file.is_file():
+                self.catalog.forget(i)
+                continue
+
+            Collection.from_file(file, self).recompute_stats()
     
     @property
     def modules_dir(self):
@@ -67,6 +187,24 @@ class Vault:
         
         return self.context / normalize_json_file('cache')
 
+    def get_lock_file(self, file: Path) -> Path:
+        """
+        retorna o arquivo de lock de um arquivo do vault (ver utils.file_lock)
+        os locks ficam no .sorted, então as pastas das collections não ganham arquivos ocultos
+
+        args:
+            file:
+                arquivo protegido. um arquivo fora do vault usa o lock padrão, ao lado dele
+        """
+
+        try:
+            relative = file.resolve().relative_to(self.root.resolve())
+        except ValueError:
+            return get_lock_file(file)
+
+        # um lock por arquivo, com o caminho relativo achatado no nome
+        return self.context / 'locks' / ('%'.join(relative.parts) + '.lock')
+
 
 @dataclass
 class Entry:
@@ -100,11 +238,94 @@ class Entry:
         }
 
 
+@dataclass
+class EntryDiff:
+    """
+    diferença entre dois estados das entries de uma collection
+
+    cada lista guarda só os ids das entries, quem for usar isso
+    busca os dados completos na collection mais nova
+    """
+
+    added: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+
+    @property
+    def is_empty(self):
+        return not (self.added or self.removed or self.changed)
+
+
+def get_file_version(file: Path) -> tuple[int, int, int] | None:
+    """
+    retorna um token que muda a cada escrita do arquivo, sem precisar ler ele
+
+    o json_io troca o arquivo inteiro com os.replace, então o inode muda em toda escrita
+    feita por ele. o mtime e o tamanho pegam editores que reescrevem o arquivo no lugar
+
+    returns:
+        (mtime em ns, tamanho, inode) ou None se o arquivo não existir
+    """
+
+    try:
+        stat = os.stat(file)
+    except FileNotFoundError:
+        return None
+
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+def merge_entries(base: dict[str, 'Entry'], ours: dict[str, 'Entry'], theirs: dict[str, 'Entry']) -> tuple[dict[str, 'Entry'], int]:
+    """
+    junta as alterações feitas em memória com as feitas no arquivo por fora, entry por entry
+
+    pra cada id, o lado que mudou em relação à base vence. se os dois mudaram a mesma entry
+    (ou um apagou e o outro alterou), vale a versão da memória, que é a escrita em andamento
+
+    args:
+        base:
+            entries quando a memória e o arquivo estavam iguais pela última vez
+
+        ours:
+            entries em memória, já com a alteração que vai ser escrita
+
+        theirs:
+            entries que estão no arquivo agora
+
+    returns:
+        tupla (entries juntas, quantidade de entries alteradas pelos dois lados)
+        a ordem é a do arquivo, com as entries novas da memória no final
+    """
+
+    merged = {}
+    conflicts = 0
+
+    for i in [*theirs, *(i for i in ours if i not in theirs)]:
+        b, o, t = base.get(i), ours.get(i), theirs.get(i)
+
+        if o == b:
+            entry = t
+        elif t == b:
+            entry = o
+        else:
+            entry = o
+            conflicts += o != t
+
+        if entry is not None:
+            merged[i] = entry
+
+    return merged, conflicts
+
+
 @dataclass
 class Collection:
     """
     representa uma collection carregada de um arquivo
     essa estrutura agrupa entries e metadados associados
+
+    as escritas não sobrescrevem o arquivo às cegas: a collection lembra a versão do arquivo
+    (ver get_file_version) e as entries de quando ele foi lido ou escrito por ela. se o arquivo
+    mudou desde então (outro processo, um editor), as alterações dos dois lados são juntadas
+    com merge_entries antes da escrita
     """
 
     id: str
@@ -113,6 +334,22 @@ class Collection:
     entries: dict[str, Entry]
     file: Path
 
+    # vault ao qual a collection pertence. se for passado, as escritas
+    # mantêm o índice de referências dele atualizado
+    vault: Vault | None = field(default=None, repr=False, compare=False)
+
+    # versão do arquivo quando as entries foram lidas ou escritas pela última vez
+    # None pra uma collection que não veio do arquivo (ex: do snapshot da gui),
+    # aí a primeira escrita sempre compara com o que está no disco
+    _version: tuple[int, int, int] | None = field(default=None, init=False, repr=False, compare=False)
+
+    # entries nesse mesmo momento, a base do merge
+    # a cópia é rasa: as entries são substituídas, nunca alteradas no lugar
+    _base: dict[str, Entry] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._base = dict(self.entries)
+
     @property
     def name(self):
         """
@@ -131,13 +368,16 @@ class Collection:
         return len(self.entries)
 
     @classmethod
-    def from_dict(cls, data: dict, file: Path):
+    def from_dict(cls, data: dict, file: Path, vault: Vault | None = None):
         """
         cria uma collection a partir de um dicionário
 
         args:
             data:
                 dicionário contendo os dados da collection e suas entries
+
+            vault:
+                opcional. vault onde a collection está, usado pra manter o índice de referências
         """
         
         entries = { }
@@ -150,13 +390,13 @@ class Collection:
             version=data.get('version'),
             created_at=data.get('created_at'),
             entries=entries,
-            file=file
+            file=file,
+            vault=vault
         )
 
-    def to_dict(self):
-        entries = {}
-        for e in self.entries.values():
-            entries[e.id] = e.to_dict()
+    def to_dict(self, entries: dict[str, Entry] | None = None):
+        # entries diferentes das da memória servem pra escrever um estado antes de aplicar ele
+        entries = {e.id: e.to_dict() for e in (self.entries if entries is None else entries).values()}
 
         return {
             'id': self.id,
@@ -165,8 +405,16 @@ class Collection:
             'entries': entries
         }
     
+    @property
+    def lock_file(self) -> Path:
+        """
+        retorna o arquivo de lock da collection, um por arquivo de collection
+        """
+
+        return self.vault.get_lock_file(self.file) if self.vault is not None else get_lock_file(self.file)
+
     @classmethod
-    def from_file(cls, file: Path):
+    def from_file(cls, file: Path, vault: Vault | None = None):
         """
         carrega uma collection a partir de um arquivo
         esse arquivo deve ser um json (com extensão .json ou .scol)
@@ -174,22 +422,216 @@ class Collection:
         args:
             file:
                 caminho do arquivo de collection
+
+            vault:
+                opcional. vault onde a collection está, usado pra manter o índice de referências
         """
         
         # TODO: validação mais rigorosa com base na chave type
-        data = json_io.read_json(file)
-        return cls.from_dict(data, file)
+        lock_file = vault.get_lock_file(file) if vault is not None else None
+
+        # a versão é lida antes do conteúdo: uma escrita entre os dois só causa um merge
+        # desnecessário depois, enquanto o contrário deixaria essa escrita passar despercebida
+        version = get_file_version(file)
+        data = json_io.read_json_locked(file, lock_file)
+
+        collection = cls.from_dict(data, file, vault)
+        collection._version = version
+        return collection
     
-    def write_entry(self, entry: Entry):
-        # atualiza a memória primeiro, inserindo a entry nova
-        self.entries[entry.id] = entry
+    def diff(self, other: 'Collection') -> EntryDiff:
+        """
+        compara as entries dessa collection com as de outra versão dela
+        usado pra atualizar só o que mudou quando o arquivo é alterado por fora
+
+        args:
+            other:
+                versão mais nova da mesma collection
+
+        returns:
+            EntryDiff com os ids adicionados, removidos e alterados
+        """
+
+        old_ids = self.entries.keys()
+        new_ids = other.entries.keys()
+
+        # a ordem de inserção da collection nova é mantida pras adicionadas
+        added = [i for i in new_ids if i not in old_ids]
+        removed = [i for i in old_ids if i not in new_ids]
+        changed = [
+            i for i in new_ids
+            if i in old_ids and self.entries[i] != other.entries[i]
+        ]
+
+        return EntryDiff(added=added, removed=removed, changed=changed)
+
+    @property
+    def is_indexed(self):
+        # collections sem id não têm como ser referenciadas no índice
+        return self.vault is not None and self.id is not None
+
+    def contains_reference(self, module: str, type: str, reference: str) -> bool:
+        """
+        verifica se algum item dessa collection já aponta pra uma referência
+        usa o índice do vault quando possível, sem percorrer as entries
+        """
+
+        if self.is_indexed:
+            return self.vault.references.contains(module, type, reference, self.id)
+
+        return any(
+            e.module == module and e.type == type and e.reference == reference
+            for e in self.entries.values()
+        )
+
+    def get_stats(self) -> CollectionStats | None:
+        """
+        retorna os totais da collection guardados no catálogo do vault
+        se eles ainda não existirem, são calculados uma vez a partir de todas as entries
+
+        returns:
+            CollectionStats ou None se a collection não pertencer a um vault
+        """
+
+        if not self.is_indexed:
+            return
+
+        stats = self.vault.catalog.get(self.id)
+        if stats is None:
+            self.recompute_stats()
+            stats = self.vault.catalog.get(self.id)
 
-        # converte os dados já atualizados e reescreve eles
-        json_io.write_json(self.file, self.to_dict())
+        return stats
+
+    def recompute_stats(self):
+        """
+        recalcula do zero os totais da collection no catálogo do vault
+        """
+
+        if self.is_indexed:
+            self.vault.catalog.recompute(self.id, [self.vault.entry_stats(e) for e in self.entries.values()])
+
+    def _write(self, change: Callable[[dict[str, Entry]], None]) -> tuple[bool, bool]:
+        """
+        aplica uma alteração nas entries e reescreve o arquivo, com o lock dele
+
+        se o arquivo mudou desde a última leitura ou escrita dessa collection, as entries
+        dele são juntadas com as da memória antes, então uma edição externa não é apagada.
+        a memória só recebe o estado novo depois que ele foi salvo no arquivo
+
+        returns:
+            tupla (salvou, juntou). salvou é False se o lock não saiu ou a escrita falhou,
+            aí nada mudou nem na memória nem no arquivo. juntou é True se entries do arquivo
+            entraram no merge (os índices do vault precisam ser sincronizados com a collection inteira)
+        """
+
+        entries = dict(self.entries)
+        change(entries)
+
+        try:
+            with file_lock(self.file, lock_file=self.lock_file):
+                merged = False
+                version = get_file_version(self.file)
+
+                if version is not None and version != self._version:
+                    data = json_io.read_json(self.file)
+                    theirs = data.get('entries')
+
+                    # um arquivo ilegível não tem o que juntar, a memória é escrita por cima dele
+                    if isinstance(theirs, dict):
+                        theirs = {i: Entry.from_dict(e) for i, e in theirs.items()}
+
+                    # o arquivo pode ter sido só reescrito com as mesmas entries (ex: trocando a compressão)
+                    if isinstance(theirs, dict) and theirs != self._base:
+                        entries, conflicts = merge_entries(self._base, entries, theirs)
+                        merged = True
+
+                        if conflicts:
+                            logger.info(f'{self.file} {conflicts} entries alteradas também fora daqui, vale a versão dessa escrita')
+
+                if not json_io.write_json(self.file, self.to_dict(entries), get_compression('collections')):
+                    return False, False
+
+                self.entries = entries
+                self._version = get_file_version(self.file)
+                self._base = dict(entries)
+        except LockTimeout as err:
+            logger.error(str(err))
+            return False, False
+
+        return True, merged
+
+    def _sync_indexes(self):
+        # depois de um merge não dá pra saber o que o índice e o catálogo já tinham
+        # da parte que veio do arquivo, então os dois são refeitos pra collection inteira
+        if self.is_indexed:
+            self.vault.references.index_collection(self)
+            self.recompute_stats()
+
+    def write_entry(self, entry: Entry) -> bool:
+        return self.write_entries([entry])
+
+    def write_entries(self, entries: list[Entry]) -> bool:
+        """
+        insere várias entries com uma única escrita do arquivo
+        e uma única transação em cada índice do vault
+
+        returns:
+            True se as entries foram salvas. com False (lock ocupado, erro de escrita)
+            nada mudou, nem no arquivo nem na memória, e quem chama precisa tratar a falha
+        """
+
+        # uma entry com o mesmo id é substituída, então a contribuição antiga sai dos totais
+        previous = [self.entries[e.id] for e in entries if e.id in self.entries]
+
+        def change(current: dict[str, Entry]):
+            for e in entries:
+                current[e.id] = e
+
+        saved, merged = self._write(change)
+        if not saved:
+            return False
+
+        if merged:
+            self._sync_indexes()
+        elif self.is_indexed:
+            self.vault.references.add_many(self, entries)
+
+            if previous:
+                self.vault.catalog.remove_many(self.id, [self.vault.entry_stats(e) for e in previous])
+            self.vault.catalog.add_many(self.id, [self.vault.entry_stats(e) for e in entries])
+
+        return True
     
-    def erase_entry(self, entry_id: str):
-        self.entries.pop(entry_id, None)
-        json_io.write_json(self.file, self.to_dict())
+    def erase_entry(self, entry_id: str) -> bool:
+        return self.erase_entries([entry_id])
+
+    def erase_entries(self, entry_ids: list[str]) -> bool:
+        """
+        apaga várias entries com uma única escrita do arquivo
+        ids que não existem na collection são ignorados
+
+        returns:
+            True se o arquivo foi salvo sem as entries, False se a escrita falhou (ver write_entries)
+        """
+
+        erased = [self.entries[i] for i in entry_ids if i in self.entries]
+
+        def change(current: dict[str, Entry]):
+            for i in entry_ids:
+                current.pop(i, None)
+
+        saved, merged = self._write(change)
+        if not saved:
+            return False
+
+        if merged:
+            self._sync_indexes()
+        elif erased and self.is_indexed:
+            self.vault.references.remove_many(self.id, [e.id for e in erased])
+            self.vault.catalog.remove_many(self.id, [self.vault.entry_stats(e) for e in erased])
+
+        return True
 
 
 
@@ -225,6 +667,7 @@ class Module:
 
         self.id = id
         self.vault = vault
+        self.vault.modules[id] = self
 
         self.root = self.vault.modules_dir / id
         ensure_directory(self.root)
@@ -249,15 +692,166 @@ class Module:
         return json_io.read_json(self.manifest_file)
     
     # TODO
-    def build_entry_widget(self, entry: Entry):
+    def build_entry_row(self, entry: Entry) -> dict | None:
+        """
+        retorna os dados de exibição de uma entry, só com tipos simples
+        usados pela gui pra montar o widget e pelo snapshot de inicialização
+
+        os modules não devem importar o qt, quem transforma a row em widget
+        é a camada de apresentação de cada module, carregada só pela gui
+        """
+
         pass
     
     def can_handle_entry(self, entry: Entry):
         pass
+
+    def get_search_text(self, entry: Entry) -> str | None:
+        """
+        retorna o texto pesquisável de uma entry (ex: título, autor, descrição)
+        deve usar só dados locais, já que é chamado pra todas as entries da collection
+        """
+
+        pass
+
+    def get_search_texts(self, entries: list[Entry]) -> dict[str, str]:
+        """
+        retorna o texto pesquisável de várias entries, usado pra montar e atualizar o índice de busca
+        o padrão chama get_search_text uma vez por entry, modules podem sobrescrever
+        pra ler os dados locais de todas de uma vez
+
+        returns:
+            id da entry -> texto, só das entries que têm algum
+        """
+
+        texts = {}
+        for e in entries:
+            text = self.get_search_text(e)
+            if text:
+                texts[e.id] = text
+
+        return texts
+
+    def entry_stats(self, entry: Entry) -> dict | None:
+        """
+        retorna a contribuição de uma entry pros totais da collection (VaultCatalog)
+
+        returns:
+            dicionário com 'duration' (segundos), 'upload_date' (yyyymmdd) e 'uploader',
+            qualquer um pode faltar. None se não houver dados locais
+            deve usar só dados locais, igual a get_search_text
+        """
+
+        pass
+    
+    def get_entry_data(self, entry: Entry) -> dict | None:
+        """
+        retorna os dados locais do item de uma entry (ex: metadados de um vídeo no cache)
+        usado pela cli pra listar as entries, nunca deve acessar a rede
+        """
+
+        pass
+
+    def prefetch_entry(self, entry: Entry) -> bool:
+        """
+        baixa pro cache tudo que a entry precisa pra ser exibida (metadados, thumbnail)
+
+        returns:
+            True se os dados ficaram disponíveis localmente
+        """
+
+        return False
     
-    def receive_url(self, url: str):
+    def receive_url(self, url: str) -> tuple[str, str] | None:
+        """
+        reconhece uma url (ou um id) que pertence a esse module
+
+        returns:
+            tupla (type, reference) da entry que representaria a url
+            None se a url não for desse module
+        """
+
+        pass
+
+    async def resolve_many(self, urls: list[str]) -> dict[str, dict | None]:
+        """
+        reconhece várias urls desse module e busca os dados dos itens delas ao mesmo tempo
+        roda num loop do asyncio (ver utils.aio.AsyncRuntime), nunca deve bloquear ele
+
+        o padrão só reconhece as urls com receive_url, sem buscar nada.
+        modules que acessam a rede sobrescrevem pra buscar os itens em paralelo
+
+        returns:
+            url -> dicionário com 'type', 'reference' e 'data' (dados do item ou None)
+            None pras urls que não são desse module
+        """
+
+        results = {}
+        for url in urls:
+            received = self.receive_url(url)
+            results[url] = None if received is None else {
+                'type': received[0],
+                'reference': received[1],
+                'data': None
+            }
+
+        return results
+
+    async def close_async(self):
+        """
+        libera o que o module abriu no loop que está rodando (ex: sessões http)
+        chamado antes do loop terminar
+        """
+
         pass
 
+    def run_job(self, job: Job):
+        """
+        executa um job da fila do vault que pertence a esse module
+
+        levanta uma exceção se o job falhar, e ele volta pra fila com backoff
+        """
+
+        raise NotImplementedError(f'o module {self.id} não executa jobs')
+
+    def run_jobs(self, jobs: list[Job]) -> dict[int, str | None]:
+        """
+        executa um lote de jobs desse module, chamado pela JobRunner
+        o padrão executa um de cada vez com run_job, modules podem sobrescrever
+        pra executar o lote em paralelo ou juntar as escritas
+
+        returns:
+            id do job -> mensagem de erro, ou None se ele terminou
+        """
+
+        results = {}
+        for j in jobs:
+            try:
+                self.run_job(j)
+                results[j.id] = None
+            except Exception as err:
+                results[j.id] = str(err) or type(err).__name__
+
+        return results
+
+    def cache_files(self) -> list[Path]:
+        """
+        retorna os arquivos de cache desse module que podem ser alterados por fora
+        usado pelo watcher da gui pra saber o que observar dentro do .sorted
+        """
+
+        return []
+
+    def reload_cache(self) -> set[str]:
+        """
+        relê o cache do module depois de uma alteração externa
+
+        returns:
+            referências (ex: ids de vídeos) cujos dados mudaram
+        """
+
+        return set()
+
 # TODO: documentação
 class ModuleRegistry:
     def __init__(self):
@@ -266,8 +860,28 @@ class ModuleRegistry:
     def register(self, module):
         self.modules.append(module)
     
+    def get(self, module_id: str):
+        for m in self.modules:
+            if m.id == module_id:
+                return m
+        return None
+
     def get_for_entry(self, entry: Entry):
         for m in self.modules:
             if m.can_handle_entry(entry):
                 return m
-        return None
\ No newline at end of file
+        return None
+
+    def group_by_module(self, entries: list[Entry]) -> dict[Module, list[Entry]]:
+        """
+        separa as entries pelo module que cuida de cada uma, pros métodos em lote dos modules
+        entries sem module ficam de fora
+        """
+
+        groups: dict[Module, list[Entry]] = {}
+        for e in entries:
+            module = self.get_for_entry(e)
+            if module is not None:
+                groups.setdefault(module, []).append(e)
+
+        return groups
\ No newline at end of file
@@ -0,0 +1,244 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING
+import sqlite3
+import threading
+
+from ..utils import json_io
+from .. import logger
+
+if TYPE_CHECKING:
+    from .models import Collection, Entry
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS collections (
+    id TEXT PRIMARY KEY,
+    file TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS refs (
+    module TEXT NOT NULL,
+    type TEXT NOT NULL,
+    reference TEXT NOT NULL,
+    collection_id TEXT NOT NULL,
+    entry_id TEXT NOT NULL,
+    PRIMARY KEY (collection_id, entry_id)
+);
+
+CREATE INDEX IF NOT EXISTS refs_by_reference ON refs (module, type, reference, collection_id);
+'''
+
+
+class ReferenceIndex:
+    """
+    índice persistente de quais collections contêm cada item do vault
+
+    mapeia (module, type, reference) pros ids das collections e das entries
+    que apontam pra esse item, então perguntas como "esse vídeo já está em
+    alguma collection?" não precisam abrir todos os arquivos do vault
+
+    é mantido incrementalmente por Collection.write_entry e erase_entry,
+    e pode ser reconstruído do zero com rebuild se ficar dessincronizado
+    (ex: collections editadas por fora da aplicação)
+
+    args:
+        file:
+            arquivo sqlite onde o índice fica salvo, normalmente dentro do .sorted
+    """
+
+    def __init__(self, file: Path):
+        self.file = file
+
+        # a conexão é compartilhada entre threads (ex: workers da gui)
+        # então todo acesso passa pelo lock
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.file, check_same_thread=False, timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def is_empty(self) -> bool:
+        """
+        verifica se o índice ainda não tem nenhuma collection
+        normalmente significa que o vault nunca foi indexado e precisa de um rebuild
+        """
+
+        with self.lock:
+            row = self.connection.execute('SELECT 1 FROM collections LIMIT 1').fetchone()
+
+        return row is None
+
+    def add(self, collection: 'Collection', entry: 'Entry'):
+        """
+        registra uma entry de uma collection no índice
+        """
+
+        with self.lock, self.connection:
+            self._register_collection(collection)
+            self.connection.execute(
+                'INSERT OR REPLACE INTO refs VALUES (?, ?, ?, ?, ?)',
+                (entry.module, entry.type, entry.reference, collection.id, entry.id)
+            )
+
+    def add_many(self, collection: 'Collection', entries: list['Entry']):
+        """
+        registra várias entries de uma collection numa única transação
+        """
+
+        with self.lock, self.connection:
+            self._register_collection(collection)
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO refs VALUES (?, ?, ?, ?, ?)',
+                [(e.module, e.type, e.reference, collection.id, e.id) for e in entries]
+            )
+
+    def remove(self, collection_id: str, entry_id: str):
+        """
+        remove uma entry de uma collection do índice
+        """
+
+        with self.lock, self.connection:
+            self.connection.execute(
+                'DELETE FROM refs WHERE collection_id = ? AND entry_id = ?',
+                (collection_id, entry_id)
+            )
+
+    def remove_many(self, collection_id: str, entry_ids: list[str]):
+        """
+        remove várias entries de uma collection numa única transação
+        """
+
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'DELETE FROM refs WHERE collection_id = ? AND entry_id = ?',
+                [(collection_id, i) for i in entry_ids]
+            )
+
+    def _register_collection(self, collection: 'Collection'):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO collections VALUES (?, ?)',
+            (collection.id, str(collection.file.resolve()))
+        )
+
+    def index_collection(self, collection: 'Collection'):
+        """
+        substitui tudo que o índice sabe sobre uma collection pelo estado atual dela
+        usado quando a collection é recarregada depois de uma alteração externa
+        """
+
+        rows = [
+            (e.module, e.type, e.reference, collection.id, e.id)
+            for e in collection.entries.values()
+        ]
+
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM refs WHERE collection_id = ?', (collection.id,))
+            self._register_collection(collection)
+            self.connection.executemany('INSERT OR REPLACE INTO refs VALUES (?, ?, ?, ?, ?)', rows)
+
+    def lookup(self, module: str, type: str, reference: str) -> dict[str, list[str]]:
+        """
+        retorna onde um item aparece no vault
+
+        returns:
+            dicionário de id da collection -> ids das entries que apontam pro item
+        """
+
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT collection_id, entry_id FROM refs WHERE module = ? AND type = ? AND reference = ?',
+                (module, type, reference)
+            ).fetchall()
+
+        result = {}
+        for collection_id, entry_id in rows:
+            result.setdefault(collection_id, []).append(entry_id)
+
+        return result
+
+    def contains(self, module: str, type: str, reference: str, collection_id: str | None = None) -> bool:
+        """
+        verifica se um item já está no vault, ou numa collection específica
+
+        args:
+            collection_id:
+                se for passado, só conta se o item estiver nessa collection
+        """
+
+        query = 'SELECT 1 FROM refs WHERE module = ? AND type = ? AND reference = ?'
+        params = [module, type, reference]
+
+        if collection_id is not None:
+            query += ' AND collection_id = ?'
+            params.append(collection_id)
+
+        with self.lock:
+            row = self.connection.execute(query + ' LIMIT 1', params).fetchone()
+
+        return row is not None
+
+    def collection_file(self, collection_id: str) -> Path | None:
+        """
+        retorna o arquivo de uma collection pelo id dela
+        """
+
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT file FROM collections WHERE id = ?', (collection_id,)
+            ).fetchone()
+
+        if row is None:
+            return
+
+        return Path(row[0])
+
+    def rebuild(self, files: list[Path], max_workers: int | None = None) -> int:
+        """
+        reconstrói o índice do zero lendo todas as collections do vault
+
+        a leitura dos arquivos é feita em paralelo, e a escrita no índice
+        acontece numa única transação no final
+
+        args:
+            files:
+                arquivos das collections do vault (Vault.collection_files),
+                os que não forem collections são ignorados
+
+            max_workers:
+                quantidade de threads de leitura, o padrão do ThreadPoolExecutor se não for passado
+
+        returns:
+            quantidade de collections indexadas
+        """
+
+        def scan(file: Path):
+            data = json_io.read_json(file)
+
+            # outros json do vault (listas, configs) não são collections
+            if not isinstance(data, dict):
+                return
+
+            collection_id = data.get('id')
+            entries = data.get('entries')
+            if not collection_id or not isinstance(entries, dict):
+                return
+
+            rows = [
+                (e.get('module'), e.get('type'), e.get('reference'), collection_id, e.get('id'))
+                for e in entries.values()
+            ]
+            return collection_id, str(file.resolve()), rows
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            scanned = [s for s in executor.map(scan, files) if s is not None]
+
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM refs')
+            self.connection.execute('DELETE FROM collections')
+
+            for collection_id, file, rows in scanned:
+                self.connection.execute('INSERT OR REPLACE INTO collections VALUES (?, ?)', (collection_id, file))
+                self.connection.executemany('INSERT OR REPLACE INTO refs VALUES (?, ?, ?, ?, ?)', rows)
+
+        logger.info(f'índice de referências reconstruído: {len(scanned)} collections')
+        return len(scanned)
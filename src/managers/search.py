@@ -0,0 +1,188 @@
+import bisect
+
+from ..utils.generic import tokenize_text
+
+
+class SearchIndex:
+    """
+    índice invertido em memória pra filtrar as entries de uma collection
+
+    cada documento (normalmente uma entry) é dividido em tokens normalizados,
+    e cada token aponta pro conjunto de documentos que contém ele.
+    os termos da busca são tratados como prefixos, então o filtro funciona
+    enquanto a palavra ainda está sendo digitada
+
+    o vocabulário fica ordenado, então achar todos os tokens com um prefixo
+    custa uma busca binária em vez de percorrer o vocabulário inteiro
+    """
+
+    # quantos resultados de termos ficam guardados entre uma busca e outra
+    # digitar uma letra a mais normalmente repete todos os termos anteriores menos o último
+    TERM_CACHE_SIZE = 64
+
+    # termos desse tamanho ou menor casam com quase tudo e são os mais caros de calcular
+    # então ficam sempre no cache, calculados uma vez quando o índice é montado
+    SHORT_TERM_LENGTH = 1
+
+    def __init__(self):
+        self.documents: dict[str, frozenset[str]] = {} # id -> tokens
+        self.postings: dict[str, set[str]] = {} # token -> ids
+
+        self._vocabulary: list[str] = []
+        self._vocabulary_dirty = False
+        self._term_cache: dict[str, set[str]] = {}
+
+    def __len__(self):
+        return len(self.documents)
+
+    def __contains__(self, doc_id: str):
+        return doc_id in self.documents
+
+    @classmethod
+    def from_documents(cls, documents: dict[str, str]):
+        """
+        cria um índice com vários documentos de uma vez
+
+        args:
+            documents:
+                dicionário de id -> texto do documento
+        """
+
+        index = cls()
+        for doc_id, text in documents.items():
+            index.add(doc_id, text)
+
+        index.warm_short_terms()
+
+        return index
+
+    def warm_short_terms(self):
+        """
+        calcula antes os resultados dos termos curtos (ex: a primeira letra digitada)
+        """
+
+        prefixes = {t[:self.SHORT_TERM_LENGTH] for t in self.vocabulary}
+        for p in prefixes:
+            self.match_term(p)
+
+    def add(self, doc_id: str, text: str):
+        """
+        adiciona ou substitui um documento no índice
+
+        args:
+            doc_id:
+                id do documento (ex: id da entry)
+
+            text:
+                texto que vai ser pesquisável
+        """
+
+        if doc_id in self.documents:
+            self.remove(doc_id)
+
+        tokens = frozenset(tokenize_text(text))
+        self.documents[doc_id] = tokens
+
+        for t in tokens:
+            ids = self.postings.get(t)
+            if ids is None:
+                ids = self.postings[t] = set()
+                self._vocabulary_dirty = True
+            ids.add(doc_id)
+
+        self._update_term_cache(doc_id, tokens, added=True)
+
+    def remove(self, doc_id: str):
+        tokens = self.documents.pop(doc_id, None)
+        if tokens is None:
+            return
+
+        for t in tokens:
+            ids = self.postings[t]
+            ids.discard(doc_id)
+
+            if not ids:
+                del self.postings[t]
+                self._vocabulary_dirty = True
+
+        self._update_term_cache(doc_id, tokens, added=False)
+
+    def _update_term_cache(self, doc_id: str, tokens: frozenset[str], added: bool):
+        # em vez de descartar o cache a cada mudança, atualiza só os termos
+        # que casam com algum token do documento
+        for term, ids in self._term_cache.items():
+            if not any(t.startswith(term) for t in tokens):
+                continue
+
+            if added:
+                ids.add(doc_id)
+            else:
+                ids.discard(doc_id)
+
+    @property
+    def vocabulary(self) -> list[str]:
+        # só reordena quando tokens novos entram ou somem
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self.postings)
+            self._vocabulary_dirty = False
+
+        return self._vocabulary
+
+    def match_term(self, term: str) -> set[str]:
+        """
+        retorna os documentos que têm algum token começando com o termo
+
+        NÃO DEVE SER MODIFICADO POR QUEM CHAMA, o resultado fica guardado no cache de termos
+        """
+
+        cached = self._term_cache.get(term)
+        if cached is not None:
+            return cached
+
+        vocabulary = self.vocabulary
+
+        # todos os tokens com esse prefixo ficam num intervalo contínuo do vocabulário ordenado
+        # o '\U0010ffff' é o maior caractere possível, então fecha o intervalo
+        start = bisect.bisect_left(vocabulary, term)
+        end = bisect.bisect_left(vocabulary, term + '\U0010ffff', start)
+
+        result = set()
+        for t in vocabulary[start:end]:
+            result.update(self.postings[t])
+
+        # descarta o termo longo mais antigo, os curtos ficam sempre
+        long_terms = [t for t in self._term_cache if len(t) > self.SHORT_TERM_LENGTH]
+        if len(long_terms) >= self.TERM_CACHE_SIZE:
+            del self._term_cache[long_terms[0]]
+        self._term_cache[term] = result
+
+        return result
+
+    def search(self, query: str) -> set[str] | None:
+        """
+        busca os documentos que contêm todos os termos da query
+
+        args:
+            query:
+                texto digitado, normalizado do mesmo jeito que os documentos
+
+        returns:
+            ids dos documentos encontrados
+            None se a query não tiver nenhum termo, ou seja, nada deve ser filtrado
+        """
+
+        terms = set(tokenize_text(query))
+        if not terms:
+            return None
+
+        # intersecta começando pelo menor conjunto, pra que as próximas operações
+        # percorram o mínimo de elementos possível
+        matches = sorted((self.match_term(t) for t in terms), key=len)
+
+        result = set(matches[0])
+        for m in matches[1:]:
+            if not result:
+                break
+            result &= m
+
+        return result
@@ -0,0 +1,112 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+import json
+import zlib
+
+from .. import logger
+
+
+# cabeçalho do arquivo, muda sempre que o formato do snapshot mudar
+# um snapshot com cabeçalho diferente é simplesmente ignorado
+# (a versão 1 era um pickle, que nunca mais é lido)
+MAGIC = b'SRTD\x02'
+
+
+@dataclass
+class Snapshot:
+    """
+    estado pronto pra exibição da última collection aberta na gui
+
+    é salvo quando a janela fecha e usado na próxima inicialização pra pintar
+    a lista imediatamente, antes de ler a collection, o cache e as thumbnails de verdade
+
+    esses dados podem estar desatualizados, então sempre precisam ser
+    reconciliados com os arquivos reais depois de exibidos
+    """
+
+    vault: str
+    collection_file: str
+    collection: dict # dados crus da collection, no formato de Collection.to_dict
+    rows: list[dict] # rows de exibição na ordem da lista
+    visible: list[str] = field(default_factory=list) # ids das entries que estavam visíveis
+
+    def matches(self, vault: Path, collection_file: Path):
+        """
+        verifica se o snapshot pertence ao vault e collection que vão ser abertos
+        """
+
+        return (
+            self.vault == str(vault.resolve())
+            and self.collection_file == str(collection_file.resolve())
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            vault=data.get('vault'),
+            collection_file=data.get('collection_file'),
+            collection=data.get('collection', {}),
+            rows=data.get('rows', []),
+            visible=data.get('visible', [])
+        )
+
+    def to_dict(self):
+        return {
+            'vault': self.vault,
+            'collection_file': self.collection_file,
+            'collection': self.collection,
+            'rows': self.rows,
+            'visible': self.visible
+        }
+
+def write_snapshot(file: Path, snapshot: Snapshot):
+    """
+    salva o snapshot num arquivo binário compacto
+
+    o conteúdo é serializado em json e comprimido com zlib no nível mais rápido,
+    já que o objetivo é carregar rápido e não economizar o máximo de espaço.
+    as rows só têm tipos simples, e o json não executa nada na leitura como o pickle,
+    então um arquivo qualquer colocado no lugar do snapshot não roda código na gui
+
+    args:
+        file:
+            arquivo onde o snapshot vai ser salvo
+
+        snapshot:
+            snapshot a ser salvo
+    """
+
+    payload = json.dumps(snapshot.to_dict(), ensure_ascii=False, separators=(',', ':')).encode()
+
+    try:
+        # escreve num temporário e renomeia pra nunca deixar um snapshot pela metade
+        tmp = file.with_suffix('.tmp')
+        tmp.write_bytes(MAGIC + zlib.compress(payload, 1))
+        tmp.replace(file)
+    except Exception as err:
+        logger.error(f'{file} erro ao escrever o snapshot: {err}')
+
+def read_snapshot(file: Path) -> Snapshot | None:
+    """
+    lê um snapshot salvo por write_snapshot
+
+    returns:
+        o snapshot, ou None se ele não existir ou for de um formato diferente
+    """
+
+    if not file.is_file():
+        return
+
+    try:
+        raw = file.read_bytes()
+        if not raw.startswith(MAGIC):
+            return
+
+        data = json.loads(zlib.decompress(raw[len(MAGIC):]))
+        if not isinstance(data, dict):
+            return
+
+        return Snapshot.from_dict(data)
+    except Exception as err:
+        logger.error(f'{file} erro ao ler o snapshot: {err}')
+        return
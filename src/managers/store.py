@@ -0,0 +1,223 @@
+from pathlib import Path
+import json
+import os
+import shutil
+import sqlite3
+import threading
+
+from ..utils.generic import SQLITE_MAX_VARIABLES
+from .. import logger
+
+
+# os registros são os dados de cada item (ex: os metadados de um vídeo), por id
+# os arquivos só guardam o hash do conteúdo, que fica uma vez só em blobs/
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS records (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+
+CREATE TABLE IF NOT EXISTS files (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+
+CREATE INDEX IF NOT EXISTS files_by_hash ON files (hash);
+'''
+
+
+def hash_content(content: bytes) -> str:
+    # só carregado quando um arquivo é salvo, a gui abre sem precisar dele
+    import hashlib
+
+    return hashlib.sha256(content).hexdigest()
+
+def link_or_copy(source: Path, dest: Path):
+    """
+    faz dest apontar pro mesmo conteúdo de source, sem nunca deixar dest pela metade
+
+    usa um hardlink quando os dois estão no mesmo sistema de arquivos (nenhum byte a mais
+    no disco) e uma cópia quando não estão. o arquivo é trocado de uma vez com os.replace,
+    então um hardlink antigo nunca é sobrescrito no lugar, o que mudaria o source junto
+    """
+
+    temp = dest.with_name(f'.{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    temp.unlink(missing_ok=True)
+
+    try:
+        os.link(source, temp)
+    except OSError:
+        shutil.copyfile(source, temp)
+
+    os.replace(temp, dest)
+
+
+class ContentStore:
+    """
+    cache global de conteúdo, compartilhado por todos os vaults do usuário
+
+    guarda os dados de cada item por id (um vídeo que está em três vaults é extraído
+    uma vez só) e os arquivos por hash do conteúdo (uma thumbnail fica uma vez só no
+    disco, e os caches dos vaults só têm hardlinks pra ela). um vault novo com vídeos
+    que já estão aqui monta o próprio cache sem acessar a rede
+
+    os namespaces separam os modules, ex: ('youtube', id do vídeo)
+
+    args:
+        root:
+            diretório do store, normalmente ~/.cache/sorted/store
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.blobs_dir = root / 'blobs'
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+
+        # vários processos (a gui, a cli, o daemon) usam o mesmo arquivo, o wal deixa
+        # as leituras de um rodarem enquanto outro escreve
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(root / 'store.sqlite', check_same_thread=False, timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def _select(self, table: str, column: str, namespace: str, keys: list[str]) -> list[tuple[str, str]]:
+        rows = []
+        with self.lock:
+            for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+                chunk = keys[start:start + SQLITE_MAX_VARIABLES]
+                rows += self.connection.execute(
+                    f'SELECT key, {column} FROM {table} WHERE namespace = ? AND key IN ({",".join("?" * len(chunk))})',
+                    (namespace, *chunk)
+                ).fetchall()
+
+        return rows
+
+    def get_records(self, namespace: str, keys: list[str]) -> dict[str, dict]:
+        """
+        returns:
+            key -> dados, só das keys que estão no store
+        """
+
+        return {key: json.loads(data) for key, data in self._select('records', 'data', namespace, keys)}
+
+    def put_records(self, namespace: str, records: dict[str, dict]):
+        """
+        salva ou atualiza os dados de vários itens numa única transação
+        """
+
+        if not records:
+            return
+
+        rows = [(namespace, key, json.dumps(data, ensure_ascii=False)) for key, data in records.items()]
+        with self.lock, self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO records VALUES (?, ?, ?)', rows)
+
+    def _blob_path(self, digest: str) -> Path:
+        # os blobs são divididos pelos dois primeiros caracteres do hash,
+        # senão um diretório só ficaria com centenas de milhares de arquivos
+        return self.blobs_dir / digest[:2] / digest
+
+    def put_file(self, namespace: str, key: str, content: bytes) -> Path:
+        """
+        salva o conteúdo de um arquivo e associa ele à key
+
+        returns:
+            caminho do blob, compartilhado por todas as keys com o mesmo conteúdo
+            NÃO DEVE SER MODIFICADO, só lido ou ligado com link_or_copy
+        """
+
+        digest = hash_content(content)
+        blob = self._blob_path(digest)
+
+        # um blob que já existe tem o mesmo conteúdo, não precisa ser escrito de novo
+        if not blob.is_file():
+            blob.parent.mkdir(exist_ok=True)
+            temp = blob.with_name(f'.{digest}.{os.getpid()}.{threading.get_ident()}.tmp')
+            temp.write_bytes(content)
+            os.replace(temp, blob)
+
+        with self.lock, self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?)', (namespace, key, digest))
+
+        return blob
+
+    def get_files(self, namespace: str, keys: list[str]) -> dict[str, Path]:
+        """
+        returns:
+            key -> caminho do blob, só das keys que têm um arquivo no store
+        """
+
+        files = {}
+        for key, digest in self._select('files', 'hash', namespace, keys):
+            blob = self._blob_path(digest)
+            if blob.is_file():
+                files[key] = blob
+
+        return files
+
+    def link_file(self, namespace: str, key: str, dest: Path) -> bool:
+        """
+        coloca em dest o arquivo da key, se o store tiver um
+
+        returns:
+            True se o arquivo foi ligado
+        """
+
+        blob = self.get_files(namespace, [key]).get(key)
+        if blob is None:
+            return False
+
+        try:
+            link_or_copy(blob, dest)
+        except OSError as err:
+            logger.error(f'erro ao ligar {blob} em {dest}: {err}')
+            return False
+
+        return True
+
+    def stats(self) -> dict:
+        """
+        returns:
+            quantidade de registros e arquivos, e os bytes ocupados pelos blobs
+        """
+
+        with self.lock:
+            records = self.connection.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+            files = self.connection.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+
+        blobs = [b for b in self.blobs_dir.glob('*/*') if not b.name.startswith('.')]
+        return {
+            'records': records,
+            'files': files,
+            'blobs': len(blobs),
+            'bytes': sum(b.stat().st_size for b in blobs)
+        }
+
+
+# store do processo, aberto no primeiro uso. None enquanto não for aberto
+# e False se ele estiver desligado no cache global
+_store: ContentStore | None | bool = None
+_store_lock = threading.Lock()
+
+def get_content_store() -> ContentStore | None:
+    """
+    retorna o store global, se ele estiver ligado (ver GlobalCache.content_store_enabled)
+
+    returns:
+        o store, aberto uma vez por processo, ou None se estiver desligado
+    """
+
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            from .cache import GlobalCache
+
+            cache = GlobalCache()
+            _store = ContentStore(cache.store_dir) if cache.content_store_enabled else False
+
+    return _store or None
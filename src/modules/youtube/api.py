@@ -1,17 +1,84 @@
-import requests
-
-from yt_dlp import YoutubeDL
+from typing import TYPE_CHECKING
+import threading
+import weakref
 
+from ...utils.lazy import lazy_import
+from ...utils.throttle import scheduler, HostPolicy, CircuitOpenError, Slot
 from ... import logger
 
+if TYPE_CHECKING:
+    from yt_dlp import YoutubeDL
+
+# as duas só são carregadas quando algo realmente precisa da rede
+# se tudo já estiver no cache, nenhuma delas chega a ser importada
+requests = lazy_import('requests')
+yt_dlp = lazy_import('yt_dlp')
+
+# cliente http da api assíncrona, só carregado quando uma corrotina baixa algo
+aiohttp = lazy_import('aiohttp')
+
 
 SETTINGS = {
     'quiet': True,
     'skip_download': True
 }
 
+# só lista os itens de uma playlist, sem abrir a página de cada vídeo
+# cada item vem só com o id e alguns campos básicos, o que é suficiente pra inserir na collection
+PLAYLIST_SETTINGS = {
+    **SETTINGS,
+    'extract_flat': 'in_playlist'
+}
+
+
+# limites das requisições de saída, compartilhados por todas as threads do processo
+# cada extração do yt-dlp faz algumas requisições pro youtube.com, e os feeds dos canais
+# também saem dele, então a concorrência começa baixa e só sobe com respostas saudáveis
+scheduler.configure('youtube.com', HostPolicy(rate=20, burst=40, max_concurrency=32, initial_concurrency=4))
+scheduler.configure('ytimg.com', HostPolicy(rate=50, burst=50, max_concurrency=32, initial_concurrency=8))
+
+# trechos das mensagens de erro do yt-dlp que indicam um problema do host, e não do vídeo
+# (um vídeo privado ou removido também levanta erro, mas o host respondeu normalmente)
+THROTTLED_ERRORS = ('HTTP Error 429', 'Too Many Requests')
+HOST_ERRORS = ('HTTP Error 5', 'timed out', 'Connection', 'Temporary failure', 'Unable to download')
+
+# sessão do aiohttp de cada loop, que mantém as conexões abertas entre as requisições
+# uma sessão só pode ser usada no loop onde foi criada
+_http_sessions = weakref.WeakKeyDictionary()
+
+# sessão do requests das thumbnails, criada no primeiro download e compartilhada pelas threads
+# mantém as conexões abertas entre as imagens em vez de abrir uma por imagem
+_requests_session = None
+_requests_session_lock = threading.Lock()
+
 
-def instance_ytdl(options: dict | None = None) -> YoutubeDL:
+def report_error(slot: Slot, err: Exception):
+    """
+    marca no slot do escalonador se um erro do yt-dlp foi culpa do host
+    """
+
+    message = str(err)
+    if any(e in message for e in THROTTLED_ERRORS):
+        slot.throttled()
+    elif any(e in message for e in HOST_ERRORS):
+        slot.failed()
+
+def _extract_info(url: str, ytdl: 'YoutubeDL', description: str) -> dict | None:
+    # toda extração passa pelo escalonador do host, que limita a taxa e a concorrência
+    # e recusa na hora se o host estiver com o circuito aberto
+    try:
+        with scheduler.slot(url) as slot:
+            try:
+                return ytdl.extract_info(url, download=False)
+            except Exception as err:
+                report_error(slot, err)
+                logger.error(f'erro ao tentar {description} {url}: {err}')
+                return None
+    except CircuitOpenError as err:
+        logger.error(f'não foi possível {description} {url}: {err}')
+        return None
+
+def instance_ytdl(options: dict | None = None) -> 'YoutubeDL':
     """
     cria uma instância do youtube-dl
 
@@ -24,9 +91,9 @@ def instance_ytdl(options: dict | None = None) -> YoutubeDL:
             precisa seguir o formato definido pelo yt-dlp
     """
     
-    return YoutubeDL(options)
+    return yt_dlp.YoutubeDL(options)
 
-def extract_video_info(url: str, ytdl: YoutubeDL) -> dict | None :
+def extract_video_info(url: str, ytdl: 'YoutubeDL') -> dict | None :
     """
     usa a api do yt-dlp pra extrair dinamicamente os dados de um vídeo
     por fazer uso da api, deve ser evitada se a info já existir no cache
@@ -41,12 +108,40 @@ def extract_video_info(url: str, ytdl: YoutubeDL) -> dict | None :
             instância já criada da api do yt-dlp. isso evita que múltiplas instâncias precisem ser criadas
     """
     
-    try:
-        return ytdl.extract_info(url, download=False)
-    except Exception as err:
-        logger.error(f'erro ao tentar extrair os dados do vídeo {url}: {err}')
+    return _extract_info(url, ytdl, 'extrair os dados do vídeo')
+
+def extract_playlist_info(url: str, ytdl: 'YoutubeDL') -> dict | None:
+    """
+    lista os vídeos de uma playlist do youtube sem extrair os dados de cada um
+
+    o ytdl precisa ter sido criado com PLAYLIST_SETTINGS, senão o yt-dlp
+    abre todos os vídeos da playlist, o que leva minutos numa playlist grande
+
+    args:
+        url:
+            url da playlist
+
+        ytdl:
+            instância do yt-dlp criada com PLAYLIST_SETTINGS
+
+    returns:
+        dicionário com 'id', 'title' e 'ids' (ids dos vídeos na ordem da playlist)
+        ou None se a extração falhar
+    """
+
+    info = _extract_info(url, ytdl, 'listar a playlist')
+    if not info:
         return None
 
+    # vídeos removidos ou privados aparecem como itens vazios
+    ids = [e.get('id') for e in info.get('entries') or [] if e and e.get('id')]
+
+    return {
+        'id': info.get('id'),
+        'title': info.get('title'),
+        'ids': ids
+    }
+
 def download_thumbnail_bytes(image_url: str) -> bytes | None:
     """
     baixa uma imagem de uma url e retorna os bytes dela
@@ -62,9 +157,130 @@ def download_thumbnail_bytes(image_url: str) -> bytes | None:
         bytes da imagem ou None se a requisição falhar
     """
     
-    response = requests.get(image_url)
+    if not image_url:
+        logger.error('vídeo sem url de thumbnail')
+        return None
+
+    try:
+        with scheduler.slot(image_url) as slot:
+            try:
+                response = get_requests_session().get(image_url, timeout=30)
+            except requests.RequestException as err:
+                slot.failed()
+                logger.error(f'erro ao baixar a imagem {image_url}: {err}')
+                return None
+
+            if response.status_code == 429:
+                slot.throttled()
+            elif response.status_code >= 500:
+                slot.failed()
+    except CircuitOpenError as err:
+        logger.error(f'não foi possível baixar a imagem {image_url}: {err}')
+        return None
     
     if response.status_code != 200:
         return None
     
-    return response.content
\ No newline at end of file
+    return response.content
+
+def get_requests_session() -> 'requests.Session':
+    """
+    retorna a sessão do requests usada pelos downloads síncronos, criada no primeiro uso
+
+    o pool de conexões do urllib3 é seguro entre threads, e a sessão nunca
+    é alterada depois de criada, então todas as threads usam a mesma
+    """
+
+    global _requests_session
+
+    with _requests_session_lock:
+        if _requests_session is None:
+            # uma conexão por requisição simultânea que o escalonador deixa passar pro ytimg.com
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32)
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _requests_session = session
+
+    return _requests_session
+
+def get_http_session() -> 'aiohttp.ClientSession':
+    """
+    retorna a sessão do aiohttp do loop que está rodando, criada no primeiro uso
+    """
+
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    session = _http_sessions.get(loop)
+    if session is None or session.closed:
+        session = _http_sessions[loop] = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
+
+    return session
+
+async def close_http_session():
+    """
+    fecha a sessão do aiohttp do loop que está rodando, se tiver uma
+    deve ser chamada antes do loop terminar, senão as conexões ficam abertas
+    """
+
+    import asyncio
+
+    session = _http_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+async def download_thumbnail_bytes_async(image_url: str) -> bytes | None:
+    """
+    versão pra corrotinas de download_thumbnail_bytes, usando o aiohttp
+
+    returns:
+        bytes da imagem ou None se a requisição falhar
+    """
+
+    import asyncio
+
+    if not image_url:
+        logger.error('vídeo sem url de thumbnail')
+        return None
+
+    try:
+        async with scheduler.slot_async(image_url) as slot:
+            try:
+                async with get_http_session().get(image_url) as response:
+                    status = response.status
+                    content = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                slot.failed()
+                logger.error(f'erro ao baixar a imagem {image_url}: {err}')
+                return None
+
+            if status == 429:
+                slot.throttled()
+            elif status >= 500:
+                slot.failed()
+    except CircuitOpenError as err:
+        logger.error(f'não foi possível baixar a imagem {image_url}: {err}')
+        return None
+
+    if status != 200:
+        return None
+
+    return content
+
+def resolve_channel_id(url: str, ytdl: 'YoutubeDL') -> str | None:
+    """
+    descobre o id de um canal a partir de uma url qualquer dele (ex: a do @)
+
+    o ytdl precisa ter sido criado com PLAYLIST_SETTINGS, senão o yt-dlp
+    abre todos os vídeos do canal
+
+    returns:
+        id do canal ou None se a extração falhar
+    """
+
+    info = _extract_info(url, ytdl, 'encontrar o canal')
+    if not info:
+        return None
+
+    return info.get('channel_id')
@@ -1,13 +1,44 @@
 from pathlib import Path
+import threading
 
 from ...managers.models import Vault
+from ...managers.store import get_content_store
+from ...managers.cache import get_compression
 from ...utils.generic import ensure_directory
+from ...utils.file_lock import file_lock, LockTimeout
 from ...utils import json_io
 from ... import logger
-from .api import download_thumbnail_bytes
+from .api import download_thumbnail_bytes, download_thumbnail_bytes_async
 from .models import Video
+from .fulltext import VideoTextIndex
+from .thumbnails import ThumbnailStore
+from .cold import ColdRecordStore
 
 
+# cópia em memória do videos.json de cada vault
+# a chave de validade é o (mtime, tamanho, inode) do arquivo, então qualquer escrita
+# externa invalida a cópia sem precisar reler o arquivo em toda consulta
+_videos_memo: dict[Path, tuple[tuple[int, int, int], dict]] = {}
+
+# diretório de cache de cada vault, indexado pelo .sorted dele
+_cache_roots: dict[Path, Path] = {}
+
+# índices full-text abertos, um por vault
+_text_indexes: dict[Path, VideoTextIndex] = {}
+
+# campos frios (descrições) de cada vault, ver cold.py
+_cold_stores: dict[Path, ColdRecordStore] = {}
+
+# thumbnails de cada vault, abertas (e migradas, se preciso) na primeira consulta
+_thumbnail_stores: dict[Path, ThumbnailStore] = {}
+_thumbnail_stores_lock = threading.Lock()
+
+# serializa as escritas do videos.json dentro do processo
+# cada escrita relê e reescreve o arquivo inteiro, então duas ao mesmo tempo
+# (dois prefetchers, a fila e a api assíncrona) perderiam os vídeos de uma delas
+# entre processos (a gui, a cli, o daemon) quem faz isso é o file_lock do arquivo
+_write_lock = threading.Lock()
+
 def _get_cache_root(vault: Vault):
     """
     retorna o diretório de cache desse módulo
@@ -17,8 +48,14 @@ def _get_cache_root(vault: Vault):
             instância do vault onde esse módulo está
     """
 
-    path = vault.modules_dir / 'youtube' / 'cache'
-    ensure_directory(path)
+    # o diretório só é criado na primeira consulta, as próximas reaproveitam o caminho
+    # isso importa em operações em lote, que consultam o cache uma vez por entry
+    path = _cache_roots.get(vault.context)
+    if path is None:
+        path = vault.modules_dir / 'youtube' / 'cache'
+        ensure_directory(path)
+        _cache_roots[vault.context] = path
+
     return path
 
 def _get_videos_file(vault: Vault):
@@ -28,23 +65,136 @@ def _get_videos_file(vault: Vault):
 
     return _get_cache_root(vault) / 'videos.json'
 
-def _get_thumbnail_path(video_id: str, vault: Vault):
+def get_thumbnail_store(vault: Vault) -> ThumbnailStore:
+    """
+    retorna as thumbnails desse vault, guardadas por hash do conteúdo
     """
-    retorna o caminho onde a thumbnail de um vídeo pertence
-    pode ser usada tanto na fase de download quanto na de busca
+
+    root = _get_cache_root(vault)
+
+    # a migração do layout antigo roda na abertura, então duas threads não podem abrir juntas
+    with _thumbnail_stores_lock:
+        store = _thumbnail_stores.get(root)
+        if store is None:
+            store = _thumbnail_stores[root] = ThumbnailStore(root / 'thumbnails', root / 'thumbnails.sqlite')
+
+    return store
+
+def get_thumbnail_file(video_id: str, vault: Vault) -> Path | None:
+    """
+    busca a thumbnail de um vídeo no cache local
 
     args:
         video_id:
             id do vídeo no youtube
 
         vault:
-            instância do vault onde o arquivo vai ser armazenado
+            instância do vault onde o arquivo está armazenado
+
+    returns:
+        arquivo da thumbnail (compartilhado com os vídeos que têm a mesma imagem)
+        ou None se ela não estiver no cache
     """
 
-    path = _get_cache_root(vault) / 'thumbnails'
-    ensure_directory(path)
+    return get_thumbnail_store(vault).get(video_id)
 
-    return path / f'{video_id}.jpg'
+def get_text_index(vault: Vault) -> VideoTextIndex:
+    """
+    retorna o índice full-text dos vídeos desse vault
+    a conexão é aberta uma vez e reaproveitada
+    """
+
+    file = _get_cache_root(vault) / 'search.sqlite'
+
+    index = _text_indexes.get(file)
+    if index is None:
+        index = _text_indexes[file] = VideoTextIndex(file)
+
+    return index
+
+def get_cold_store(vault: Vault) -> ColdRecordStore:
+    """
+    retorna os campos frios (ver Video.COLD_FIELDS) dos vídeos desse vault
+    """
+
+    file = _get_cache_root(vault) / 'cold.sqlite'
+
+    store = _cold_stores.get(file)
+    if store is None:
+        store = _cold_stores[file] = ColdRecordStore(file)
+
+    return store
+
+def _split_cold_fields(videos: dict[str, dict], vault: Vault) -> bool:
+    """
+    tira os campos frios dos registros que ainda têm eles (cache de antes da separação)
+    e salva esses campos no store frio. altera o dicionário no lugar
+
+    returns:
+        True se algum registro foi alterado
+    """
+
+    cold = {}
+    for video_id, data in videos.items():
+        if any(k in data for k in Video.COLD_FIELDS):
+            videos[video_id], cold[video_id] = Video.split_record(data)
+
+    # os campos frios são salvos antes, então quem ler o registro quente já acha os frios
+    get_cold_store(vault).put_many(cold)
+
+    return bool(cold)
+
+def _stat_key(file: Path) -> tuple[int, int, int] | None:
+    try:
+        stat = file.stat()
+    except FileNotFoundError:
+        return None
+
+    # outro processo escreve com os.replace, então o arquivo novo tem outro inode mesmo quando
+    # o mtime (resolução grosseira em alguns sistemas de arquivos) e o tamanho ficam iguais
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+def load_videos(vault: Vault) -> dict:
+    """
+    retorna todos os vídeos do cache local
+
+    o arquivo só é relido quando muda no disco, então chamar isso
+    várias vezes seguidas (uma por entry, por exemplo) custa só um stat
+
+    args:
+        vault:
+            instância do vault onde o cache está salvo
+
+    returns:
+        dicionário de id do vídeo -> dados normalizados
+        NÃO DEVE SER MODIFICADO POR QUEM CHAMA, ele é compartilhado
+    """
+
+    file = _get_videos_file(vault)
+    key = _stat_key(file)
+
+    memo = _videos_memo.get(file)
+    if memo is not None and key is not None and memo[0] == key:
+        return memo[1]
+
+    data = json_io.read_json_locked(file)
+
+    # um cache de antes da separação dos campos frios é migrado na primeira leitura
+    if any(k in v for v in data.values() for k in Video.COLD_FIELDS):
+        try:
+            with _write_lock, file_lock(file):
+                data = json_io.read_json(file)
+                if _split_cold_fields(data, vault):
+                    json_io.write_json(file, data, get_compression('videos'))
+        except LockTimeout as err:
+            # a migração fica pra próxima leitura, os registros ainda estão inteiros
+            logger.error(str(err))
+        key = _stat_key(file)
+
+    if key is not None:
+        _videos_memo[file] = (key, data)
+
+    return data
 
 def write_video_to_cache(data: dict, vault: Vault):
     """
@@ -59,17 +209,63 @@ def write_video_to_cache(data: dict, vault: Vault):
             instância do vault onde o cache vai ser salvo
     """
 
-    data = Video.normalize_ytdl_data(data)
-    video_id = data.get('id')
-    if not video_id:
-        logger.error('id resolvível não encontrado')
-        return
+    write_videos_to_cache([data], vault)
+
+def write_videos_to_cache(videos: list[dict], vault: Vault) -> list[dict]:
+    """
+    salva ou atualiza vários vídeos no cache local com uma única escrita do videos.json
+
+    reescrever o arquivo inteiro a cada vídeo deixaria uma importação grande
+    quadrática, então quem busca muitos vídeos deve juntar eles e salvar aqui
+
+    args:
+        videos:
+            dados dos vídeos vindos da api
+
+        vault:
+            instância do vault onde o cache vai ser salvo
+
+    returns:
+        dados normalizados dos vídeos que foram salvos, com os campos frios
+        (no videos.json só fica a parte quente, ver Video.split_record)
+    """
+
+    normalized = []
+    for v in videos:
+        data = Video.normalize_ytdl_data(v)
+        if not data.get('id'):
+            logger.error('id resolvível não encontrado')
+            continue
+        normalized.append(data)
+
+    if not normalized:
+        return []
     
     file = _get_videos_file(vault)
-    existing_data = json_io.read_json(file)
-    
-    existing_data[video_id] = data
-    json_io.write_json(file, existing_data)
+    try:
+        with _write_lock, file_lock(file):
+            existing_data = json_io.read_json(file)
+            _split_cold_fields(existing_data, vault)
+
+            cold = {}
+            for data in normalized:
+                existing_data[data['id']], cold[data['id']] = Video.split_record(data)
+
+            # todo vídeo salvo substitui os campos frios, uma descrição apagada não fica pra trás
+            get_cold_store(vault).put_many(cold)
+            json_io.write_json(file, existing_data, get_compression('videos'))
+
+            # o que acabou de ser escrito já é o estado atual do arquivo
+            key = _stat_key(file)
+            if key is not None:
+                _videos_memo[file] = (key, existing_data)
+    except LockTimeout as err:
+        logger.error(str(err))
+        return []
+
+    get_text_index(vault).upsert_many(normalized)
+
+    return normalized
 
 def get_video_from_cache(video_id: str, vault: Vault) -> dict | None:
     """
@@ -86,10 +282,33 @@ def get_video_from_cache(video_id: str, vault: Vault) -> dict | None:
         dados do vídeo ou None se não existir
     """
 
-    file = _get_videos_file(vault)
-    data = json_io.read_json(file)
+    return load_videos(vault).get(video_id)
 
-    return data.get(video_id)
+def get_video_details(video_id: str, vault: Vault) -> dict | None:
+    """
+    busca um vídeo no cache local com todos os campos, incluindo os frios
+    mais caro que get_video_from_cache, então só deve ser usado por quem precisa deles
+
+    returns:
+        dados do vídeo ou None se não existir
+    """
+
+    data = get_video_from_cache(video_id, vault)
+    if data is None:
+        return None
+
+    return {**data, **get_cold_store(vault).get(video_id)}
+
+def merge_cold_fields(videos: dict[str, dict], vault: Vault) -> dict[str, dict]:
+    """
+    junta os campos frios aos registros de vários vídeos, com uma consulta por lote
+
+    returns:
+        novo dicionário de id do vídeo -> dados completos
+    """
+
+    cold = get_cold_store(vault).get_many(list(videos))
+    return {i: {**data, **cold.get(i, {})} for i, data in videos.items()}
 
 def download_thumbnail_to_cache(video_data: dict, vault: Vault):
     """
@@ -108,19 +327,76 @@ def download_thumbnail_to_cache(video_data: dict, vault: Vault):
             instância do vault onde o arquivo vai ser salvo
     """
     
-    url = None
-    
+    url = _select_thumbnail_url(video_data)
+    if url is None:
+        logger.error(f'{video_data.get("id")} não tem url de thumbnail')
+        return
+
+    content = download_thumbnail_bytes(url)
+    if content:
+        _write_thumbnail(video_data.get('id'), content, vault)
+
+async def download_thumbnail_to_cache_async(video_data: dict, vault: Vault):
+    """
+    versão pra corrotinas de download_thumbnail_to_cache
+    o download roda no loop, sem ocupar uma thread enquanto espera a rede
+    """
+
+    import asyncio
+
+    url = _select_thumbnail_url(video_data)
+    if url is None:
+        logger.error(f'{video_data.get("id")} não tem url de thumbnail')
+        return
+
+    content = await download_thumbnail_bytes_async(url)
+    if content:
+        # a escrita vai pro executor, um disco lento não pode parar os outros downloads
+        await asyncio.to_thread(_write_thumbnail, video_data.get('id'), content, vault)
+
+def _select_thumbnail_url(video_data: dict) -> str | None:
     thumbnail_mq = video_data.get('thumbnail_mq')
     if thumbnail_mq is not None:
         logger.info('thumbnail mq encontrada')
-        url = thumbnail_mq
+        return thumbnail_mq
 
-    if url is None:
-        logger.info('usando thumbnail padrão')
-        url = video_data.get('thumbnail')
+    logger.info('usando thumbnail padrão')
+    return video_data.get('thumbnail')
 
-    content = download_thumbnail_bytes(url)
-    if content:
-        dest = _get_thumbnail_path(video_data.get('id'), vault)
-        with dest.open('wb') as f:
-            f.write(content)
\ No newline at end of file
+def _write_thumbnail(video_id: str, content: bytes, vault: Vault):
+    thumbnails = get_thumbnail_store(vault)
+
+    # com o store global, o arquivo do vault é só um hardlink pro blob dele
+    # os dois usam o sha256 do conteúdo, então o nome do blob já é o hash
+    store = get_content_store()
+    if store is not None:
+        blob = store.put_file('youtube', video_id, content)
+        thumbnails.link(video_id, blob, blob.name)
+        return
+
+    thumbnails.put(video_id, content)
+
+def link_thumbnails_from_store(video_ids: list[str], vault: Vault) -> list[str]:
+    """
+    coloca no cache do vault as thumbnails que já estão no store global, sem acessar a rede
+
+    returns:
+        ids dos vídeos cujas thumbnails foram ligadas
+    """
+
+    store = get_content_store()
+    if store is None:
+        return []
+
+    thumbnails = get_thumbnail_store(vault)
+
+    linked = []
+    for video_id, blob in store.get_files('youtube', video_ids).items():
+        try:
+            thumbnails.link(video_id, blob, blob.name)
+        except OSError as err:
+            logger.error(f'erro ao ligar a thumbnail do vídeo {video_id}: {err}')
+            continue
+        linked.append(video_id)
+
+    return linked
@@ -0,0 +1,85 @@
+from pathlib import Path
+import json
+import sqlite3
+import threading
+import zlib
+
+from ...utils.generic import SQLITE_MAX_VARIABLES
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cold (
+    id TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+'''
+
+
+class ColdRecordStore:
+    """
+    campos grandes dos vídeos (ver Video.COLD_FIELDS) que ficam fora do videos.json
+
+    a descrição de um vídeo costuma ter alguns KB e nunca aparece na lista, mas ocupava
+    a maior parte de cada registro, então era lida e mantida na memória em toda consulta
+    ao cache. aqui cada vídeo tem um blob com esses campos em json comprimido com zlib,
+    lido só por quem precisa deles (busca, detalhes do vídeo)
+
+    args:
+        file:
+            arquivo sqlite, dentro do cache do youtube
+    """
+
+    def __init__(self, file: Path):
+        self.file = file
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.file, check_same_thread=False, timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute('SELECT count(*) FROM cold').fetchone()[0]
+
+    def put_many(self, records: dict[str, dict]):
+        """
+        salva os campos frios de vários vídeos numa única transação
+
+        args:
+            records:
+                id do vídeo -> campos frios dele
+        """
+
+        if not records:
+            return
+
+        rows = [
+            (video_id, zlib.compress(json.dumps(fields, ensure_ascii=False).encode()))
+            for video_id, fields in records.items()
+        ]
+        with self.lock, self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO cold VALUES (?, ?)', rows)
+
+    def get(self, video_id: str) -> dict:
+        """
+        returns:
+            campos frios do vídeo, ou um dicionário vazio se ele não tiver nenhum salvo
+        """
+
+        return self.get_many([video_id]).get(video_id, {})
+
+    def get_many(self, video_ids: list[str]) -> dict[str, dict]:
+        """
+        returns:
+            id do vídeo -> campos frios, só dos vídeos que têm algum salvo
+        """
+
+        rows = []
+        with self.lock:
+            for start in range(0, len(video_ids), SQLITE_MAX_VARIABLES):
+                chunk = video_ids[start:start + SQLITE_MAX_VARIABLES]
+                rows += self.connection.execute(
+                    f'SELECT id, data FROM cold WHERE id IN ({",".join("?" * len(chunk))})', chunk
+                ).fetchall()
+
+        return {video_id: json.loads(zlib.decompress(data)) for video_id, data in rows}
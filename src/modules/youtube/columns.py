@@ -0,0 +1,383 @@
+from datetime import date
+import re
+
+from ...utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+# campos numéricos de Video que viram colunas
+# a upload_date é guardada como o número yyyymmdd, que ordena igual à data
+FIELDS = ('view_count', 'duration', 'upload_date', 'like_count', 'comment_count')
+
+# nomes aceitos nos filtros digitados -> campo
+FIELD_ALIASES = {
+    'views': 'view_count',
+    'duration': 'duration',
+    'length': 'duration',
+    'date': 'upload_date',
+    'uploaded': 'upload_date',
+    'year': 'upload_date',
+    'likes': 'like_count',
+    'comments': 'comment_count'
+}
+
+# ex: 'duration>20m', 'views>=1.5k', 'date=2024', 'date<2024-06'
+FILTER_PATTERN = re.compile(r'^(\w+)(>=|<=|>|<|=)(\S+)$')
+
+DURATION_UNITS = {'h': 3600, 'm': 60, 's': 1}
+COUNT_SUFFIXES = {'k': 10**3, 'm': 10**6, 'b': 10**9}
+
+
+def _to_number(value) -> float:
+    # valores ausentes ou inválidos viram nan, que fica fora de qualquer filtro
+    # e vai pro final de qualquer ordenação
+    if value is None or value == '':
+        return float('nan')
+
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+class VideoColumns:
+    """
+    projeção colunar dos campos numéricos dos vídeos de uma collection
+
+    cada campo é um array do numpy alinhado com a ordem das entries, então
+    ordenar, filtrar por intervalo e agregar 100k entries é uma operação
+    vetorizada em vez de um loop criando um Video por entry
+
+    é atualizada incrementalmente: append e remove quando entries entram ou
+    saem, update_reference quando os dados de um vídeo mudam no cache
+
+    args:
+        capacity:
+            tamanho inicial dos arrays, eles dobram de tamanho quando enchem
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.entry_ids: list[str] = []
+        self.references: list[str] = []
+
+        self._positions: dict[str, int] | None = {} # id da entry -> linha
+        self._ids_array = None
+        self._columns = {f: np.full(max(capacity, 1), np.nan) for f in FIELDS}
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, entry_id: str):
+        return entry_id in self.positions
+
+    @classmethod
+    def from_entries(cls, entries: list[tuple[str, str]], videos: dict[str, dict]):
+        """
+        monta a tabela inteira de uma vez
+
+        args:
+            entries:
+                lista de (id da entry, id do vídeo), na ordem da collection
+
+            videos:
+                dicionário de id do vídeo -> dados normalizados, no formato do videos.json
+        """
+
+        table = cls(capacity=len(entries))
+        table.size = len(entries)
+        table.entry_ids = [e for e, _ in entries]
+        table.references = [r for _, r in entries]
+        table._positions = None
+
+        records = [videos.get(r) or {} for r in table.references]
+        for f in FIELDS:
+            table._columns[f][:table.size] = np.fromiter(
+                (_to_number(d.get(f)) for d in records), dtype=np.float64, count=table.size
+            )
+
+        return table
+
+    @property
+    def positions(self) -> dict[str, int]:
+        # refeito só depois de uma remoção, que desloca as linhas seguintes
+        if self._positions is None:
+            self._positions = {e: n for n, e in enumerate(self.entry_ids)}
+
+        return self._positions
+
+    def _ids(self, rows) -> list[str]:
+        # converter índices em ids com um loop em python custaria mais do que a própria
+        # ordenação, então os ids também ficam num array, refeito só quando as entries mudam
+        if self._ids_array is None:
+            self._ids_array = np.array(self.entry_ids, dtype=object)
+
+        return self._ids_array[rows].tolist()
+
+    def column(self, field: str):
+        """
+        retorna a coluna de um campo, só com as linhas ocupadas
+        NÃO DEVE SER MODIFICADA POR QUEM CHAMA, é uma view do array interno
+        """
+
+        return self._columns[field][:self.size]
+
+    def _grow(self):
+        for f, array in self._columns.items():
+            grown = np.full(len(array) * 2, np.nan)
+            grown[:self.size] = array[:self.size]
+            self._columns[f] = grown
+
+    def _write_row(self, position: int, data: dict | None):
+        data = data or {}
+        for f, array in self._columns.items():
+            array[position] = _to_number(data.get(f))
+
+    def append(self, entry_id: str, reference: str, data: dict | None):
+        """
+        adiciona uma entry no final da tabela, ou atualiza ela se já existir
+
+        args:
+            data:
+                dados normalizados do vídeo, None se ele não estiver no cache
+        """
+
+        position = self.positions.get(entry_id)
+        if position is not None:
+            self.references[position] = reference
+            self._write_row(position, data)
+            return
+
+        if self.size == len(self._columns[FIELDS[0]]):
+            self._grow()
+
+        self._write_row(self.size, data)
+        self.entry_ids.append(entry_id)
+        self.references.append(reference)
+        self.positions[entry_id] = self.size
+        self.size += 1
+        self._ids_array = None
+
+    def remove(self, entry_id: str):
+        """
+        remove uma entry mantendo a ordem das demais
+        """
+
+        self.remove_many([entry_id])
+
+    def remove_many(self, entry_ids: list[str]):
+        """
+        remove várias entries de uma vez, mantendo a ordem das demais
+        as linhas restantes são compactadas uma vez só, não uma vez por entry
+        """
+
+        rows = [self.positions[i] for i in entry_ids if i in self.positions]
+        if not rows:
+            return
+
+        keep = np.ones(self.size, dtype=bool)
+        keep[rows] = False
+        size = int(keep.sum())
+
+        for array in self._columns.values():
+            array[:size] = array[:self.size][keep]
+            array[size:self.size] = np.nan
+
+        removed = set(rows)
+        self.entry_ids = [e for n, e in enumerate(self.entry_ids) if n not in removed]
+        self.references = [r for n, r in enumerate(self.references) if n not in removed]
+
+        self.size = size
+        self._positions = None
+        self._ids_array = None
+
+    def update_reference(self, reference: str, data: dict | None):
+        """
+        atualiza todas as linhas que apontam pra um vídeo
+        usado quando os dados dele mudam no cache
+        """
+
+        for n, r in enumerate(self.references):
+            if r == reference:
+                self._write_row(n, data)
+
+    def mask(self, ranges: dict[str, tuple[float | None, float | None]]):
+        """
+        retorna um array booleano com as linhas que estão dentro de todos os intervalos
+
+        args:
+            ranges:
+                dicionário de campo -> (mínimo, máximo), os dois inclusivos
+                None em qualquer um dos lados deixa ele aberto
+        """
+
+        mask = np.ones(self.size, dtype=bool)
+        for f, (low, high) in ranges.items():
+            column = self.column(f)
+
+            if low is not None:
+                mask &= column >= low
+            if high is not None:
+                mask &= column <= high
+
+        return mask
+
+    def filter(self, ranges: dict[str, tuple[float | None, float | None]]) -> list[str]:
+        """
+        retorna os ids das entries dentro de todos os intervalos, na ordem da collection
+        """
+
+        return self._ids(np.flatnonzero(self.mask(ranges)))
+
+    def sort(self, field: str, descending: bool = False, ranges: dict | None = None) -> list[str]:
+        """
+        retorna os ids das entries ordenados por um campo
+
+        a ordenação é estável, então entries com o mesmo valor continuam
+        na ordem da collection. valores ausentes sempre ficam no final
+
+        args:
+            ranges:
+                se for passado, só as entries dentro dos intervalos são retornadas
+        """
+
+        column = self.column(field)
+
+        # o nan vai pro final tanto no crescente quanto no decrescente
+        order = np.argsort(-column if descending else column, kind='stable')
+
+        if ranges:
+            order = order[self.mask(ranges)[order]]
+
+        return self._ids(order)
+
+    def aggregate(self, ranges: dict | None = None) -> dict:
+        """
+        calcula os totais das entries, opcionalmente só das que estão dentro dos intervalos
+
+        returns:
+            dicionário com count, total_duration, mean_views, total_views,
+            min_upload_date e max_upload_date. campos sem nenhum valor ficam None
+        """
+
+        mask = self.mask(ranges or {})
+
+        def reduce(field: str, function):
+            values = self.column(field)[mask]
+            values = values[~np.isnan(values)]
+            if not len(values):
+                return None
+            return function(values).item()
+
+        def as_int(value):
+            return None if value is None else int(value)
+
+        return {
+            'count': int(mask.sum()),
+            'total_duration': as_int(reduce('duration', np.sum)),
+            'total_views': as_int(reduce('view_count', np.sum)),
+            'mean_views': reduce('view_count', np.mean),
+            'min_upload_date': as_int(reduce('upload_date', np.min)),
+            'max_upload_date': as_int(reduce('upload_date', np.max))
+        }
+
+def _parse_duration(value: str) -> tuple[int, int]:
+    # '90', '20m', '1h30m', '45s'
+    if value.isdigit():
+        return int(value), int(value)
+
+    parts = re.findall(r'(\d+)([hms])', value)
+    if not parts or ''.join(n + u for n, u in parts) != value:
+        raise ValueError(f'duração inválida: {value}')
+
+    seconds = sum(int(n) * DURATION_UNITS[u] for n, u in parts)
+    return seconds, seconds
+
+def _parse_count(value: str) -> tuple[int, int]:
+    # '1000', '1.5k', '2m'
+    multiplier = COUNT_SUFFIXES.get(value[-1:].lower(), 1)
+    number = value[:-1] if multiplier != 1 else value
+
+    try:
+        count = int(float(number) * multiplier)
+    except ValueError:
+        raise ValueError(f'número inválido: {value}')
+
+    return count, count
+
+def _parse_date(value: str) -> tuple[int, int]:
+    # 'yyyy', 'yyyy-mm', 'yyyymm', 'yyyy-mm-dd', 'yyyymmdd'
+    # retorna o primeiro e o último dia do período como yyyymmdd
+    digits = value.replace('-', '')
+    if not digits.isdigit() or len(digits) not in (4, 6, 8):
+        raise ValueError(f'data inválida: {value}')
+
+    year = int(digits[:4])
+    if len(digits) == 4:
+        return year * 10000 + 101, year * 10000 + 1231
+
+    month = int(digits[4:6])
+    if len(digits) == 6:
+        # o dia 31 serve como fim de qualquer mês, a comparação é só numérica
+        return year * 10000 + month * 100 + 1, year * 10000 + month * 100 + 31
+
+    day = int(digits[6:])
+    date(year, month, day) # valida a data, levanta ValueError
+
+    value = year * 10000 + month * 100 + day
+    return value, value
+
+PARSERS = {
+    'view_count': _parse_count,
+    'duration': _parse_duration,
+    'upload_date': _parse_date,
+    'like_count': _parse_count,
+    'comment_count': _parse_count
+}
+
+def parse_filters(query: str) -> tuple[dict[str, tuple[int | None, int | None]], str]:
+    """
+    separa os filtros de intervalo do resto do texto de uma busca
+
+    ex: 'python duration>20m date=2024' -> ({'duration': (1201, None), 'upload_date': (20240101, 20241231)}, 'python')
+
+    o valor depende do campo: durações aceitam h/m/s, contagens aceitam k/m/b
+    e datas aceitam yyyy, yyyy-mm e yyyy-mm-dd. os intervalos são inclusivos,
+    então 'duration>20m' vira 'duration>=1201'
+
+    args:
+        query:
+            texto digitado, as palavras que não são filtros voltam intactas
+
+    returns:
+        tupla (intervalos por campo, texto restante)
+        levanta ValueError se um filtro tiver um campo conhecido com valor inválido
+    """
+
+    ranges = {}
+    rest = []
+
+    for word in query.split():
+        match = FILTER_PATTERN.match(word)
+        field = FIELD_ALIASES.get(match.group(1).lower()) if match else None
+        if field is None:
+            rest.append(word)
+            continue
+
+        _, operator, value = match.groups()
+        first, last = PARSERS[field](value)
+
+        low, high = ranges.get(field, (None, None))
+
+        # cada filtro estreita o intervalo que já existia pro campo
+        if operator in ('>', '>=', '='):
+            bound = last + 1 if operator == '>' else first
+            low = bound if low is None else max(low, bound)
+
+        if operator in ('<', '<=', '='):
+            bound = first - 1 if operator == '<' else last
+            high = bound if high is None else min(high, bound)
+
+        ranges[field] = (low, high)
+
+    return ranges, ' '.join(rest)
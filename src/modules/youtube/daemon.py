@@ -0,0 +1,331 @@
+"""
+daemon local que faz as buscas do youtube pra qualquer processo da mesma máquina
+
+cada processo que precisa de metadados paga a importação do yt-dlp e a criação
+do YoutubeDL, e um script que chama a cli num loop paga isso toda vez. o daemon
+fica rodando com tudo isso já carregado (os workers do ExtractionPool, os vídeos
+de cada vault em memória, as conexões das thumbnails) e atende pedidos por um
+socket unix, uma linha de json por pedido e uma por resposta
+
+quem usa o daemon sempre tem a alternativa de fazer o trabalho no próprio processo,
+então ele é opcional: se não estiver rodando, DaemonClient.connect retorna None
+
+pedidos:
+    {"op": "ping"}
+    {"op": "lookup", "vault": root, "ids": [...]} -> só o cache, nunca a rede
+    {"op": "fetch", "vault": root, "ids": [...], "refresh": false} -> espera as buscas
+    {"op": "prefetch", "vault": root, "ids": [...]} -> agenda as buscas e responde na hora
+    {"op": "stop"}
+"""
+
+from pathlib import Path
+import json
+import os
+import socket
+import socketserver
+import threading
+
+from ...managers.cache import GlobalCache
+from ...managers.models import Vault
+from ... import logger
+from . import cache
+from .main import YouTubeModule
+from .prefetch import Prefetcher
+
+
+SOCKET_NAME = 'youtube-daemon.sock'
+
+
+def get_socket_path() -> Path:
+    """
+    retorna o caminho do socket do daemon, um por usuário
+    """
+
+    return GlobalCache.get_cache_dir() / SOCKET_NAME
+
+
+class DaemonError(Exception):
+    """
+    levantada quando o daemon responde com um erro ou a conexão com ele cai
+    """
+
+
+class DaemonClient:
+    """
+    conexão com o daemon, usada pelo módulo do youtube no lugar das buscas locais
+
+    cada thread usa a própria conexão, então pedidos de threads diferentes
+    (ex: os jobs e a gui) não esperam uns pelos outros
+
+    args:
+        path:
+            caminho do socket do daemon
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.local = threading.local()
+
+    @classmethod
+    def connect(cls, path: Path | None = None) -> 'DaemonClient | None':
+        """
+        conecta no daemon, se ele estiver rodando
+
+        returns:
+            cliente já conectado, ou None se não houver daemon
+        """
+
+        client = cls(path or get_socket_path())
+        if not client.path.exists():
+            return None
+
+        try:
+            client.ping()
+        except (OSError, DaemonError):
+            client.close()
+            return None
+
+        return client
+
+    def _get_file(self):
+        file = getattr(self.local, 'file', None)
+        if file is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(str(self.path))
+            file = self.local.file = sock.makefile('rwb')
+            self.local.socket = sock
+
+        return file
+
+    def request(self, op: str, **params) -> dict:
+        """
+        envia um pedido e espera a resposta
+
+        levanta DaemonError se o daemon responder com um erro, e OSError se a conexão cair
+        """
+
+        file = self._get_file()
+
+        try:
+            file.write(json.dumps({'op': op, **params}).encode() + b'\n')
+            file.flush()
+            line = file.readline()
+        except OSError:
+            self.close()
+            raise
+
+        if not line:
+            self.close()
+            raise DaemonError('o daemon fechou a conexão')
+
+        response = json.loads(line)
+        if 'error' in response:
+            raise DaemonError(response['error'])
+
+        return response
+
+    def lookup(self, vault: Vault, video_ids: list[str]) -> dict[str, dict | None]:
+        return self.request('lookup', vault=str(vault.root.resolve()), ids=video_ids)['videos']
+
+    def fetch(self, vault: Vault, video_ids: list[str], refresh: bool = False) -> dict[str, str]:
+        """
+        returns:
+            id do vídeo -> 'cached', 'fetched' ou 'failed'
+        """
+
+        return self.request('fetch', vault=str(vault.root.resolve()), ids=video_ids, refresh=refresh)['status']
+
+    def prefetch(self, vault: Vault, video_ids: list[str]) -> list[str]:
+        """
+        returns:
+            ids que foram agendados (os que ainda não estavam no cache)
+        """
+
+        return self.request('prefetch', vault=str(vault.root.resolve()), ids=video_ids)['queued']
+
+    def ping(self) -> dict:
+        """
+        returns:
+            pid do daemon, vaults abertos nele e processos do pool
+        """
+
+        return self.request('ping')
+
+    def stop(self):
+        self.request('stop')
+
+    def close(self):
+        # só fecha a conexão da thread atual, as das outras continuam
+        file = getattr(self.local, 'file', None)
+        if file is None:
+            return
+
+        try:
+            file.close()
+            self.local.socket.close()
+        except OSError:
+            pass
+
+        self.local.file = None
+
+
+class ExtractionDaemon:
+    """
+    servidor do daemon
+
+    guarda um YouTubeModule por vault pedido, então os vídeos de cada vault ficam
+    em memória entre os pedidos, e todos eles usam o mesmo ExtractionPool,
+    com os workers e as instâncias do yt-dlp já criados
+
+    args:
+        path:
+            caminho do socket
+
+        processes:
+            processos do ExtractionPool, o padrão é um por núcleo
+            com 0, as extrações rodam em threads do próprio daemon
+    """
+
+    def __init__(self, path: Path | None = None, processes: int | None = None):
+        self.path = path or get_socket_path()
+        self.processes = processes
+
+        self.pool = None
+        self.modules: dict[Path, YouTubeModule] = {}
+        self.lock = threading.Lock()
+        self.server = None
+
+        # prefetches agendados que ainda não terminaram
+        self.background: set[threading.Thread] = set()
+
+    def get_module(self, root: str) -> YouTubeModule:
+        root = Path(root)
+
+        with self.lock:
+            module = self.modules.get(root)
+            if module is None:
+                if not (root / '.sorted').is_dir():
+                    raise ValueError(f'{root} não é um vault')
+
+                module = self.modules[root] = YouTubeModule(Vault(root))
+                module.extraction_pool = self.pool
+
+        return module
+
+    def fetch(self, module: YouTubeModule, video_ids: list[str], refresh: bool) -> dict[str, str]:
+        prefetcher = Prefetcher(module, max_workers=max(1, min(8, len(video_ids))))
+        futures = prefetcher.submit(video_ids, refresh=refresh)
+        prefetcher.close()
+
+        return {
+            i: 'cached' if i not in futures else 'fetched' if futures[i].result() else 'failed'
+            for i in video_ids
+        }
+
+    def prefetch(self, module: YouTubeModule, video_ids: list[str]) -> list[str]:
+        prefetcher = Prefetcher(module, max_workers=max(1, min(8, len(video_ids))))
+        futures = prefetcher.submit(video_ids)
+
+        def close():
+            prefetcher.close()
+            self.background.discard(thread)
+
+        thread = threading.Thread(target=close, name='youtube-daemon-prefetch', daemon=True)
+        self.background.add(thread)
+        thread.start()
+
+        return list(futures)
+
+    def handle(self, request: dict) -> dict:
+        """
+        executa um pedido e retorna a resposta
+        """
+
+        op = request.get('op')
+        if op == 'ping':
+            processes = self.pool.processes if self.pool is not None else 0
+            return {'pid': os.getpid(), 'vaults': [str(r) for r in self.modules], 'processes': processes}
+
+        if op == 'stop':
+            # o shutdown espera o serve_forever sair, então não pode rodar na thread do pedido
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return {}
+
+        if op not in ('lookup', 'fetch', 'prefetch'):
+            raise ValueError(f'pedido desconhecido: {op}')
+
+        module = self.get_module(request['vault'])
+        video_ids = list(request.get('ids') or [])
+
+        if op == 'lookup':
+            return {'videos': {i: cache.get_video_from_cache(i, module.vault) for i in video_ids}}
+
+        if op == 'fetch':
+            return {'status': self.fetch(module, video_ids, bool(request.get('refresh')))}
+
+        return {'queued': self.prefetch(module, video_ids)}
+
+    def _remove_stale_socket(self):
+        if not self.path.exists():
+            return
+
+        # um socket que aceita conexão é de um daemon rodando, senão sobrou de um que morreu
+        client = DaemonClient.connect(self.path)
+        if client is not None:
+            client.close()
+            raise RuntimeError(f'já tem um daemon rodando em {self.path}')
+
+        self.path.unlink()
+
+    def serve_forever(self):
+        """
+        atende pedidos até receber um stop (ou o processo ser interrompido)
+        """
+
+        self._remove_stale_socket()
+
+        if self.processes != 0:
+            from .workers import ExtractionPool
+            self.pool = ExtractionPool(self.processes)
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                # uma conexão pode mandar vários pedidos, um por linha
+                for line in self.rfile:
+                    try:
+                        response = daemon.handle(json.loads(line))
+                    except Exception as err:
+                        logger.error(f'erro no pedido {line[:200]!r}: {err}')
+                        response = {'error': str(err) or type(err).__name__}
+
+                    self.wfile.write(json.dumps(response, ensure_ascii=False).encode() + b'\n')
+                    self.wfile.flush()
+
+        class Server(socketserver.ThreadingUnixStreamServer):
+            daemon_threads = True
+
+        # o socket dá acesso aos vaults do usuário, então só ele pode conectar
+        # o umask vale já na criação do arquivo pelo bind: um chmod depois deixaria uma janela
+        # em que outro usuário da máquina conseguiria conectar e pedir escritas em qualquer vault
+        umask = os.umask(0o077)
+        try:
+            self.server = Server(str(self.path), Handler)
+        finally:
+            os.umask(umask)
+
+        os.chmod(self.path, 0o600)
+
+        logger.info(f'daemon do youtube rodando em {self.path} (pid {os.getpid()})')
+
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            self.path.unlink(missing_ok=True)
+
+            for t in list(self.background):
+                t.join()
+            if self.pool is not None:
+                self.pool.close()
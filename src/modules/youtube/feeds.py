@@ -0,0 +1,250 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Iterable
+from xml.etree.ElementTree import XMLPullParser, ParseError
+
+from ...managers.models import Vault
+from ...utils.lazy import lazy_import
+from ...utils.throttle import scheduler, CircuitOpenError, Slot
+from ...utils import json_io
+from ... import logger
+
+requests = lazy_import('requests')
+
+
+# feed atom de cada canal, com os ~15 uploads mais recentes
+# é bem mais leve do que uma extração do canal pelo yt-dlp
+FEED_URL = 'https://www.youtube.com/feeds/videos.xml?channel_id={}'
+
+YT_NAMESPACE = '{http://www.youtube.com/xml/schemas/2015}'
+ATOM_NAMESPACE = '{http://www.w3.org/2005/Atom}'
+
+# quantidade de ids guardados por canal pra saber o que já foi visto
+# precisa ser maior do que o feed, senão um vídeo que sai e volta pro feed seria inserido de novo
+SEEN_LIMIT = 100
+
+
+@dataclass
+class ChannelSubscription:
+    """
+    inscrição num canal do youtube, cujos uploads novos vão pras collections inscritas
+
+    o etag e o last_modified são os da última resposta do feed, reenviados
+    na próxima consulta pra que um feed que não mudou volte como 304, sem corpo
+    """
+
+    channel_id: str
+    collections: list[str] = field(default_factory=list) # ids das collections que recebem os vídeos
+    etag: str | None = None
+    last_modified: str | None = None
+    seen: list[str] = field(default_factory=list) # ids vistos no feed, do mais recente pro mais antigo
+    checked_at: str | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            channel_id=data.get('channel_id'),
+            collections=data.get('collections') or [],
+            etag=data.get('etag'),
+            last_modified=data.get('last_modified'),
+            seen=data.get('seen') or [],
+            checked_at=data.get('checked_at')
+        )
+
+    def to_dict(self):
+        return asdict(self)
+
+    def mark_seen(self, video_ids: list[str]):
+        """
+        junta os ids de um feed aos já vistos, mantendo só os SEEN_LIMIT mais recentes
+        """
+
+        seen = set(self.seen)
+        self.seen = ([i for i in video_ids if i not in seen] + self.seen)[:SEEN_LIMIT]
+
+
+@dataclass
+class FeedResult:
+    """
+    resultado da consulta do feed de um canal
+
+    status é 'modified' quando o feed veio inteiro, 'unchanged' quando o servidor
+    respondeu 304 e 'failed' quando a requisição ou o xml falharam
+    """
+
+    channel_id: str
+    status: str
+    video_ids: list[str] = field(default_factory=list) # na ordem do feed, do mais recente pro mais antigo
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+def parse_feed(chunks: Iterable[bytes]) -> list[str]:
+    """
+    extrai os ids dos vídeos de um feed atom do youtube
+
+    o xml é processado conforme os pedaços chegam da rede, sem montar
+    a resposta inteira na memória antes, e cada entry é descartada depois de lida
+
+    args:
+        chunks:
+            pedaços do corpo da resposta
+
+    returns:
+        ids dos vídeos na ordem do feed
+        levanta ParseError se o xml for inválido
+    """
+
+    parser = XMLPullParser(events=('end',))
+    ids = []
+
+    def read_events():
+        for _, element in parser.read_events():
+            if element.tag == f'{YT_NAMESPACE}videoId' and element.text:
+                ids.append(element.text.strip())
+            elif element.tag == f'{ATOM_NAMESPACE}entry':
+                element.clear()
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        read_events()
+
+    parser.close()
+    read_events()
+
+    return ids
+
+
+class FeedWatcher:
+    """
+    consulta os feeds de vários canais em paralelo
+
+    todas as requisições passam pela mesma sessão do requests, então as conexões
+    com o servidor são reaproveitadas em vez de abrir uma nova (com tls) por canal.
+    cada consulta é condicional (If-None-Match/If-Modified-Since), então um canal
+    sem uploads novos custa só uma resposta 304
+
+    args:
+        max_workers:
+            quantidade de feeds consultados ao mesmo tempo, também é o tamanho do pool de conexões
+
+        timeout:
+            tempo máximo de cada requisição, em segundos
+
+        feed_url:
+            url do feed com {} no lugar do id do canal
+    """
+
+    def __init__(self, max_workers: int = 32, timeout: float = 10, feed_url: str = FEED_URL):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.feed_url = feed_url
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def fetch(self, subscription: ChannelSubscription) -> FeedResult:
+        """
+        consulta o feed de um canal, enviando o etag e o last_modified da última resposta
+        """
+
+        headers = {}
+        if subscription.etag:
+            headers['If-None-Match'] = subscription.etag
+        if subscription.last_modified:
+            headers['If-Modified-Since'] = subscription.last_modified
+
+        url = self.feed_url.format(subscription.channel_id)
+
+        # o feed sai do youtube.com, então divide os limites com as extrações do yt-dlp
+        try:
+            with scheduler.slot(url) as slot:
+                return self._fetch(subscription, url, headers, slot)
+        except CircuitOpenError as err:
+            logger.error(f'feed do canal {subscription.channel_id} adiado: {err}')
+            return FeedResult(subscription.channel_id, 'failed')
+
+    def _fetch(self, subscription: ChannelSubscription, url: str, headers: dict, slot: Slot) -> FeedResult:
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+        except requests.RequestException as err:
+            slot.failed()
+            logger.error(f'erro ao consultar o feed do canal {subscription.channel_id}: {err}')
+            return FeedResult(subscription.channel_id, 'failed')
+
+        # a conexão só volta pro pool depois que o corpo é lido até o fim,
+        # fechar a resposta antes disso descartaria ela
+        if response.status_code == 304:
+            response.content
+            return FeedResult(
+                subscription.channel_id, 'unchanged',
+                etag=subscription.etag, last_modified=subscription.last_modified
+            )
+
+        if response.status_code != 200:
+            response.content
+            if response.status_code == 429:
+                slot.throttled()
+            elif response.status_code >= 500:
+                slot.failed()
+
+            logger.error(f'erro ao consultar o feed do canal {subscription.channel_id}: {response.status_code}')
+            return FeedResult(subscription.channel_id, 'failed')
+
+        try:
+            video_ids = parse_feed(response.iter_content(chunk_size=16 * 1024))
+        except requests.RequestException as err:
+            response.close()
+            slot.failed()
+            logger.error(f'erro ao consultar o feed do canal {subscription.channel_id}: {err}')
+            return FeedResult(subscription.channel_id, 'failed')
+        except ParseError as err:
+            response.close()
+            logger.error(f'feed inválido do canal {subscription.channel_id}: {err}')
+            return FeedResult(subscription.channel_id, 'failed')
+
+        return FeedResult(
+            subscription.channel_id, 'modified', video_ids,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified')
+        )
+
+    def poll(self, subscriptions: list[ChannelSubscription]) -> list[FeedResult]:
+        """
+        consulta os feeds de todos os canais em paralelo
+
+        returns:
+            resultados na mesma ordem das inscrições
+        """
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='youtube-feeds') as executor:
+            return list(executor.map(self.fetch, subscriptions))
+
+    def close(self):
+        self.session.close()
+
+def _get_subscriptions_file(vault: Vault) -> Path:
+    return vault.modules_dir / 'youtube' / 'subscriptions.json'
+
+def load_subscriptions(vault: Vault) -> dict[str, ChannelSubscription]:
+    """
+    retorna as inscrições do vault, por id do canal
+    """
+
+    return {
+        channel_id: ChannelSubscription.from_dict(data)
+        for channel_id, data in json_io.read_json(_get_subscriptions_file(vault)).items()
+    }
+
+def write_subscriptions(subscriptions: dict[str, ChannelSubscription], vault: Vault):
+    """
+    salva todas as inscrições do vault com uma única escrita
+    """
+
+    json_io.write_json(
+        _get_subscriptions_file(vault),
+        {channel_id: s.to_dict() for channel_id, s in subscriptions.items()}
+    )
@@ -0,0 +1,193 @@
+from pathlib import Path
+import sqlite3
+import threading
+
+from ...utils.generic import tokenize_text
+
+
+# a tabela fts5 só é indexada pelo rowid, então o id de cada vídeo fica numa tabela
+# normal que aponta pro rowid dele. isso deixa a atualização de um vídeo O(log n)
+# em vez de varrer a tabela fts inteira procurando o id
+#
+# remove_diacritics faz 'acao' casar com 'ação', igual ao filtro da gui
+# os índices de prefixo deixam as buscas por palavras incompletas tão rápidas quanto as completas
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS ids (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS videos USING fts5(
+    title,
+    uploader,
+    description,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+'''
+
+# pesos do bm25 por coluna, na ordem da tabela (title, uploader, description)
+# um termo no título vale bem mais do que o mesmo termo perdido na descrição
+WEIGHTS = (10.0, 5.0, 1.0)
+
+# função de ranking da coluna rank do fts5, usada no ORDER BY das buscas
+RANK = f'bm25({", ".join(map(str, WEIGHTS))})'
+
+
+class VideoTextIndex:
+    """
+    índice full-text persistente dos vídeos no cache do youtube
+
+    usa uma tabela fts5 do sqlite, com ranking bm25, e é atualizado
+    incrementalmente sempre que um vídeo é salvo no cache
+
+    args:
+        file:
+            arquivo sqlite do índice, dentro do .sorted do vault
+    """
+
+    def __init__(self, file: Path):
+        self.file = file
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.file, check_same_thread=False, timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+
+        # o índice pode ser reconstruído a partir do videos.json, então não precisa
+        # de um fsync por transação. no wal isso continua sem risco de corromper o banco
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute('SELECT count(*) FROM ids').fetchone()[0]
+
+    @staticmethod
+    def _row(rowid: int, data: dict) -> tuple:
+        return (
+            rowid,
+            data.get('title') or '',
+            data.get('uploader') or '',
+            data.get('description') or ''
+        )
+
+    def _write(self, videos: list[dict]):
+        # precisa rodar dentro de uma transação
+        for v in videos:
+            video_id = v.get('id')
+            if not video_id:
+                continue
+
+            row = self.connection.execute('SELECT rowid FROM ids WHERE id = ?', (video_id,)).fetchone()
+            if row is None:
+                rowid = self.connection.execute('INSERT INTO ids (id) VALUES (?)', (video_id,)).lastrowid
+            else:
+                rowid = row[0]
+                self.connection.execute('DELETE FROM videos WHERE rowid = ?', (rowid,))
+
+            self.connection.execute(
+                'INSERT INTO videos (rowid, title, uploader, description) VALUES (?, ?, ?, ?)',
+                self._row(rowid, v)
+            )
+
+    def upsert(self, data: dict):
+        """
+        adiciona ou atualiza um vídeo no índice
+
+        args:
+            data:
+                dados normalizados do vídeo
+        """
+
+        self.upsert_many([data])
+
+    def upsert_many(self, videos: list[dict]):
+        """
+        adiciona ou atualiza vários vídeos numa única transação
+        """
+
+        with self.lock, self.connection:
+            self._write(videos)
+
+    def remove(self, video_id: str):
+        with self.lock, self.connection:
+            row = self.connection.execute('SELECT rowid FROM ids WHERE id = ?', (video_id,)).fetchone()
+            if row is None:
+                return
+
+            self.connection.execute('DELETE FROM videos WHERE rowid = ?', row)
+            self.connection.execute('DELETE FROM ids WHERE rowid = ?', row)
+
+    def rebuild(self, videos: dict[str, dict]):
+        """
+        reconstrói o índice do zero a partir de todos os vídeos do cache
+
+        args:
+            videos:
+                dicionário de id -> dados normalizados, no formato do videos.json
+        """
+
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM videos')
+            self.connection.execute('DELETE FROM ids')
+            self._write(list(videos.values()))
+            self.connection.execute("INSERT INTO videos(videos) VALUES ('optimize')")
+
+    @staticmethod
+    def build_match_query(query: str) -> str | None:
+        """
+        converte o texto digitado numa query fts5 segura
+
+        cada palavra vira um prefixo entre aspas, então caracteres especiais
+        da sintaxe do fts5 no texto do usuário não quebram a busca
+        """
+
+        tokens = tokenize_text(query)
+        if not tokens:
+            return
+
+        return ' AND '.join(f'"{t}"*' for t in tokens)
+
+    def _ranked(self, match: str, limit: int) -> list[tuple[str, float]]:
+        # o ranking acontece no sqlite, entre todos os vídeos que casam com a query
+        # o fts5 só guarda os melhores `limit` enquanto pontua, sem ordenar o resto
+        with self.lock:
+            return self.connection.execute(
+                'SELECT ids.id, rank FROM videos JOIN ids ON ids.rowid = videos.rowid '
+                'WHERE videos MATCH ? AND rank MATCH ? ORDER BY rank LIMIT ?',
+                (match, RANK, limit)
+            ).fetchall()
+
+    def search(self, query: str, limit: int = 50) -> list[tuple[str, float]]:
+        """
+        busca vídeos por título, autor e descrição
+
+        a busca acontece em duas etapas: primeiro só no título e no autor, onde
+        os termos são mais raros e valem mais, e depois, se ainda faltarem
+        resultados, na descrição também. cada etapa ordena pelo bm25 todos os
+        vídeos que casam com ela e devolve os melhores
+
+        args:
+            query:
+                texto livre. todas as palavras precisam aparecer, como prefixo
+
+            limit:
+                quantidade máxima de resultados
+
+        returns:
+            lista de (id do vídeo, score), do mais relevante pro menos relevante
+            no bm25 do sqlite, quanto menor o score, mais relevante
+        """
+
+        match = self.build_match_query(query)
+        if match is None:
+            return []
+
+        results = self._ranked(f'{{title uploader}} : ({match})', limit)
+
+        if len(results) < limit:
+            # os da primeira etapa também casam aqui, então o limite cobre eles e os que faltam
+            seen = {r[0] for r in results}
+            results += [r for r in self._ranked(match, limit + len(seen)) if r[0] not in seen]
+
+        return results[:limit]
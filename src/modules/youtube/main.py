@@ -1,19 +1,37 @@
-from PyQt6.QtWidgets import QListWidgetItem, QTableWidgetItem, QWidget, QLabel, QVBoxLayout, QHBoxLayout
-from PyQt6.QtGui import QPixmap
-from PyQt6.QtCore import Qt
+import threading
 
 from . import cache
 from .models import Video
-from .utils import build_youtube_url
-from .api import extract_video_info, instance_ytdl
-from ...utils.generic import ensure_directory, normalize_json_file
-from ...managers.models import Entry, Vault, Module
+from .mirror import PlaylistMirror, load_mirror, write_mirror
+from .feeds import ChannelSubscription, FeedWatcher, load_subscriptions, write_subscriptions
+from .prefetch import Prefetcher
+from .singleflight import SingleFlight
+from .columns import VideoColumns
+from .utils import build_youtube_url, build_playlist_url, extract_video_id, extract_playlist_id, extract_channel_id
+from .api import extract_video_info, extract_playlist_info, resolve_channel_id, instance_ytdl, close_http_session, SETTINGS, PLAYLIST_SETTINGS
+from ...utils.generic import ensure_directory, normalize_json_file, generate_random_id, get_iso_datetime
+from ...managers.models import Collection, Entry, Vault, Module
+from ...managers.store import get_content_store
+from ...managers.jobs import Job
+from ... import logger
+
+
+# prioridade dos jobs de vídeos que a gui está esperando pra exibir
+# passam na frente das buscas em segundo plano (prefetch, importações)
+DISPLAY_PRIORITY = 10
 
 
 class YouTubeModule(Module):
+    """
+    camada de dados do youtube: metadados, thumbnails e rows de exibição
+
+    não depende do qt, então pode ser usada por scripts e pela cli sem carregar a gui
+    os widgets que exibem essas rows ficam em widgets.py
+    """
+
     def __init__(self, vault: Vault):
         """
-        inicializa o módulo do youtube e prepara o downloader
+        inicializa o módulo do youtube
 
         args:
             vault:
@@ -22,11 +40,97 @@ class YouTubeModule(Module):
 
         super().__init__(id='youtube', vault=vault)
 
-        self.ytdl = instance_ytdl()
+        # a instância do yt-dlp só é criada no primeiro vídeo que não estiver no cache
+        # uma por thread, já que ela não pode ser compartilhada entre threads
+        self._local = threading.local()
+
+        # buscas em andamento por (tipo, id do vídeo), compartilhadas por quem pedir o mesmo vídeo
+        self.flights = SingleFlight()
+
+        # opcional, processos usados pelos prefetchers desse módulo no lugar das threads
+        # ver workers.ExtractionPool
+        self.extraction_pool = None
+
+        # store global de conteúdo, compartilhado com os outros vaults. None se estiver desligado
+        self.store = get_content_store()
+
+        # opcional, daemon.DaemonClient. com ele, as buscas são feitas pelo daemon,
+        # que já tem o yt-dlp carregado, e esse processo só relê o cache
+        self.daemon = None
+
+        # cópia dos vídeos conhecidos, usada pra descobrir o que mudou
+        # quando o videos.json é alterado por outro processo
+        self.known_videos = dict(cache.load_videos(self.vault))
+
+    @property
+    def ytdl(self):
+        ytdl = getattr(self._local, 'ytdl', None)
+        if ytdl is None:
+            # quiet pra que o yt-dlp não escreva no stdout, que a cli usa pra saída
+            ytdl = self._local.ytdl = instance_ytdl(SETTINGS)
+
+        return ytdl
 
     def can_handle_entry(self, entry: Entry):
         return entry.module == self.id and entry.type == 'video'
 
+    def receive_url(self, url: str):
+        video_id = extract_video_id(url)
+        if video_id is None:
+            return
+
+        return 'video', video_id
+
+    def get_entry_data(self, entry: Entry):
+        return cache.get_video_from_cache(entry.reference, self.vault)
+
+    def prefetch_entry(self, entry: Entry):
+        data = self.get_video(entry.reference)
+        if not data:
+            return False
+
+        self.get_thumbnail(data)
+        return True
+
+    def get_search_text(self, entry: Entry):
+        return self.get_search_texts([entry]).get(entry.id)
+
+    def get_search_texts(self, entries: list[Entry]) -> dict[str, str]:
+        # só o cache é consultado, uma entry sem dados locais fica fora da busca
+        videos = cache.load_videos(self.vault)
+        found = {e.reference: videos[e.reference] for e in entries if e.reference in videos}
+
+        # a descrição fica fora do videos.json, e só é lida aqui e na busca full-text
+        # as do lote inteiro vêm numa consulta só, e não uma por entry
+        found = cache.merge_cold_fields(found, self.vault)
+
+        texts = {}
+        for e in entries:
+            data = found.get(e.reference)
+            if not data:
+                continue
+
+            fields = [data.get('title'), data.get('uploader'), data.get('description')]
+            text = '\n'.join(f for f in fields if f)
+            if text:
+                texts[e.id] = text
+
+        return texts
+
+    @staticmethod
+    def _stats_from_data(data: dict | None):
+        if not data:
+            return
+
+        return {
+            'duration': data.get('duration'),
+            'upload_date': data.get('upload_date'),
+            'uploader': data.get('uploader')
+        }
+
+    def entry_stats(self, entry: Entry):
+        return self._stats_from_data(cache.get_video_from_cache(entry.reference, self.vault))
+
     def get_video(self, video_id: str):
         """
         busca os dados de um vídeo
@@ -44,6 +148,37 @@ class YouTubeModule(Module):
         if cached:
             return cached
 
+        # várias threads pedindo o mesmo vídeo esperam uma única extração
+        return self.flights.do(('video', video_id), self._fetch_video, video_id)
+
+    async def get_video_async(self, video_id: str):
+        """
+        versão pra corrotinas de get_video
+        a extração roda no executor do loop (o yt-dlp é bloqueante) e divide
+        a busca em andamento com os chamadores síncronos
+        """
+
+        cached = cache.get_video_from_cache(video_id, self.vault)
+        if cached:
+            return cached
+
+        return await self.flights.do_async(('video', video_id), self._fetch_video, video_id)
+
+    def _fetch_video(self, video_id: str):
+        # quem estava esperando uma busca que acabou de terminar pode ter começado outra
+        cached = cache.get_video_from_cache(video_id, self.vault)
+        if cached:
+            return cached
+
+        # um vídeo que outro vault já buscou vem do store global, sem acessar a rede
+        if self.import_known_videos([video_id]):
+            return cache.get_video_from_cache(video_id, self.vault)
+
+        if self.daemon is not None:
+            data = self._fetch_video_remote(video_id)
+            if data is not False:
+                return data
+
         url = build_youtube_url(video_id)
         data = extract_video_info(url, self.ytdl)
         if not data:
@@ -56,11 +191,582 @@ class YouTubeModule(Module):
         # se não achar o vídeo, escreve ele no cache agora
         # e depois ATUALIZA as informações lidas, pq o data antigo
         # vai continuar sem ter o vídeo recém adicionado, então precisa reler
-        cache.write_video_to_cache(data, self.vault)
-        newly_cached = cache.get_video_from_cache(video_id, self.vault)
+        self.store_videos([data])
+        return cache.get_video_from_cache(video_id, self.vault)
+
+    def _fetch_video_remote(self, video_id: str):
+        # retorna False se o daemon não respondeu, e a busca tem que ser feita aqui
+        from .daemon import DaemonError
+
+        try:
+            status = self.daemon.fetch(self.vault, [video_id])
+        except (OSError, DaemonError) as err:
+            logger.error(f'o daemon não respondeu, buscando o vídeo {video_id} sem ele: {err}')
+            self.daemon = None
+            return False
+
+        if status.get(video_id) == 'failed':
+            return None
+
+        return cache.get_video_from_cache(video_id, self.vault)
+
+    def store_videos(self, videos: list[dict], publish: bool = True) -> list[dict]:
+        """
+        salva no cache vídeos que acabaram de ser baixados, com uma única escrita
+
+        args:
+            videos:
+                dados brutos vindos do yt-dlp
+
+            publish:
+                também salva os vídeos no store global, se ele estiver ligado
+
+        returns:
+            dados normalizados dos vídeos salvos
+        """
+
+        stored = cache.write_videos_to_cache(videos, self.vault)
+
+        if publish and self.store is not None:
+            self.store.put_records(self.id, {data['id']: data for data in stored})
+
+        for data in stored:
+            # as entries que já apontavam pro vídeo estavam contadas com os dados antigos,
+            # ou sem nenhum se ele ainda não estava no cache
+            old = self._stats_from_data(self.known_videos.get(data['id']))
+
+            # escrita feita por esse próprio processo, não conta como mudança externa
+            # guardado como está no videos.json, sem os campos frios
+            self.known_videos[data['id']] = Video.split_record(data)[0]
+
+            self.vault.update_stats(self.id, 'video', data['id'], old, self._stats_from_data(data))
+
+        return stored
+
+    def import_known_videos(self, video_ids: list[str]) -> list[str]:
+        """
+        copia pro cache do vault os vídeos que já estão no store global, com as thumbnails deles
+        nenhum acesso à rede, então quem chama só precisa buscar os que sobrarem
+
+        returns:
+            ids dos vídeos copiados
+        """
+
+        if self.store is None or not video_ids:
+            return []
+
+        records = self.store.get_records(self.id, video_ids)
+        if not records:
+            return []
+
+        stored = self.store_videos(list(records.values()), publish=False)
+        cache.link_thumbnails_from_store([v['id'] for v in stored], self.vault)
+
+        return [v['id'] for v in stored]
+
+    def publish_to_store(self) -> dict:
+        """
+        copia pro store global todos os vídeos e thumbnails do cache desse vault
+        as thumbnails do vault viram hardlinks pros blobs do store
+
+        returns:
+            quantidade de vídeos e thumbnails publicados
+        """
+
+        if self.store is None:
+            return {'videos': 0, 'thumbnails': 0}
+
+        videos = cache.load_videos(self.vault)
+        self.store.put_records(self.id, cache.merge_cold_fields(videos, self.vault))
+
+        thumbnails = 0
+        for i in videos:
+            thumb = cache.get_thumbnail_file(i, self.vault)
+            if thumb is None:
+                continue
+
+            blob = self.store.put_file(self.id, i, thumb.read_bytes())
+            cache.get_thumbnail_store(self.vault).link(i, blob, blob.name)
+            thumbnails += 1
+
+        return {'videos': len(videos), 'thumbnails': thumbnails}
+
+    def import_playlist(self, url: str, collection: Collection) -> dict | None:
+        """
+        insere todos os vídeos de uma playlist do youtube numa collection
+
+        a playlist é só listada (extract_flat), sem abrir cada vídeo, e todas as entries
+        são inseridas com uma única escrita da collection. os metadados não são buscados
+        aqui, isso fica pro Prefetcher, que pode rodar em segundo plano depois
+
+        args:
+            url:
+                url da playlist (ou só o id dela)
+
+            collection:
+                collection onde os vídeos vão ser inseridos
+
+        returns:
+            dicionário com o id e o título da playlist, os ids de todos os vídeos dela,
+            as entries criadas e a quantidade de vídeos que já estavam na collection
+            None se a playlist não puder ser listada ou a collection não puder ser salva
+        """
+
+        info = self._list_playlist(url)
+        if info is None:
+            return
+
+        entries = self._create_entries(info['ids'], collection)
+        if entries and not collection.write_entries(entries):
+            return
+
+        return {
+            'playlist_id': info['id'],
+            'title': info['title'],
+            'ids': info['ids'],
+            'entries': entries,
+            'duplicates': len(info['ids']) - len(entries)
+        }
+
+    def _list_playlist(self, url: str) -> dict | None:
+        playlist_id = extract_playlist_id(url) or url.strip()
+        return extract_playlist_info(build_playlist_url(playlist_id), instance_ytdl(PLAYLIST_SETTINGS))
+
+    def _create_entries(self, video_ids: list[str], collection: Collection) -> list[Entry]:
+        # cria entries só pros vídeos que ainda não estão na collection
+        entries = []
+        seen = set()
+        for video_id in video_ids:
+            if video_id in seen or collection.contains_reference(self.id, 'video', video_id):
+                continue
+            seen.add(video_id)
+
+            entries.append(Entry(
+                id=generate_random_id(),
+                created_at=get_iso_datetime(),
+                module=self.id,
+                type='video',
+                reference=video_id
+            ))
+
+        return entries
+
+    def link_mirror(self, url: str, collection: Collection) -> PlaylistMirror | None:
+        """
+        liga uma collection a uma playlist, que passa a ser espelhada por sync_mirror
+
+        a ligação começa sem nenhum id visto, então a primeira sincronização insere
+        a playlist inteira (menos o que já estiver na collection) e não apaga nada
+
+        returns:
+            PlaylistMirror criado, ou None se a collection não tiver id
+        """
+
+        if collection.id is None:
+            logger.error(f'a collection {collection.file} não tem id, então não pode espelhar uma playlist')
+            return
+
+        mirror = PlaylistMirror(
+            collection_id=collection.id,
+            playlist_id=extract_playlist_id(url) or url.strip()
+        )
+        write_mirror(mirror, self.vault)
+
+        return mirror
+
+    def sync_mirror(self, collection: Collection) -> dict | None:
+        """
+        aplica na collection o que mudou na playlist desde a última sincronização
+
+        a playlist é listada (extract_flat) e os ids são comparados com os da última
+        listagem: se o checksum for igual nada é escrito. senão, só os vídeos que
+        entraram são inseridos e só os que saíram são apagados, com uma escrita cada.
+        vídeos inseridos à mão na collection nunca são apagados, só os que já foram
+        vistos na playlist
+
+        os metadados não são buscados aqui, os ids novos podem ir pro Prefetcher depois
+
+        returns:
+            dicionário com o id e o título da playlist, as entries criadas, os ids das
+            entries apagadas e se a playlist estava igual à última sincronização
+            None se a collection não espelhar uma playlist, se ela não puder ser listada
+            ou se a collection não puder ser salva
+        """
+
+        mirror = load_mirror(collection.id, self.vault) if collection.id else None
+        if mirror is None:
+            logger.error(f'a collection {collection.file} não espelha nenhuma playlist')
+            return
+
+        info = self._list_playlist(mirror.playlist_id)
+        if info is None:
+            return
+
+        result = {
+            'playlist_id': info['id'],
+            'title': info['title'],
+            'count': len(info['ids']),
+            'entries': [],
+            'erased': [],
+            'unchanged': False
+        }
+
+        checksum = PlaylistMirror.compute_checksum(info['ids'])
+        if checksum == mirror.checksum:
+            result['unchanged'] = True
+            return result
+
+        previous = set(mirror.ids)
+        current = set(info['ids'])
+
+        added = [i for i in info['ids'] if i not in previous]
+        removed = previous - current
+
+        if removed:
+            result['erased'] = [
+                e.id for e in collection.entries.values()
+                if e.module == self.id and e.type == 'video' and e.reference in removed
+            ]
+            # sem salvar a collection o espelho não avança, a próxima sincronização tenta de novo
+            if result['erased'] and not collection.erase_entries(result['erased']):
+                return
+
+        result['entries'] = self._create_entries(added, collection)
+        if result['entries'] and not collection.write_entries(result['entries']):
+            return
+
+        mirror.ids = info['ids']
+        mirror.checksum = checksum
+        mirror.synced_at = get_iso_datetime()
+        write_mirror(mirror, self.vault)
+
+        return result
+    
+    def subscribe(self, channel: str, collection: Collection) -> ChannelSubscription | None:
+        """
+        inscreve uma collection num canal, que passa a receber os uploads novos dele
+        em cada poll_subscriptions
+
+        args:
+            channel:
+                id ou url do canal. urls com o @ são resolvidas pelo yt-dlp
+
+        returns:
+            a inscrição do canal, ou None se o canal não for encontrado ou a collection não tiver id
+        """
+
+        if collection.id is None:
+            logger.error(f'a collection {collection.file} não tem id, então não pode se inscrever num canal')
+            return
+
+        channel_id = extract_channel_id(channel)
+        if channel_id is None:
+            channel_id = resolve_channel_id(channel.strip(), instance_ytdl({**PLAYLIST_SETTINGS, 'playlistend': 1}))
+        if channel_id is None:
+            logger.error(f'canal {channel} não encontrado')
+            return
+
+        subscriptions = load_subscriptions(self.vault)
+        subscription = subscriptions.setdefault(channel_id, ChannelSubscription(channel_id=channel_id))
+        if collection.id not in subscription.collections:
+            subscription.collections.append(collection.id)
+
+        write_subscriptions(subscriptions, self.vault)
+        return subscription
+
+    def unsubscribe(self, channel: str, collection: Collection) -> bool:
+        """
+        cancela a inscrição de uma collection num canal
+
+        returns:
+            False se a collection não estava inscrita
+        """
+
+        channel_id = extract_channel_id(channel) or channel.strip()
+
+        subscriptions = load_subscriptions(self.vault)
+        subscription = subscriptions.get(channel_id)
+        if subscription is None or collection.id not in subscription.collections:
+            return False
+
+        subscription.collections.remove(collection.id)
+
+        # sem nenhuma collection, o canal não precisa mais ser consultado
+        if not subscription.collections:
+            del subscriptions[channel_id]
+
+        write_subscriptions(subscriptions, self.vault)
+        return True
+
+    def poll_subscriptions(self, watcher: FeedWatcher | None = None) -> list[dict]:
+        """
+        consulta os feeds de todos os canais inscritos e insere os uploads
+        que ainda não foram vistos nas collections inscritas
+
+        os feeds são consultados em paralelo, e cada collection recebe os vídeos
+        de todos os seus canais com uma única escrita. os metadados não são
+        buscados aqui, as entries novas podem ir pro Prefetcher depois
+
+        args:
+            watcher:
+                opcional. FeedWatcher usado nas consultas, senão um é criado só pra essa chamada
+
+        returns:
+            um dicionário por canal com o id dele, o status da consulta (ver FeedResult)
+            e as entries criadas em cada collection. o status é 'failed' também quando
+            uma collection do canal não pôde ser salva
+        """
+
+        subscriptions = load_subscriptions(self.vault)
+        if not subscriptions:
+            return []
+
+        own_watcher = watcher is None
+        if own_watcher:
+            watcher = FeedWatcher()
+
+        try:
+            results = watcher.poll(list(subscriptions.values()))
+        finally:
+            if own_watcher:
+                watcher.close()
+
+        # id da collection -> ids dos vídeos novos, de todos os canais
+        pending: dict[str, list[str]] = {}
+
+        # estado de cada canal antes da consulta, que volta se uma collection dele não for salva
+        previous: dict[str, tuple] = {}
+
+        for result in results:
+            subscription = subscriptions[result.channel_id]
+            if result.status == 'failed':
+                continue
+
+            subscription.checked_at = get_iso_datetime()
+            if result.status == 'unchanged':
+                continue
+
+            previous[result.channel_id] = (subscription.etag, subscription.last_modified, subscription.seen)
+
+            seen = set(subscription.seen)
+            new_ids = [i for i in result.video_ids if i not in seen]
+
+            subscription.etag = result.etag
+            subscription.last_modified = result.last_modified
+            subscription.mark_seen(result.video_ids)
+
+            for collection_id in subscription.collections:
+                pending.setdefault(collection_id, []).extend(new_ids)
+
+        created: dict[str, list[Entry]] = {}
+        unsaved: set[str] = set()
+        for collection_id, video_ids in pending.items():
+            file = self.vault.references.collection_file(collection_id)
+            if file is None or not file.is_file():
+                logger.error(f'collection {collection_id} inscrita em canais não encontrada')
+                continue
 
-        return newly_cached
+            collection = Collection.from_file(file, self.vault)
+            entries = self._create_entries(video_ids, collection)
+            if entries and not collection.write_entries(entries):
+                unsaved.add(collection_id)
+                continue
+
+            for e in entries:
+                created.setdefault(e.reference, []).append(e)
+
+        # os vídeos de uma collection que não foi salva não podem ficar marcados como vistos,
+        # senão nunca mais entram nela. o canal volta pro estado de antes e é consultado
+        # inteiro de novo na próxima vez; nas collections que foram salvas os vídeos
+        # repetidos são ignorados pelo _create_entries
+        failed = set()
+        for channel_id, (etag, last_modified, seen) in previous.items():
+            subscription = subscriptions[channel_id]
+            if unsaved.intersection(subscription.collections):
+                subscription.etag, subscription.last_modified, subscription.seen = etag, last_modified, seen
+                failed.add(channel_id)
+
+        write_subscriptions(subscriptions, self.vault)
+
+        return [
+            {
+                'channel_id': result.channel_id,
+                'status': 'failed' if result.channel_id in failed else result.status,
+                'entries': [e for i in result.video_ids for e in created.pop(i, [])]
+            }
+            for result in results
+        ]
+    
+    def enqueue_videos(self, video_ids: list[str], priority: int = 0, refresh: bool = False) -> list[str]:
+        """
+        coloca na fila do vault a busca dos metadados e da thumbnail de vários vídeos
+        a busca roda em segundo plano pela JobRunner, quem chama não espera
+
+        args:
+            refresh:
+                busca de novo mesmo os vídeos que já estão no cache
+
+        returns:
+            ids dos vídeos enfileirados, os que já estavam no cache ficam de fora se não for refresh
+        """
+
+        if not refresh:
+            video_ids = [i for i in video_ids if not cache.get_video_from_cache(i, self.vault)]
+
+        kind = 'refresh' if refresh else 'metadata'
+        self.vault.jobs.enqueue_many(
+            self.id, kind,
+            [{'reference': i} for i in video_ids],
+            [f'{self.id}:{kind}:{i}' for i in video_ids],
+            priority
+        )
+
+        return video_ids
+
+    def enqueue_thumbnails(self, video_ids: list[str], priority: int = 0):
+        """
+        coloca na fila do vault o download das thumbnails de vídeos que já estão no cache
+        """
+
+        self.vault.jobs.enqueue_many(
+            self.id, 'thumbnail',
+            [{'reference': i} for i in video_ids],
+            [f'{self.id}:thumbnail:{i}' for i in video_ids],
+            priority
+        )
+
+    def run_jobs(self, jobs: list[Job]):
+        """
+        executa um lote de jobs do youtube
+
+        os metadados do lote são buscados em paralelo pelo Prefetcher, que já
+        baixa as thumbnails e salva todos os vídeos com uma única escrita do cache
+        """
+
+        results = {}
+
+        fetches = {'metadata': [], 'refresh': []}
+        for j in jobs:
+            video_id = j.payload.get('reference')
+
+            if j.kind in fetches:
+                fetches[j.kind].append(j)
+                continue
+
+            if j.kind == 'thumbnail':
+                data = cache.get_video_from_cache(video_id, self.vault)
+                if data is None:
+                    results[j.id] = 'vídeo não está no cache'
+                elif self.get_thumbnail(data) is None:
+                    results[j.id] = 'thumbnail não baixada'
+                else:
+                    results[j.id] = None
+                continue
+
+            results[j.id] = f'tipo de job desconhecido: {j.kind}'
+
+        if fetches['metadata'] or fetches['refresh']:
+            prefetcher = Prefetcher(self, max_workers=min(8, len(jobs)))
+            futures = {
+                kind: prefetcher.submit([j.payload.get('reference') for j in group], refresh=kind == 'refresh')
+                for kind, group in fetches.items()
+            }
+            prefetcher.close()
+
+            for kind, group in fetches.items():
+                for j in group:
+                    future = futures[kind].get(j.payload.get('reference'))
+
+                    # um vídeo que não foi agendado já estava no cache
+                    if future is None or future.result():
+                        results[j.id] = None
+                    else:
+                        results[j.id] = 'extração falhou'
+
+        return results
     
+    def cache_files(self):
+        return [cache._get_videos_file(self.vault)]
+
+    def reload_cache(self):
+        """
+        relê o videos.json e compara com a última versão conhecida
+
+        returns:
+            ids dos vídeos que foram adicionados, removidos ou alterados
+        """
+
+        previous = self.known_videos
+        current = cache.load_videos(self.vault)
+
+        changed = {
+            i for i in previous.keys() | current.keys()
+            if previous.get(i) != current.get(i)
+        }
+
+        self.known_videos = dict(current)
+
+        # os totais das collections que têm esses vídeos são recalculados do zero
+        if changed:
+            self.vault.recompute_stats(self.id, 'video', list(changed))
+
+        return changed
+
+    def search(self, query: str, limit: int = 50) -> list[dict]:
+        """
+        busca no índice full-text todos os vídeos do cache do vault
+
+        args:
+            query:
+                texto livre, comparado com título, autor e descrição
+
+            limit:
+                quantidade máxima de resultados
+
+        returns:
+            lista do mais relevante pro menos relevante, cada item com o id, título
+            e autor do vídeo, o score bm25 e as collections (id -> ids das entries) que têm ele
+        """
+
+        index = cache.get_text_index(self.vault)
+
+        # um cache que existia antes do índice precisa ser indexado uma vez
+        videos = cache.load_videos(self.vault)
+        if videos and len(index) == 0:
+            index.rebuild(cache.merge_cold_fields(videos, self.vault))
+
+        results = []
+        for video_id, score in index.search(query, limit):
+            data = videos.get(video_id, {})
+            results.append({
+                'id': video_id,
+                'title': data.get('title'),
+                'uploader': data.get('uploader'),
+                'score': score,
+                'collections': self.vault.references.lookup(self.id, 'video', video_id)
+            })
+
+        return results
+
+    def build_columns(self, entries: list[Entry]) -> VideoColumns:
+        """
+        monta a tabela colunar dos vídeos de uma lista de entries, na mesma ordem
+        só o cache é consultado, vídeos que não estão nele ficam com os campos vazios
+        """
+
+        return VideoColumns.from_entries(
+            [(e.id, e.reference) for e in entries if self.can_handle_entry(e)],
+            cache.load_videos(self.vault)
+        )
+
+    def update_columns(self, columns: VideoColumns, entry: Entry):
+        """
+        adiciona ou atualiza uma entry numa tabela criada por build_columns
+        """
+
+        if self.can_handle_entry(entry):
+            columns.append(entry.id, entry.reference, cache.get_video_from_cache(entry.reference, self.vault))
+
     def get_thumbnail(self, video_data: dict):
         """
         busca a thumbnail de um vídeo
@@ -74,73 +780,141 @@ class YouTubeModule(Module):
             path da thumbnail ou None se falhar
         """
         
-        def search_cached_thumbnail(video_id: str):
-            return cache._get_thumbnail_path(video_id, self.vault)
-        
         video_id = video_data.get('id')
         
-        thumb = search_cached_thumbnail(video_id)
-        if thumb.is_file():
+        thumb = cache.get_thumbnail_file(video_id, self.vault)
+        if thumb is not None:
             return thumb
 
-        cache.download_thumbnail_to_cache(video_data, self.vault)
-        
-        thumb = search_cached_thumbnail(video_id)
-        if thumb.is_file():
+        # a mesma thumbnail já baixada por outro vault só é ligada no cache desse
+        if cache.link_thumbnails_from_store([video_id], self.vault):
+            return cache.get_thumbnail_file(video_id, self.vault)
+
+        return self.download_thumbnail(video_data)
+
+    async def get_thumbnail_async(self, video_data: dict):
+        """
+        versão pra corrotinas de get_thumbnail
+        """
+
+        thumb = cache.get_thumbnail_file(video_data.get('id'), self.vault)
+        if thumb is not None:
             return thumb
 
-    def build_entry_widget(self, entry: Entry):
+        if self.store is not None:
+            import asyncio
+
+            if await asyncio.to_thread(cache.link_thumbnails_from_store, [video_data.get('id')], self.vault):
+                return cache.get_thumbnail_file(video_data.get('id'), self.vault)
+
+        # o download roda no próprio loop, pelo aiohttp
+        return await self.flights.do_async(('thumbnail', video_data.get('id')), self._download_thumbnail_async, video_data)
+
+    def download_thumbnail(self, video_data: dict):
+        """
+        baixa a thumbnail de um vídeo mesmo que ela já esteja no cache
+        downloads simultâneos do mesmo vídeo viram um só
+
+        returns:
+            path da thumbnail ou None se falhar
+        """
+
+        return self.flights.do(('thumbnail', video_data.get('id')), self._download_thumbnail, video_data)
+
+    def _download_thumbnail(self, video_data: dict):
+        cache.download_thumbnail_to_cache(video_data, self.vault)
+        return cache.get_thumbnail_file(video_data.get('id'), self.vault)
+
+    async def _download_thumbnail_async(self, video_data: dict):
+        await cache.download_thumbnail_to_cache_async(video_data, self.vault)
+        return cache.get_thumbnail_file(video_data.get('id'), self.vault)
+
+    async def resolve_many(self, urls: list[str]) -> dict[str, dict | None]:
+        """
+        busca ao mesmo tempo os dados e as thumbnails dos vídeos de várias urls
+
+        as extrações rodam num Prefetcher, com poucas threads e o cache salvo em lotes,
+        e as thumbnails saem todas pelo loop, então milhares de urls não viram milhares
+        de threads nem milhares de escritas do videos.json. urls repetidas
+        (ou já em andamento em outro lugar) viram uma busca só
+
+        returns:
+            ver Module.resolve_many, 'data' são os dados normalizados do vídeo
         """
-        cria um widget de interface pra representar uma entry de vídeo
 
-        esse método monta o layout com thumbnail + infos do vídeo
-        e retorna tanto o item da lista quanto o widget visual
+        import asyncio
+
+        results = await super().resolve_many(urls)
+        resolved = [r for r in results.values() if r is not None]
+
+        video_ids = list(dict.fromkeys(r['reference'] for r in resolved))
+        prefetcher = Prefetcher(self, max_workers=min(8, len(video_ids) or 1), thumbnails=False)
+        futures = prefetcher.submit(video_ids)
+        await asyncio.gather(*(asyncio.wrap_future(f) for f in futures.values()))
+        await asyncio.to_thread(prefetcher.close)
+
+        videos = {i: cache.get_video_from_cache(i, self.vault) for i in video_ids}
+        await asyncio.gather(*(self.get_thumbnail_async(v) for v in videos.values() if v))
+
+        for r in resolved:
+            r['data'] = videos[r['reference']]
+
+        return results
+
+    async def close_async(self):
+        await close_http_session()
+
+    def build_entry_row(self, entry: Entry):
+        """
+        monta os dados já prontos pra exibição de uma entry de vídeo
+
+        a row só tem tipos simples (strings, números), então pode ser salva
+        no snapshot de inicialização e usada depois sem consultar o cache
 
         args:
             entry:
                 entrada do vault que aponta pra um vídeo do youtube
 
         returns:
-            tupla (item, widget) usada na ui
+            dicionário com os valores formatados ou None se o vídeo não for encontrado
         """
-        
-        video_id = entry.reference
 
-        data = self.get_video(video_id)
+        # a row é montada só com o que está no cache, o que falta vai pra fila do vault
+        # e a gui reconstrói a row quando o job terminar, em vez de travar esperando a rede
+        data = cache.get_video_from_cache(entry.reference, self.vault)
         if not data:
-            return
+            self.enqueue_videos([entry.reference], priority=DISPLAY_PRIORITY)
+            return self._build_pending_row(entry)
         
         video = Video.from_dict(data)
         if not video:
             return
 
-        layout = QHBoxLayout()
-        widget = QWidget()
-        widget.setLayout(layout)
+        thumbnail = cache.get_thumbnail_file(video.id, self.vault)
+        if thumbnail is None:
+            self.enqueue_thumbnails([video.id], priority=DISPLAY_PRIORITY)
 
-        # thumbnail
-        thumb_label = QLabel()
-        pixmap = QPixmap(str(self.get_thumbnail(data)))
-        thumb_label.setPixmap(pixmap.scaled(120, 90, Qt.AspectRatioMode.KeepAspectRatio))
-        layout.addWidget(thumb_label)
-        
-        right_layout = QVBoxLayout()
-        right_layout.addWidget(QLabel(video.title))
-        meta_layout = QHBoxLayout()
-        meta_layout.addWidget(QLabel(video.uploader))
-        meta_layout.addWidget(QLabel(video.view_count_formatted))
-        meta_layout.addWidget(QLabel(video.upload_date_formatted))
-        right_layout.addLayout(meta_layout)
-        layout.addLayout(right_layout)
-        layout.addStretch()
-
-        item = QListWidgetItem()
-        item.setData(Qt.ItemDataRole.UserRole, entry.id)
-
-        # definir altura mínima pra não ficar invisível
-        widget.setMinimumHeight(40)
-        item.setSizeHint(widget.sizeHint())
-        
-        print('carregado')
-        
-        return item, widget
\ No newline at end of file
+        return {
+            'entry_id': entry.id,
+            'module': self.id,
+            'reference': video.id,
+            'title': video.title,
+            'uploader': video.uploader,
+            'view_count': video.view_count_formatted,
+            'upload_date': video.upload_date_formatted,
+            'thumbnail': str(thumbnail) if thumbnail else None
+        }
+
+    def _build_pending_row(self, entry: Entry):
+        # row provisória de um vídeo que ainda não está no cache
+        return {
+            'entry_id': entry.id,
+            'module': self.id,
+            'reference': entry.reference,
+            'title': build_youtube_url(entry.reference),
+            'uploader': None,
+            'view_count': None,
+            'upload_date': None,
+            'thumbnail': None,
+            'pending': True
+        }
@@ -0,0 +1,69 @@
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+import hashlib
+
+from ...managers.models import Vault
+from ...utils import json_io
+
+
+@dataclass
+class PlaylistMirror:
+    """
+    ligação entre uma collection e a playlist do youtube que ela espelha
+
+    guarda os ids vistos na última sincronização, então a próxima só precisa
+    aplicar o que entrou e saiu da playlist desde então
+    """
+
+    collection_id: str
+    playlist_id: str
+    ids: list[str] = field(default_factory=list) # ids da playlist na última sincronização
+    checksum: str | None = None # checksum dos ids, igual entre duas listagens = nada mudou
+    synced_at: str | None = None
+
+    @staticmethod
+    def compute_checksum(ids: list[str]) -> str:
+        """
+        calcula o checksum de uma listagem da playlist
+        a ordem conta, então uma playlist reordenada também é considerada alterada
+        """
+
+        return hashlib.sha256('\n'.join(ids).encode()).hexdigest()
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            collection_id=data.get('collection_id'),
+            playlist_id=data.get('playlist_id'),
+            ids=data.get('ids') or [],
+            checksum=data.get('checksum'),
+            synced_at=data.get('synced_at')
+        )
+
+    def to_dict(self):
+        return asdict(self)
+
+def _get_mirrors_file(vault: Vault) -> Path:
+    return vault.modules_dir / 'youtube' / 'mirrors.json'
+
+def load_mirror(collection_id: str, vault: Vault) -> PlaylistMirror | None:
+    """
+    retorna o espelho de uma collection, ou None se ela não espelhar nenhuma playlist
+    """
+
+    data = json_io.read_json(_get_mirrors_file(vault)).get(collection_id)
+    if data is None:
+        return
+
+    return PlaylistMirror.from_dict(data)
+
+def write_mirror(mirror: PlaylistMirror, vault: Vault):
+    """
+    salva ou atualiza o espelho de uma collection
+    """
+
+    file = _get_mirrors_file(vault)
+
+    mirrors = json_io.read_json(file)
+    mirrors[mirror.collection_id] = mirror.to_dict()
+    json_io.write_json(file, mirrors)
@@ -30,6 +30,10 @@ class Video:
     thumbnail: str
     thumbnail_mq: Optional[str]
 
+    # campos grandes que a lista nunca exibe, guardados fora do videos.json (ver cold.py)
+    # um Video montado só com o registro do videos.json fica com eles em None
+    COLD_FIELDS = ('description',)
+
     @property
     def view_count_formatted(self):
         return utils.format_count(self.view_count or 0)
@@ -78,7 +82,9 @@ class Video:
         #
         # outras resoluções poderiam ser obtidas da mesma forma que a mqdefault,
         # apenas verificando padrões na url (ex: '/maxresdefault', '/hq720', etc)
-        thumbnail_mq = None
+        # dados que já foram normalizados não têm a lista, então mantêm a mq que já tinham
+        # isso deixa a normalização segura de ser aplicada duas vezes
+        thumbnail_mq = data.get('thumbnail_mq')
 
         for t in data.get('thumbnails', []):
             url = t.get('url')
@@ -104,6 +110,21 @@ class Video:
             'thumbnail_mq': thumbnail_mq
         }
 
+    @classmethod
+    def split_record(cls, data: dict) -> tuple[dict, dict]:
+        """
+        separa um registro normalizado na parte quente, que vai pro videos.json,
+        e na fria, com os campos de COLD_FIELDS
+
+        returns:
+            tupla (registro quente, campos frios). os frios ausentes ou vazios ficam de fora
+        """
+
+        hot = {k: v for k, v in data.items() if k not in cls.COLD_FIELDS}
+        cold = {k: data[k] for k in cls.COLD_FIELDS if data.get(k)}
+
+        return hot, cold
+
     @classmethod
     def from_dict(cls, data: dict):
         """
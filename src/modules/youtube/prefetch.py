@@ -0,0 +1,272 @@
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Callable
+import threading
+
+from . import cache
+from ... import logger
+from .api import extract_video_info, instance_ytdl, SETTINGS
+from .models import Video
+from .utils import build_youtube_url
+
+if TYPE_CHECKING:
+    from .main import YouTubeModule
+    from .workers import ExtractionPool
+
+
+class Prefetcher:
+    """
+    busca em segundo plano os metadados e as thumbnails de vários vídeos
+
+    as extrações rodam em paralelo, cada thread com a própria instância do yt-dlp
+    (ela não pode ser compartilhada entre threads). os resultados são juntados e
+    salvos no cache em lotes, então o videos.json é reescrito uma vez por lote
+    em vez de uma vez por vídeo
+
+    uso:
+        prefetcher = Prefetcher(module)
+        futures = prefetcher.submit(ids) # retorna na hora
+        ...
+        prefetcher.close() # espera terminar e salva o que faltar
+
+    args:
+        module:
+            módulo do youtube do vault onde os vídeos vão ser salvos
+
+        max_workers:
+            quantidade de vídeos extraídos ao mesmo tempo
+
+        batch_size:
+            quantidade de vídeos juntados antes de cada escrita do cache
+
+        on_result:
+            opcional. chamado com (id do vídeo, sucesso) assim que cada vídeo termina,
+            já salvo no cache. roda na thread do worker
+
+        thumbnails:
+            se falso, só os metadados são buscados (ex: quando as thumbnails
+            vão ser baixadas pela api assíncrona)
+
+        pool:
+            opcional. processos onde as extrações rodam, o padrão é o extraction_pool
+            do módulo. sem nenhum, as extrações rodam nas próprias threads
+
+    se o módulo estiver ligado a um daemon (ver daemon.py), os vídeos são buscados
+    por ele em lotes, e o prefetcher só espera as respostas. se o daemon cair no meio,
+    os vídeos que faltam voltam a ser buscados aqui mesmo
+    """
+
+    def __init__(
+        self,
+        module: 'YouTubeModule',
+        max_workers: int = 8,
+        batch_size: int = 50,
+        on_result: Callable[[str, bool], None] | None = None,
+        thumbnails: bool = True,
+        pool: 'ExtractionPool | None' = None
+    ):
+        self.module = module
+        self.batch_size = batch_size
+        self.on_result = on_result
+        self.thumbnails = thumbnails
+        self.pool = pool or module.extraction_pool
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='youtube-prefetch')
+        self.local = threading.local()
+
+        # vídeos já extraídos esperando a próxima escrita do cache
+        # o lock também serializa as escritas, que reescrevem o videos.json inteiro
+        self.lock = threading.Lock()
+        self.pending: list[tuple[str, dict, Future]] = []
+        self.in_flight = 0
+
+        self.submitted: dict[str, Future] = {}
+
+        # futures do single-flight do módulo das buscas que esse prefetcher lidera
+        self.flights: dict[str, Future] = {}
+
+    def _get_ytdl(self):
+        ytdl = getattr(self.local, 'ytdl', None)
+        if ytdl is None:
+            ytdl = self.local.ytdl = instance_ytdl(SETTINGS)
+
+        return ytdl
+
+    def submit(self, video_ids: list[str], refresh: bool = False) -> dict[str, Future]:
+        """
+        agenda a busca dos vídeos que ainda não estão no cache
+
+        args:
+            refresh:
+                busca de novo mesmo os vídeos que já estão no cache, pra atualizar os dados deles
+
+        returns:
+            dicionário de id do vídeo -> future com o resultado (True se o vídeo foi salvo)
+            vídeos que já estavam no cache ou já foram agendados não entram de novo
+        """
+
+        # os vídeos que outro vault já buscou vêm do store global e não são agendados
+        if not refresh:
+            missing = [i for i in video_ids if i not in self.submitted and not cache.get_video_from_cache(i, self.module.vault)]
+            self.module.import_known_videos(missing)
+
+        futures = {}
+        remote = []
+        for i in video_ids:
+            if i in self.submitted or (not refresh and cache.get_video_from_cache(i, self.module.vault)):
+                continue
+
+            future = Future()
+            self.submitted[i] = future
+            futures[i] = future
+
+            # um vídeo que já está sendo buscado (pela gui, por outro prefetcher) não é extraído
+            # de novo, só espera a busca em andamento. a deste prefetcher também entra
+            # no single-flight do módulo, e termina quando o lote dela for salvo
+            flight, leader = self.module.flights.join(('video', i))
+            if not leader:
+                flight.add_done_callback(lambda f, i=i, future=future: self._follow(i, future, f))
+                continue
+
+            with self.lock:
+                self.in_flight += 1
+                self.flights[i] = flight
+
+            if self.module.daemon is not None:
+                remote.append((i, future))
+            else:
+                self.executor.submit(self._fetch, i, future)
+
+        # o daemon já junta as escritas do cache, então cada lote é um pedido só
+        for start in range(0, len(remote), self.batch_size):
+            self.executor.submit(self._fetch_remote, remote[start:start + self.batch_size], refresh)
+
+        return futures
+
+    def _fetch_remote(self, videos: list[tuple[str, Future]], refresh: bool):
+        from .daemon import DaemonError
+
+        daemon = self.module.daemon
+
+        try:
+            if daemon is None:
+                raise DaemonError('o daemon foi desligado')
+            status = daemon.fetch(self.module.vault, [i for i, _ in videos], refresh)
+        except (OSError, DaemonError) as err:
+            # sem o daemon, os vídeos do lote são buscados por esse processo
+            if daemon is not None:
+                logger.error(f'o daemon não respondeu, buscando os vídeos sem ele: {err}')
+                self.module.daemon = None
+
+            for i, future in videos:
+                self._fetch(i, future)
+            return
+
+        for i, future in videos:
+            # o daemon já salvou o vídeo no videos.json, que é relido aqui
+            ok = status.get(i) != 'failed'
+            data = cache.get_video_from_cache(i, self.module.vault) if ok else None
+
+            with self.lock:
+                self._finish_flight(i, data)
+                self.in_flight -= 1
+                if self.in_flight == 0:
+                    self._flush()
+            self._resolve(i, future, data is not None)
+
+    def _extract(self, video_id: str) -> dict | None:
+        if self.pool is None:
+            return extract_video_info(build_youtube_url(video_id), self._get_ytdl())
+
+        # com o pool, a thread só espera o processo, que já devolve os dados normalizados
+        try:
+            return self.pool.extract(video_id)
+        except Exception as err:
+            logger.error(f'erro no worker ao extrair o vídeo {video_id}: {err}')
+            return None
+
+    def _fetch(self, video_id: str, future: Future):
+        raw = None
+        try:
+            raw = self._extract(video_id)
+
+            if raw and self.thumbnails:
+                # a thumbnail é um arquivo por vídeo, então pode ser baixada direto do worker
+                # uma thumbnail que falhar não impede os metadados de serem salvos
+                try:
+                    self.module.download_thumbnail(Video.normalize_ytdl_data(raw))
+                except Exception as err:
+                    logger.error(f'erro ao baixar a thumbnail do vídeo {video_id}: {err}')
+        except Exception as err:
+            logger.error(f'erro ao buscar o vídeo {video_id}: {err}')
+            raw = None
+        finally:
+            # com qualquer erro o vídeo ainda sai do single-flight e da contagem, senão
+            # quem espera por ele (e o close, e o último lote) ficaria esperando pra sempre
+            with self.lock:
+                if raw:
+                    self.pending.append((video_id, raw, future))
+                else:
+                    self._finish_flight(video_id)
+                self.in_flight -= 1
+
+                # o último vídeo em andamento também fecha o lote, senão os vídeos
+                # de um lote incompleto ficariam esperando até o close
+                if len(self.pending) >= self.batch_size or self.in_flight == 0:
+                    self._flush()
+
+            if not raw:
+                self._resolve(video_id, future, False)
+
+    def _flush(self):
+        # precisa ser chamado com o lock
+        if not self.pending:
+            return
+
+        batch = self.pending
+        self.pending = []
+
+        # um erro na escrita resolve o lote inteiro como falha, os futures não podem ficar pendentes
+        try:
+            stored = {v['id']: v for v in self.module.store_videos([raw for _, raw, _ in batch])}
+        except Exception as err:
+            logger.error(f'erro ao salvar {len(batch)} vídeos no cache: {err}')
+            stored = {}
+
+        for video_id, _, future in batch:
+            self._finish_flight(video_id, stored.get(video_id))
+            self._resolve(video_id, future, video_id in stored)
+
+    def _finish_flight(self, video_id: str, data: dict | None = None):
+        # precisa ser chamado com o lock
+        # quem esperava pelo single-flight recebe o mesmo que get_video retornaria
+        flight = self.flights.pop(video_id, None)
+        if flight is not None:
+            self.module.flights.finish(('video', video_id), flight, data)
+
+    def _follow(self, video_id: str, future: Future, flight: Future):
+        # a busca de outro chamador terminou, o vídeo foi salvo se ela retornou os dados
+        self._resolve(video_id, future, flight.exception() is None and bool(flight.result()))
+
+    def _resolve(self, video_id: str, future: Future, ok: bool):
+        future.set_result(ok)
+        if self.on_result is not None:
+            self.on_result(video_id, ok)
+
+    def flush(self):
+        """
+        salva no cache os vídeos extraídos que ainda estão esperando completar um lote
+        """
+
+        with self.lock:
+            self._flush()
+
+    def close(self):
+        """
+        espera todos os vídeos agendados terminarem e salva o último lote
+        """
+
+        self.executor.shutdown(wait=True)
+        self.flush()
+
+        # os vídeos que estavam sendo buscados por outro chamador não passam pelo executor
+        wait(list(self.submitted.values()))
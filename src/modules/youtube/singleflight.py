@@ -0,0 +1,127 @@
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+import threading
+
+
+class SingleFlight:
+    """
+    junta chamadas simultâneas pela mesma chave numa única execução
+
+    a primeira chamada de uma chave (a líder) executa a função, e as que chegarem
+    enquanto ela ainda está rodando só esperam o mesmo future e recebem o mesmo
+    resultado (ou a mesma exceção). quando a líder termina a chave é liberada,
+    então uma chamada depois disso executa de novo
+
+    no módulo do youtube as chaves são (tipo, id do vídeo), ex: ('video', id) e
+    ('thumbnail', id), pra que a gui, o prefetcher e a cli não façam a mesma
+    extração ou download ao mesmo tempo e depois disputem a escrita do cache
+
+    uso:
+        flights = SingleFlight()
+        data = flights.do(('video', video_id), fetch, video_id)
+        data = await flights.do_async(('video', video_id), fetch, video_id)
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls: dict[Hashable, Future] = {}
+
+        # tasks das execuções assíncronas, guardadas pra não serem coletadas no meio
+        self.tasks = set()
+
+    def join(self, key: Hashable) -> tuple[Future, bool]:
+        """
+        entra na chamada em andamento de uma chave, ou começa uma nova
+
+        returns:
+            o future compartilhado e se quem chamou é a líder
+            A LÍDER PRECISA CHAMAR finish, senão quem estiver esperando fica preso
+        """
+
+        with self.lock:
+            future = self.calls.get(key)
+            if future is not None:
+                return future, False
+
+            future = self.calls[key] = Future()
+            return future, True
+
+    def finish(self, key: Hashable, future: Future, result: Any = None, error: BaseException | None = None):
+        """
+        libera a chave e entrega o resultado pra todos que estão esperando
+        """
+
+        # a chave sai antes do resultado ser entregue, então quem for acordado
+        # e chamar de novo já começa uma execução nova em vez de pegar essa
+        with self.lock:
+            if self.calls.get(key) is future:
+                del self.calls[key]
+
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def in_flight(self, key: Hashable) -> Future | None:
+        """
+        retorna o future da chamada em andamento de uma chave, se houver
+        """
+
+        with self.lock:
+            return self.calls.get(key)
+
+    def _run(self, key: Hashable, future: Future, fn: Callable, args: tuple):
+        try:
+            result = fn(*args)
+        except BaseException as err:
+            self.finish(key, future, error=err)
+        else:
+            self.finish(key, future, result)
+
+    def do(self, key: Hashable, fn: Callable, *args) -> Any:
+        """
+        executa fn(*args) na thread atual, ou espera a execução em andamento da mesma chave
+
+        returns:
+            o resultado de fn, relança a exceção dela
+        """
+
+        future, leader = self.join(key)
+        if leader:
+            self._run(key, future, fn, args)
+
+        return future.result()
+
+    async def _run_async(self, key: Hashable, future: Future, fn: Callable, args: tuple):
+        try:
+            result = await fn(*args)
+        except BaseException as err:
+            self.finish(key, future, error=err)
+        else:
+            self.finish(key, future, result)
+
+    async def do_async(self, key: Hashable, fn: Callable, *args) -> Any:
+        """
+        versão pra corrotinas de do
+
+        se fn for uma corrotina, a líder roda ela numa task do loop. se for bloqueante,
+        roda no executor padrão do loop, e ninguém bloqueia o loop esperando.
+        as chamadas síncronas e assíncronas da mesma chave dividem o mesmo future
+
+        cancelar quem está esperando não cancela a execução, que pode ter outros esperando
+        """
+
+        # só quem usa a versão assíncrona paga a importação do asyncio
+        import asyncio
+        import inspect
+
+        future, leader = self.join(key)
+        if leader:
+            if inspect.iscoroutinefunction(fn):
+                task = asyncio.ensure_future(self._run_async(key, future, fn, args))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+            else:
+                asyncio.get_running_loop().run_in_executor(None, self._run, key, future, fn, args)
+
+        return await asyncio.shield(asyncio.wrap_future(future))
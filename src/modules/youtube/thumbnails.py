@@ -0,0 +1,206 @@
+from pathlib import Path
+import os
+import sqlite3
+import threading
+
+from ...managers.store import link_or_copy
+from ...utils.file_lock import file_lock
+from ... import logger
+
+
+# cada vídeo aponta pro hash da thumbnail dele, e o arquivo fica uma vez só por hash
+# (placeholders, vídeos reenviados e thumbnails padrão costumam ter os mesmos bytes)
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS thumbnails (
+    id TEXT PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS thumbnails_by_hash ON thumbnails (hash);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+'''
+
+
+class ThumbnailStore:
+    """
+    thumbnails de um vault guardadas pelo hash do conteúdo
+
+    os arquivos ficam em <directory>/<2 primeiros caracteres do hash>/<hash>.jpg
+    e o índice id do vídeo -> hash fica num sqlite ao lado. bytes iguais são salvos
+    uma vez só, e um arquivo é apagado quando nenhum vídeo aponta mais pra ele
+
+    o layout antigo (um <id do vídeo>.jpg por vídeo, direto no diretório) é migrado
+    na primeira vez que o store é aberto
+
+    vários processos (a gui, a cli, o daemon) usam o mesmo store. salvar um arquivo,
+    apontar um vídeo pra ele e apagar o que ficou sem vídeo acontecem com um lock de
+    arquivo no índice, senão um processo poderia apagar um arquivo que outro acabou
+    de reaproveitar, antes do vídeo do outro entrar no índice
+
+    args:
+        directory:
+            diretório das thumbnails dentro do cache do youtube
+
+        file:
+            arquivo sqlite do índice
+    """
+
+    def __init__(self, directory: Path, file: Path):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.file = file
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(file, check_same_thread=False, timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+        # id do vídeo -> hash, preenchido conforme as consultas
+        # uma rebuild de rows consulta uma thumbnail por entry, então a maioria não chega no sqlite
+        self.memo: dict[str, str] = {}
+
+        if not self._is_migrated():
+            self.migrate()
+
+    def blob_path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / f'{digest}.jpg'
+
+    def get(self, video_id: str) -> Path | None:
+        """
+        returns:
+            arquivo da thumbnail do vídeo, ou None se ela não estiver no cache
+        """
+
+        digest = self.memo.get(video_id)
+        if digest is not None:
+            blob = self.blob_path(digest)
+            if blob.is_file():
+                return blob
+
+        # sem o arquivo, o vídeo pode ter trocado de thumbnail em outro processo
+        with self.lock:
+            row = self.connection.execute('SELECT hash FROM thumbnails WHERE id = ?', (video_id,)).fetchone()
+        if row is None:
+            return None
+
+        digest = self.memo[video_id] = row[0]
+
+        # o arquivo pode ter sido apagado à mão, aí a thumbnail é baixada de novo
+        blob = self.blob_path(digest)
+        return blob if blob.is_file() else None
+
+    def put(self, video_id: str, content: bytes) -> Path:
+        """
+        salva a thumbnail de um vídeo, reaproveitando o arquivo se os mesmos bytes já existirem
+
+        returns:
+            arquivo da thumbnail
+        """
+
+        # só carregado quando uma thumbnail é salva, a gui abre sem precisar dele
+        import hashlib
+
+        digest = hashlib.sha256(content).hexdigest()
+        blob = self.blob_path(digest)
+
+        # os locks cobrem a escrita também, senão outra thread ou processo poderia apagar o mesmo
+        # arquivo (ao trocar a thumbnail do último vídeo que usava ele) antes dele entrar no índice
+        with self.lock, file_lock(self.file):
+            if not blob.is_file():
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                temp = blob.with_name(f'.{blob.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+                temp.write_bytes(content)
+                os.replace(temp, blob)
+
+            self._assign(video_id, digest)
+
+        return blob
+
+    def link(self, video_id: str, source: Path, digest: str) -> Path:
+        """
+        usa como thumbnail de um vídeo um arquivo que já tem o hash calculado
+        (ex: um blob do store global), com um hardlink quando possível
+
+        returns:
+            arquivo da thumbnail
+        """
+
+        blob = self.blob_path(digest)
+
+        with self.lock, file_lock(self.file):
+            if not (blob.is_file() and blob.samefile(source)):
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                link_or_copy(source, blob)
+
+            self._assign(video_id, digest)
+
+        return blob
+
+    def _assign(self, video_id: str, digest: str):
+        # precisa ser chamado com o lock e o file_lock do índice
+        with self.connection:
+            row = self.connection.execute('SELECT hash FROM thumbnails WHERE id = ?', (video_id,)).fetchone()
+            self.connection.execute('INSERT OR REPLACE INTO thumbnails VALUES (?, ?)', (video_id, digest))
+            self.memo[video_id] = digest
+
+            # a thumbnail antiga de um vídeo atualizado sai do disco se só ele usava ela
+            if row is not None and row[0] != digest:
+                self._release(row[0])
+
+    def _release(self, digest: str):
+        # precisa ser chamado dentro da transação do _assign, com o file_lock do índice:
+        # sem ele outro processo pode estar reaproveitando o arquivo sem ter escrito a linha ainda
+        used = self.connection.execute('SELECT 1 FROM thumbnails WHERE hash = ? LIMIT 1', (digest,)).fetchone()
+        if used is None:
+            self.blob_path(digest).unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        """
+        returns:
+            quantidade de vídeos com thumbnail, de arquivos e os bytes ocupados por eles
+        """
+
+        with self.lock:
+            videos, blobs = self.connection.execute('SELECT COUNT(*), COUNT(DISTINCT hash) FROM thumbnails').fetchone()
+
+        size = sum(b.stat().st_size for b in self.directory.glob('*/*.jpg'))
+        return {'videos': videos, 'blobs': blobs, 'bytes': size}
+
+    def _is_migrated(self) -> bool:
+        with self.lock:
+            return self.connection.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone() is not None
+
+    def migrate(self) -> int:
+        """
+        move as thumbnails do layout antigo (<id do vídeo>.jpg) pro layout por hash
+
+        pode ser interrompida e rodada de novo: cada arquivo antigo só é apagado
+        depois que o conteúdo dele já está no lugar novo e no índice
+
+        returns:
+            quantidade de thumbnails migradas
+        """
+
+        migrated = 0
+        for old in self.directory.glob('*.jpg'):
+            try:
+                content = old.read_bytes()
+            except FileNotFoundError:
+                # outro processo migrando ao mesmo tempo já pegou esse arquivo
+                continue
+
+            self.put(old.stem, content)
+            old.unlink(missing_ok=True)
+            migrated += 1
+
+        with self.lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('migrated', '1')")
+
+        if migrated:
+            logger.info(f'{migrated} thumbnails migradas pro layout por hash em {self.directory}')
+
+        return migrated
@@ -1,6 +1,18 @@
 from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+import re
 
-from numerize.numerize import numerize
+from ...utils.lazy import lazy_import
+
+numerize = lazy_import('numerize.numerize')
+
+# ids de vídeo do youtube sempre têm 11 caracteres desse alfabeto
+VIDEO_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{11}$')
+
+# ids de canal começam com UC e têm mais 22 caracteres
+CHANNEL_ID_PATTERN = re.compile(r'^UC[A-Za-z0-9_-]{22}$')
+
+YOUTUBE_HOSTS = {'youtube.com', 'www.youtube.com', 'm.youtube.com', 'music.youtube.com'}
 
 
 def build_youtube_url(video_id: str):
@@ -15,6 +27,89 @@ def build_youtube_url(video_id: str):
 
     return f'https://www.youtube.com/watch?v={video_id}'
 
+def extract_video_id(value: str) -> str | None:
+    """
+    extrai o id de um vídeo a partir de uma url do youtube, sem acessar a rede
+
+    aceita urls do tipo watch?v=, youtu.be/, shorts/, embed/ e live/,
+    além do próprio id sozinho
+
+    args:
+        value:
+            url ou id do vídeo
+
+    returns:
+        id do vídeo ou None se o valor não for reconhecido
+    """
+
+    value = value.strip()
+    if VIDEO_ID_PATTERN.match(value):
+        return value
+
+    url = urlparse(value if '://' in value else f'https://{value}')
+    host = url.netloc.lower()
+
+    candidate = None
+    if host == 'youtu.be':
+        candidate = url.path.strip('/').split('/')[0]
+    elif host in YOUTUBE_HOSTS:
+        parts = url.path.strip('/').split('/')
+        if parts[0] == 'watch':
+            candidate = parse_qs(url.query).get('v', [None])[0]
+        elif parts[0] in ('shorts', 'embed', 'live', 'v') and len(parts) > 1:
+            candidate = parts[1]
+
+    if candidate and VIDEO_ID_PATTERN.match(candidate):
+        return candidate
+
+def extract_playlist_id(value: str) -> str | None:
+    """
+    extrai o id de uma playlist a partir de uma url do youtube, sem acessar a rede
+    ex: https://www.youtube.com/playlist?list=PL... -> PL...
+
+    returns:
+        id da playlist ou None se a url não tiver uma
+    """
+
+    url = urlparse(value.strip() if '://' in value else f'https://{value.strip()}')
+    if url.netloc.lower() not in YOUTUBE_HOSTS | {'youtu.be'}:
+        return None
+
+    playlist_id = parse_qs(url.query).get('list', [None])[0]
+    if playlist_id and re.fullmatch(r'[A-Za-z0-9_-]+', playlist_id):
+        return playlist_id
+
+def build_playlist_url(playlist_id: str):
+    """
+    reconstrói a url de uma playlist a partir do id dela
+    """
+
+    return f'https://www.youtube.com/playlist?list={playlist_id}'
+
+def extract_channel_id(value: str) -> str | None:
+    """
+    extrai o id de um canal a partir de uma url do youtube, sem acessar a rede
+    ex: https://www.youtube.com/channel/UC... -> UC...
+
+    urls com o @ do canal não têm o id, então elas retornam None
+    e precisam ser resolvidas pelo yt-dlp
+
+    returns:
+        id do canal ou None se o valor não for reconhecido
+    """
+
+    value = value.strip()
+    if CHANNEL_ID_PATTERN.match(value):
+        return value
+
+    url = urlparse(value if '://' in value else f'https://{value}')
+    if url.netloc.lower() not in YOUTUBE_HOSTS:
+        return None
+
+    parts = url.path.strip('/').split('/')
+    if len(parts) > 1 and parts[0] == 'channel' and CHANNEL_ID_PATTERN.match(parts[1]):
+        return parts[1]
+
 def format_upload_date(upload_date: str):
     """
     formata a data de upload de um vídeo
@@ -52,7 +147,7 @@ def format_count(count: int):
     """
     
     # transforma 1.243 em 1K
-    return numerize(count, decimals=0)
+    return numerize.numerize(count, decimals=0)
 
 def format_duration(seconds: int):
     """
@@ -0,0 +1,75 @@
+from PyQt6.QtWidgets import QListWidgetItem, QWidget, QLabel, QVBoxLayout, QHBoxLayout
+from PyQt6.QtGui import QPixmap
+from PyQt6.QtCore import Qt
+
+
+class YouTubePresenter:
+    """
+    camada de apresentação do módulo do youtube
+
+    transforma as rows criadas por YouTubeModule.build_entry_row em widgets do qt
+    só a gui importa esse arquivo, o resto do módulo funciona sem o qt
+    """
+
+    def build_row_widget(self, row: dict, load_thumbnail: bool = True):
+        """
+        cria um widget de interface pra representar uma row de vídeo
+
+        esse método monta o layout com thumbnail + infos do vídeo
+        e retorna tanto o item da lista quanto o widget visual
+
+        args:
+            row:
+                dados de exibição criados por build_entry_row
+
+            load_thumbnail:
+                se for falso, a thumbnail não é decodificada agora
+                ela pode ser carregada depois com load_row_thumbnail
+
+        returns:
+            tupla (item, widget) usada na ui
+        """
+
+        layout = QHBoxLayout()
+        widget = QWidget()
+        widget.setLayout(layout)
+
+        # thumbnail
+        # o label fica guardado no widget pra que a imagem possa ser carregada depois
+        thumb_label = QLabel()
+        thumb_label.setFixedSize(120, 90)
+        widget.thumbnail_label = thumb_label
+        if load_thumbnail:
+            self.load_row_thumbnail(widget, row)
+        layout.addWidget(thumb_label)
+
+        right_layout = QVBoxLayout()
+        right_layout.addWidget(QLabel(row.get('title')))
+        meta_layout = QHBoxLayout()
+        meta_layout.addWidget(QLabel(row.get('uploader')))
+        meta_layout.addWidget(QLabel(row.get('view_count')))
+        meta_layout.addWidget(QLabel(row.get('upload_date')))
+        right_layout.addLayout(meta_layout)
+        layout.addLayout(right_layout)
+        layout.addStretch()
+
+        item = QListWidgetItem()
+        item.setData(Qt.ItemDataRole.UserRole, row.get('entry_id'))
+
+        # definir altura mínima pra não ficar invisível
+        widget.setMinimumHeight(40)
+        item.setSizeHint(widget.sizeHint())
+
+        return item, widget
+
+    def load_row_thumbnail(self, widget: QWidget, row: dict):
+        """
+        decodifica a thumbnail de uma row e coloca ela no widget criado por build_row_widget
+        """
+
+        thumbnail = row.get('thumbnail')
+        if not thumbnail:
+            return
+
+        pixmap = QPixmap(thumbnail)
+        widget.thumbnail_label.setPixmap(pixmap.scaled(120, 90, Qt.AspectRatioMode.KeepAspectRatio))
@@ -0,0 +1,110 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import replace
+from typing import Callable
+import multiprocessing
+import os
+
+from ...utils.throttle import scheduler
+from .api import extract_video_info, instance_ytdl, SETTINGS
+from .models import Video
+from .utils import build_youtube_url
+
+
+# instância do yt-dlp do processo worker, criada uma vez quando ele sobe
+# e reaproveitada em todas as extrações dele
+_ytdl = None
+
+def _init_worker(processes: int):
+    global _ytdl
+
+    # cada processo tem o próprio escalonador, então os limites do youtube.com
+    # são divididos entre eles pra que o total continue o mesmo
+    policy = scheduler.get('https://youtube.com').policy
+    scheduler.configure('youtube.com', replace(
+        policy,
+        rate=policy.rate / processes,
+        burst=max(1, policy.burst // processes),
+        max_concurrency=max(1, policy.max_concurrency // processes),
+        initial_concurrency=max(1, policy.initial_concurrency // processes)
+    ))
+
+    _ytdl = instance_ytdl(SETTINGS)
+
+def extract_normalized(video_id: str) -> dict | None:
+    """
+    extrai os dados de um vídeo dentro do worker e já normaliza eles
+
+    os dados brutos do yt-dlp têm centenas de campos (formatos, thumbnails, legendas),
+    então só o dicionário normalizado volta pro processo principal
+
+    returns:
+        dados normalizados do vídeo ou None se a extração falhar
+    """
+
+    raw = extract_video_info(build_youtube_url(video_id), _ytdl)
+    if not raw:
+        return None
+
+    return Video.normalize_ytdl_data(raw)
+
+
+class ExtractionPool:
+    """
+    extrai os dados dos vídeos em processos separados, em vez de threads
+
+    a extração do yt-dlp também gasta cpu (json, regex, o javascript do player),
+    e com threads tudo isso disputa o mesmo gil, ou seja, um núcleo só. cada worker
+    é um processo que fica vivo entre as extrações, com a própria instância do yt-dlp
+    já criada
+
+    os processos são criados com spawn, e não com fork, porque o processo principal
+    pode ter threads (a gui, o prefetcher) segurando locks no momento do fork
+
+    uso:
+        pool = ExtractionPool(4)
+        data = pool.extract(video_id) # dados já normalizados
+        pool.close()
+
+    args:
+        processes:
+            quantidade de processos, o padrão é um por núcleo
+
+        function:
+            função executada no worker pra cada id, precisa ser importável pelo nome
+            (o spawn não copia a memória do processo principal)
+    """
+
+    def __init__(self, processes: int | None = None, function: Callable[[str], dict | None] = extract_normalized):
+        self.processes = processes or os.cpu_count() or 1
+        self.function = function
+
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.processes,)
+        )
+
+    def submit(self, video_id: str) -> Future:
+        """
+        agenda a extração de um vídeo
+
+        returns:
+            future com os dados normalizados do vídeo, ou None se a extração falhar
+        """
+
+        return self.executor.submit(self.function, video_id)
+
+    def extract(self, video_id: str) -> dict | None:
+        """
+        extrai os dados de um vídeo e espera o resultado
+        """
+
+        return self.submit(video_id).result()
+
+    def close(self):
+        """
+        cancela o que ainda não começou e espera os workers terminarem
+        """
+
+        self.executor.shutdown(wait=True, cancel_futures=True)
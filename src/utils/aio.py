@@ -0,0 +1,117 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Coroutine
+import asyncio
+import threading
+
+
+class AsyncRuntime:
+    """
+    um loop do asyncio rodando numa thread própria, pra quem não é uma corrotina
+    (a gui, a cli, os workers) poder usar a api assíncrona dos modules
+
+    as requisições http dos modules rodam direto no loop, então milhares delas
+    podem estar em andamento ao mesmo tempo sem uma thread pra cada. o que só tem
+    versão bloqueante (ex: as extrações do yt-dlp) roda no executor padrão do loop,
+    que fica limitado a poucas threads
+
+    uso:
+        runtime = AsyncRuntime()
+        future = runtime.submit(module.resolve_many(urls)) # retorna na hora
+        results = runtime.run(module.resolve_many(urls)) # espera o resultado
+        runtime.close()
+
+    args:
+        max_workers:
+            threads do executor usado pelas chamadas bloqueantes
+    """
+
+    def __init__(self, max_workers: int = 8):
+        self.max_workers = max_workers
+
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.thread: threading.Thread | None = None
+        self.executor: ThreadPoolExecutor | None = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """
+        sobe a thread do loop, se ainda não estiver rodando
+        """
+
+        with self.lock:
+            if self.thread is not None:
+                return
+
+            self.loop = asyncio.new_event_loop()
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='async-blocking')
+            self.loop.set_default_executor(self.executor)
+
+            self.thread = threading.Thread(target=self._run_loop, name='async-loop', daemon=True)
+            self.thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Coroutine) -> Future:
+        """
+        agenda uma corrotina no loop, pode ser chamada de qualquer thread
+
+        returns:
+            future (do concurrent.futures) com o resultado da corrotina
+            cancelar ele cancela a corrotina
+        """
+
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: float | None = None) -> Any:
+        """
+        executa uma corrotina no loop e espera o resultado
+        NÃO PODE SER CHAMADA DE DENTRO DO PRÓPRIO LOOP, ele ficaria travado esperando a si mesmo
+        """
+
+        return self.submit(coro).result(timeout)
+
+    def close(self):
+        """
+        cancela o que ainda estiver rodando e para o loop e o executor
+        """
+
+        with self.lock:
+            if self.thread is None:
+                return
+
+            loop, thread, executor = self.loop, self.thread, self.executor
+            self.loop = self.thread = self.executor = None
+
+        async def shutdown():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await loop.shutdown_asyncgens()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+        # as chamadas bloqueantes em andamento não podem ser interrompidas, só não esperadas
+        executor.shutdown(wait=False, cancel_futures=True)
+
+_runtime: AsyncRuntime | None = None
+_runtime_lock = threading.Lock()
+
+def get_runtime() -> AsyncRuntime:
+    """
+    retorna o AsyncRuntime compartilhado pelo processo, criado no primeiro uso
+    """
+
+    global _runtime
+
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = AsyncRuntime()
+
+    return _runtime
@@ -0,0 +1,150 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # sem fcntl (windows) os locks não fazem nada, cada processo continua só com os próprios locks de thread
+    fcntl = None
+
+from .. import logger
+
+
+# segundos esperando um lock antes de desistir
+DEFAULT_TIMEOUT = 10
+
+# intervalo entre as tentativas enquanto o lock está com outro
+POLL_INTERVAL = 0.01
+
+
+class LockTimeout(TimeoutError):
+    """
+    levantada quando um lock continua com outro processo depois do timeout
+    quem chama deve desistir da operação, os dados no disco não foram alterados
+    """
+
+
+def get_lock_file(file: Path) -> Path:
+    """
+    retorna o arquivo de lock padrão de um arquivo, oculto e ao lado dele
+    """
+
+    return file.with_name(f'.{file.name}.lock')
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # o processo existe, só é de outro usuário
+        return True
+
+    return True
+
+def _read_holder(lock_file: Path) -> int | None:
+    try:
+        return int(lock_file.read_text().strip() or 0) or None
+    except (OSError, ValueError):
+        return None
+
+def _try_lock(lock_file: Path, exclusive: bool) -> int | None:
+    # abre o arquivo de lock e tenta travar ele sem esperar
+    # retorna o descritor travado ou None se outro processo estiver com ele
+    fd = os.open(lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+
+    try:
+        fcntl.flock(fd, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+
+    # o arquivo pode ter sido apagado (lock velho quebrado por outro processo) entre o open e o flock,
+    # aí o lock vale pra um arquivo que ninguém mais vê e a tentativa é refeita no arquivo novo
+    try:
+        same = os.path.samestat(os.fstat(fd), os.stat(lock_file))
+    except FileNotFoundError:
+        same = False
+
+    if not same:
+        os.close(fd)
+        return None
+
+    return fd
+
+@contextmanager
+def file_lock(file: Path, exclusive: bool = True, timeout: float = DEFAULT_TIMEOUT, lock_file: Path | None = None) -> Iterator[None]:
+    """
+    lock entre processos (fcntl.flock) em volta de um ciclo de leitura e escrita de um arquivo
+
+    os locks são consultivos: só valem entre quem também usa file_lock no mesmo arquivo.
+    ficam num arquivo separado porque o json_io troca o arquivo de dados com os.replace
+    a cada escrita, e um lock no arquivo antigo não seria visto por quem abre o novo
+
+    vários leitores (exclusive=False) podem segurar o lock juntos, um escritor segura sozinho.
+    o lock também separa threads do mesmo processo, mas não é reentrante: a mesma thread
+    pedindo o mesmo lock duas vezes espera até o timeout
+
+    o kernel solta o lock quando o processo que tem ele morre. o que sobra é um filho que
+    herdou o descritor (um fork) segurando o lock depois do pai morrer; o escritor salva
+    o pid no arquivo de lock, e se esse processo não existe mais o lock é considerado velho
+    e quebrado depois do timeout
+
+    args:
+        file:
+            arquivo protegido
+
+        exclusive:
+            True pra escrita, False pra leitura
+
+        timeout:
+            segundos esperando o lock antes de levantar LockTimeout
+
+        lock_file:
+            opcional. arquivo de lock, o padrão é um .<nome>.lock ao lado de file
+    """
+
+    if fcntl is None:
+        yield
+        return
+
+    lock_file = lock_file or get_lock_file(file)
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+
+    deadline = time.monotonic() + timeout
+    broken = False
+
+    while True:
+        fd = _try_lock(lock_file, exclusive)
+        if fd is not None:
+            break
+
+        if time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        holder = _read_holder(lock_file)
+        if broken or holder is None or _is_alive(holder):
+            raise LockTimeout(f'{file} continua travado depois de {timeout}s (pid {holder})')
+
+        # quem segura o lock é um descritor herdado de um processo que já morreu:
+        # o arquivo é apagado e o lock passa a ser o de um arquivo novo
+        logger.info(f'{file} lock velho do processo {holder} quebrado')
+        lock_file.unlink(missing_ok=True)
+        broken = True
+        deadline = time.monotonic() + timeout
+
+    try:
+        if exclusive:
+            os.ftruncate(fd, 0)
+            os.write(fd, str(os.getpid()).encode())
+
+        yield
+    finally:
+        if exclusive:
+            os.ftruncate(fd, 0)
+
+        os.close(fd)
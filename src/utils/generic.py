@@ -1,11 +1,20 @@
 from pathlib import Path
 from datetime import datetime
 import random
+import re
 import string
+import unicodedata
 
 from .. import logger
 
 
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# máximo de variáveis de uma query do sqlite, as consultas em lote são divididas nele
+# (o limite das versões antigas é 999, a folga cobre os outros parâmetros da query)
+SQLITE_MAX_VARIABLES = 900
+
+
 def ensure_directory(directory: Path):
     """
     garante que um diretório exista no sistema de arquivos
@@ -47,6 +56,24 @@ def get_iso_datetime():
     # yyyy-mm-ddThh:mm:ss. o timespec é pra não incluir microsegundos
     return datetime.now().isoformat(timespec='seconds')
 
+def format_total_duration(seconds: int):
+    """
+    formata uma duração longa, tipo o tempo total de uma collection
+    ex: 45300 -> '12h 35m', 300 -> '5m'
+
+    args:
+        seconds:
+            duração em segundos
+    """
+
+    hours, seconds = divmod(int(seconds), 3600)
+    minutes = seconds // 60
+
+    if not hours:
+        return f'{minutes}m'
+
+    return f'{hours}h {minutes}m'
+
 def generate_random_id(id_length: int = 16):
     """
     gera um id usando todas as letras, numeros e alguns caracteres especiais
@@ -61,14 +88,9 @@ def generate_random_id(id_length: int = 16):
     # underscore (_) e hífen (-)
     characters = string.ascii_letters + string.digits + '-' + '_'
 
-    # criar um id, atribuindo um índice aleatório do grupo de caracteres
+    # criar um id, sorteando um caractere do grupo pra cada posição
     # até que o comprimento total do id seja preenchido
-    final_id: str = ''
-    for i in range(id_length):
-        final_id += random.choice(characters)
-
-    logger.debug('novo id gerado: ' + final_id)
-    return final_id
+    return ''.join(random.choices(characters, k=id_length))
 
 def normalize_json_file(path: Path | str):
     """
@@ -93,4 +115,36 @@ def normalize_json_file(path: Path | str):
     if isinstance(path, Path):
         normalized = Path(normalized)
 
-    return normalized
\ No newline at end of file
+    return normalized
+
+def normalize_text(text: str):
+    """
+    normaliza um texto pra comparações de busca
+    passa pra casefold e remove os acentos (ex: 'Ação' -> 'acao')
+
+    args:
+        text:
+            texto original
+    """
+
+    text = text.casefold()
+
+    # texto só com ascii não tem acento nenhum pra remover
+    if text.isascii():
+        return text
+
+    # o nfkd separa as letras dos acentos, que viram caracteres combinantes
+    # e aí podem ser descartados
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+def tokenize_text(text: str) -> list[str]:
+    """
+    divide um texto em tokens normalizados (palavras sem acento e em casefold)
+
+    args:
+        text:
+            texto original
+    """
+
+    return TOKEN_PATTERN.findall(normalize_text(text))
@@ -1,8 +1,79 @@
+from contextlib import contextmanager
 from pathlib import Path
+from typing import IO, Iterator
+import io
 import json
+import os
+import threading
 
+from .file_lock import file_lock, LockTimeout
+from .lazy import lazy_import
 from .. import logger
 
+# só carregados quando um arquivo comprimido é lido ou escrito
+gzip = lazy_import('gzip')
+zstandard = lazy_import('zstandard')
+
+
+# formatos de compressão aceitos. 'plain' é o json em texto puro
+CODECS = ('plain', 'gzip', 'zstd')
+
+# um arquivo com uma dessas extensões é sempre escrito no formato dela
+EXTENSIONS = {'.gz': 'gzip', '.zst': 'zstd'}
+
+# os primeiros bytes de cada formato, então a leitura não depende do nome do arquivo
+# (uma collection comprimida continua sendo um .json)
+MAGIC = {b'\x1f\x8b': 'gzip', b'\x28\xb5\x2f\xfd': 'zstd'}
+
+# níveis de compressão: os dois ficam perto do melhor custo-benefício pra json
+# (ver benchmarks/json_compression.py)
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def detect_codec(file: Path) -> str | None:
+    """
+    retorna o formato de um arquivo pelos primeiros bytes dele
+
+    returns:
+        'plain', 'gzip', 'zstd' ou None se o arquivo não existir
+    """
+
+    try:
+        with file.open('rb') as f:
+            head = f.read(4)
+    except FileNotFoundError:
+        return None
+
+    for magic, codec in MAGIC.items():
+        if head.startswith(magic):
+            return codec
+
+    return 'plain'
+
+@contextmanager
+def _open_text(file: Path, mode: str, codec: str) -> Iterator[IO[str]]:
+    # abre o arquivo como texto, comprimindo ou descomprimindo conforme ele é lido ou escrito
+    # os bytes comprimidos nunca ficam inteiros na memória, só o que o json já consumiu ou produziu
+    if codec == 'plain':
+        with file.open(mode, encoding='utf-8') as f:
+            yield f
+        return
+
+    if codec == 'gzip':
+        with gzip.open(file, mode + 't', encoding='utf-8', compresslevel=GZIP_LEVEL) as f:
+            yield f
+        return
+
+    with file.open(mode + 'b') as raw:
+        if mode == 'r':
+            stream = zstandard.ZstdDecompressor().stream_reader(raw)
+        else:
+            stream = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw)
+
+        with io.TextIOWrapper(stream, encoding='utf-8') as f:
+            yield f
+
 def read_json(file: Path) -> dict:
     """
     lê um arquivo json e retorna seu conteúdo como dicionário
@@ -20,7 +91,7 @@ def read_json(file: Path) -> dict:
         return {}
 
     try:
-        with file.open('r', encoding='utf-8') as f:
+        with _open_text(file, 'r', detect_codec(file)) as f:
             return json.load(f)
     except json.decoder.JSONDecodeError:
         logger.info(f'{file} provavelmente estava vazio. um objeto vazio foi criado')
@@ -29,7 +100,30 @@ def read_json(file: Path) -> dict:
         logger.error(f'{file} erro ao ler o arquivo. um objeto vazio foi criado')
         return {}
 
-def write_json(file: Path, data: dict):
+def read_json_locked(file: Path, lock_file: Path | None = None) -> dict:
+    """
+    lê um arquivo json com o lock compartilhado dele (ver file_lock)
+    espera o escritor que estiver no meio de um ciclo de leitura e escrita terminar
+
+    se o lock não sair até o timeout o arquivo é lido assim mesmo: o write_json troca o
+    arquivo de uma vez, então ele nunca está pela metade, só pode não ter a escrita em andamento
+
+    args:
+        file:
+            caminho do arquivo json a ser lido
+
+        lock_file:
+            opcional. arquivo de lock, o mesmo usado por quem escreve
+    """
+
+    try:
+        with file_lock(file, exclusive=False, lock_file=lock_file):
+            return read_json(file)
+    except LockTimeout as err:
+        logger.info(f'{err}, lido sem o lock')
+        return read_json(file)
+
+def write_json(file: Path, data: dict, compression: str | None = None) -> bool:
     """
     escreve um dicionário em um arquivo json
     sobrescreve o conteúdo do arquivo caso ele já exista
@@ -40,10 +134,36 @@ def write_json(file: Path, data: dict):
 
         data:
             dicionário que pra ser serializado em json
+
+        compression:
+            opcional. 'plain', 'gzip' ou 'zstd'. sem ele, vale o formato da extensão
+            (.gz, .zst) e depois o formato atual do arquivo, então um arquivo
+            comprimido continua comprimido. um arquivo novo é texto puro
+
+    returns:
+        True se o arquivo foi escrito, False se a escrita falhou (o arquivo antigo fica como estava)
     """
 
+    codec = compression or EXTENSIONS.get(file.suffix) or detect_codec(file) or 'plain'
+    if codec not in CODECS:
+        logger.error(f'{file} formato de compressão desconhecido: {codec}')
+        return False
+
+    # escreve num arquivo temporário e troca de uma vez, então quem lê ao mesmo tempo
+    # (outra thread, outro processo) vê o arquivo antigo inteiro ou o novo inteiro, nunca a metade
+    temp = file.with_name(f'.{file.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+
     try:
-        with file.open('w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+        with _open_text(temp, 'w', codec) as f:
+            # o texto puro continua legível à mão, o comprimido não precisa do espaço da indentação
+            if codec == 'plain':
+                json.dump(data, f, indent=4, ensure_ascii=False)
+            else:
+                json.dump(data, f, separators=(',', ':'), ensure_ascii=False)
+        os.replace(temp, file)
     except Exception as err:
-        logger.error(f'{file} erro ao escrever o arquivo')
\ No newline at end of file
+        temp.unlink(missing_ok=True)
+        logger.error(f'{file} erro ao escrever o arquivo')
+        return False
+
+    return True
\ No newline at end of file
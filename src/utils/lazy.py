@@ -0,0 +1,56 @@
+import importlib
+import sys
+from types import ModuleType
+
+
+class LazyModule(ModuleType):
+    """
+    módulo que só é importado de verdade no primeiro acesso a um atributo
+
+    serve pra dependências pesadas (yt-dlp, requests, rich) que só são usadas
+    em caminhos específicos, tipo quando um vídeo não está no cache.
+    enquanto nenhum atributo for acessado, o módulo real nem entra no sys.modules
+
+    args:
+        name:
+            nome completo do módulo (ex: 'yt_dlp', 'rich.console')
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__['_module']
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__['_module'] = module
+
+        return module
+
+    def __getattr__(self, attr: str):
+        # só é chamado pra atributos que não existem no proxy
+        # ou seja, tudo que pertence ao módulo real
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    retorna o módulo se ele já foi importado, ou um LazyModule que importa ele no primeiro uso
+
+    uso:
+        yt_dlp = lazy_import('yt_dlp')
+        yt_dlp.YoutubeDL(...) # o import acontece aqui
+
+    args:
+        name:
+            nome completo do módulo
+    """
+
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    return LazyModule(name)
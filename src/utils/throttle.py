@@ -0,0 +1,471 @@
+from contextlib import contextmanager, asynccontextmanager
+from dataclasses import dataclass
+from urllib.parse import urlparse
+import ipaddress
+import threading
+import time
+
+from .. import logger
+
+
+class CircuitOpenError(Exception):
+    """
+    levantada quando um host está com o circuito aberto (falhou demais seguidas)
+    a requisição nem chega a ser feita, quem chama deve tentar de novo mais tarde
+    """
+
+
+@dataclass
+class HostPolicy:
+    """
+    limites de um host
+
+    args:
+        rate:
+            requisições por segundo, em média
+
+        burst:
+            requisições que podem sair de uma vez depois de um tempo parado
+
+        min_concurrency / max_concurrency:
+            faixa em que a concorrência se ajusta sozinha
+
+        initial_concurrency:
+            concorrência no começo, antes de qualquer resposta
+
+        failure_threshold:
+            falhas seguidas que abrem o circuito
+
+        cooldown:
+            segundos com o circuito aberto na primeira vez, dobra a cada reabertura
+    """
+
+    rate: float = 20
+    burst: int = 20
+    min_concurrency: int = 1
+    max_concurrency: int = 16
+    initial_concurrency: int = 4
+    failure_threshold: int = 5
+    cooldown: float = 30
+    max_cooldown: float = 10 * 60
+
+
+class TokenBucket:
+    """
+    limita a taxa média de requisições, permitindo rajadas curtas de até burst
+
+    args:
+        rate:
+            tokens repostos por segundo
+
+        burst:
+            quantidade máxima de tokens acumulados
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """
+        consome um token se tiver um disponível
+
+        returns:
+            0 se o token foi consumido, senão os segundos até o próximo ser reposto
+        """
+
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """
+        consome um token, esperando ele ser reposto se o balde estiver vazio
+        """
+
+        while (wait := self.reserve()) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """
+        versão pra corrotinas de acquire, espera sem bloquear o loop
+        """
+
+        import asyncio
+
+        while (wait := self.reserve()) > 0:
+            await asyncio.sleep(wait)
+
+    def slow_down(self, rate: float):
+        """
+        reduz a taxa e esvazia o balde
+        """
+
+        with self.lock:
+            self._refill()
+            self.rate = rate
+            self.tokens = min(self.tokens, 0)
+
+class Slot:
+    """
+    uma requisição em andamento num host, entregue por HostLimiter.slot
+
+    quem faz a requisição marca o resultado com throttled ou failed
+    se nada for marcado, a requisição conta como bem sucedida
+    uma requisição cancelada (só nas corrotinas) só devolve a vaga, sem ajustar nada
+    """
+
+    def __init__(self):
+        self.outcome = 'ok'
+
+    def throttled(self):
+        # o servidor pediu pra diminuir o ritmo (ex: 429)
+        self.outcome = 'throttled'
+
+    def failed(self):
+        # erro de rede ou do servidor (ex: 5xx, timeout)
+        self.outcome = 'error'
+
+    def cancelled(self):
+        self.outcome = 'cancelled'
+
+class HostLimiter:
+    """
+    controla as requisições de saída pra um host
+
+    junta três mecanismos:
+        - um token bucket, que limita a taxa média
+        - concorrência adaptativa (aimd): cada resposta saudável soma 1/limite no
+          limite de requisições simultâneas (≈ +1 por rodada), e um 429, um erro ou
+          um pico de latência multiplica ele por um fator < 1. um 429 também reduz
+          a taxa do bucket, que volta aos poucos até a da política
+        - um circuit breaker: depois de várias falhas seguidas o host fica um tempo
+          sem receber requisições, e depois só uma de teste passa antes de liberar o resto
+
+    args:
+        host:
+            nome do host, só usado nos logs
+
+        policy:
+            limites do host
+    """
+
+    # fatores da redução multiplicativa
+    THROTTLED_FACTOR = 0.5
+    ERROR_FACTOR = 0.75
+    LATENCY_FACTOR = 0.9
+
+    # a taxa também se ajusta: volta RATE_STEP da taxa máxima por resposta saudável
+    # e nunca cai abaixo de MIN_RATE_RATIO dela
+    RATE_STEP = 0.002
+    MIN_RATE_RATIO = 0.05
+
+    # uma resposta mais lenta do que LATENCY_SPIKE vezes a média conta como congestionamento
+    LATENCY_SPIKE = 3.0
+    LATENCY_ALPHA = 0.1
+    LATENCY_WARMUP = 10
+
+    def __init__(self, host: str, policy: HostPolicy):
+        self.host = host
+        self.policy = policy
+
+        self.bucket = TokenBucket(policy.rate, policy.burst)
+
+        self.condition = threading.Condition()
+        self.limit = float(policy.initial_concurrency)
+        self.in_flight = 0
+
+        # média móvel da latência das respostas saudáveis
+        self.latency = None
+        self.samples = 0
+        self.last_decrease = 0.0
+
+        # circuit breaker
+        self.failures = 0
+        self.open_until = 0.0
+        self.cooldown = policy.cooldown
+        self.probing = False
+
+        # futures das corrotinas esperando uma vaga, na ordem de chegada
+        # são o equivalente do condition.wait pra quem não pode bloquear a thread
+        self.async_waiters: list = []
+
+    def _check_circuit(self):
+        # precisa ser chamado com a condition
+        now = time.monotonic()
+        if now < self.open_until:
+            raise CircuitOpenError(f'{self.host} bloqueado por mais {self.open_until - now:.0f} s depois de falhas seguidas')
+
+        # depois do cooldown (meio aberto), só uma requisição de teste passa por vez
+        if self.failures >= self.policy.failure_threshold and self.probing:
+            raise CircuitOpenError(f'{self.host} aguardando a requisição de teste')
+
+    def acquire(self):
+        """
+        espera uma vaga no limite de concorrência e um token da taxa
+
+        levanta CircuitOpenError se o circuito do host estiver aberto
+        """
+
+        with self.condition:
+            while not self._try_enter():
+                self.condition.wait()
+
+        self.bucket.acquire()
+
+    async def acquire_async(self):
+        """
+        versão pra corrotinas de acquire, espera a vaga e o token sem bloquear o loop
+        """
+
+        while True:
+            with self.condition:
+                if self._try_enter():
+                    break
+
+                waiter = _create_waiter()
+                self.async_waiters.append(waiter)
+
+            await waiter
+
+        try:
+            await self.bucket.acquire_async()
+        except BaseException:
+            # cancelada esperando o token, a vaga volta sem contar como resposta
+            self.release('cancelled', 0)
+            raise
+
+    def _try_enter(self) -> bool:
+        # precisa ser chamado com a condition
+        self._check_circuit()
+        if self.in_flight >= int(self.limit):
+            return False
+
+        if self.failures >= self.policy.failure_threshold:
+            self.probing = True
+        self.in_flight += 1
+
+        return True
+
+    def _wake_async_waiters(self):
+        # precisa ser chamado com a condition
+        # com o circuito aberto todas acordam pra levantar o erro, senão só as que cabem no limite
+        if self.failures >= self.policy.failure_threshold:
+            count = len(self.async_waiters)
+        else:
+            count = max(0, int(self.limit) - self.in_flight)
+
+        while count > 0 and self.async_waiters:
+            waiter = self.async_waiters.pop(0)
+            if not waiter.done():
+                waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+                count -= 1
+
+    def _decrease(self, factor: float, rate: bool = False):
+        # precisa ser chamado com a condition
+        # várias respostas ruins da mesma rodada contam como uma redução só
+        now = time.monotonic()
+        if now - self.last_decrease < (self.latency or 0):
+            return
+
+        self.limit = max(self.policy.min_concurrency, self.limit * factor)
+        self.last_decrease = now
+
+        # um 429 pode ser por taxa e não por concorrência, então a taxa também cai
+        # e os tokens acumulados são descartados, senão a próxima rajada repetiria o 429
+        if rate:
+            self.bucket.slow_down(max(self.policy.rate * self.MIN_RATE_RATIO, self.bucket.rate * factor))
+
+    def release(self, outcome: str, latency: float):
+        """
+        devolve a vaga e ajusta o limite e o circuito pelo resultado da requisição
+
+        args:
+            outcome:
+                'ok', 'throttled' ou 'error'
+
+            latency:
+                duração da requisição em segundos
+        """
+
+        with self.condition:
+            self.in_flight -= 1
+
+            if outcome == 'cancelled':
+                pass
+            elif outcome == 'ok':
+                if self.failures >= self.policy.failure_threshold:
+                    logger.info(f'{self.host} respondeu de novo, circuito fechado')
+                self.failures = 0
+                self.cooldown = self.policy.cooldown
+                self.probing = False
+
+                spike = (
+                    self.samples >= self.LATENCY_WARMUP
+                    and latency > self.latency * self.LATENCY_SPIKE
+                )
+                if spike:
+                    self._decrease(self.LATENCY_FACTOR)
+                else:
+                    self.limit = min(self.policy.max_concurrency, self.limit + 1 / self.limit)
+                    self.bucket.rate = min(self.policy.rate, self.bucket.rate + self.policy.rate * self.RATE_STEP)
+
+                    self.samples += 1
+                    self.latency = latency if self.latency is None else (
+                        self.latency + self.LATENCY_ALPHA * (latency - self.latency)
+                    )
+            else:
+                if outcome == 'throttled':
+                    self._decrease(self.THROTTLED_FACTOR, rate=True)
+                else:
+                    self._decrease(self.ERROR_FACTOR)
+                self.failures += 1
+                self.probing = False
+
+                if self.failures >= self.policy.failure_threshold:
+                    self.open_until = time.monotonic() + self.cooldown
+                    logger.warning(f'{self.host} falhou {self.failures} vezes seguidas, pausado por {self.cooldown:.0f} s')
+                    self.cooldown = min(self.policy.max_cooldown, self.cooldown * 2)
+
+            self.condition.notify_all()
+            self._wake_async_waiters()
+
+    @contextmanager
+    def slot(self):
+        """
+        reserva uma vaga pra uma requisição
+
+        uso:
+            with limiter.slot() as slot:
+                response = ...
+                if response.status_code == 429:
+                    slot.throttled()
+
+        uma exceção dentro do bloco conta como erro e é relançada
+        """
+
+        self.acquire()
+
+        slot = Slot()
+        start = time.monotonic()
+        try:
+            yield slot
+        except BaseException:
+            slot.failed()
+            raise
+        finally:
+            self.release(slot.outcome, time.monotonic() - start)
+
+    @asynccontextmanager
+    async def slot_async(self):
+        """
+        versão pra corrotinas de slot
+
+        uso:
+            async with limiter.slot_async() as slot:
+                ...
+        """
+
+        await self.acquire_async()
+
+        slot = Slot()
+        start = time.monotonic()
+        try:
+            yield slot
+        except Exception:
+            slot.failed()
+            raise
+        except BaseException:
+            # o cancelamento (CancelledError) não é culpa do host
+            slot.cancelled()
+            raise
+        finally:
+            self.release(slot.outcome, time.monotonic() - start)
+
+def _create_waiter():
+    # future do loop que está rodando, o asyncio só é importado por quem usa corrotinas
+    import asyncio
+
+    return asyncio.get_running_loop().create_future()
+
+def _wake(waiter):
+    # roda no loop dono do future
+    if not waiter.done():
+        waiter.set_result(None)
+
+class OutboundScheduler:
+    """
+    um HostLimiter por host, compartilhado por todo o processo
+
+    os hosts são agrupados pelo domínio (ex: i.ytimg.com e i9.ytimg.com são o mesmo),
+    então todos os subdomínios de um serviço dividem os mesmos limites
+    """
+
+    def __init__(self, default: HostPolicy | None = None):
+        self.default = default or HostPolicy()
+        self.policies: dict[str, HostPolicy] = {}
+        self.limiters: dict[str, HostLimiter] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def host_key(url: str) -> str:
+        if not url:
+            raise ValueError('url vazia, sem host pra agendar')
+
+        host = (urlparse(url).hostname or url).lower()
+
+        # ips e nomes sem domínio (ex: localhost) não têm subdomínios pra agrupar
+        try:
+            ipaddress.ip_address(host)
+            return host
+        except ValueError:
+            return '.'.join(host.split('.')[-2:])
+
+    def configure(self, host: str, policy: HostPolicy):
+        """
+        define os limites de um host, deve ser chamado antes das requisições pra ele
+        """
+
+        with self.lock:
+            key = self.host_key(f'https://{host}')
+            self.policies[key] = policy
+            self.limiters.pop(key, None)
+
+    def get(self, url: str) -> HostLimiter:
+        key = self.host_key(url)
+
+        with self.lock:
+            limiter = self.limiters.get(key)
+            if limiter is None:
+                limiter = self.limiters[key] = HostLimiter(key, self.policies.get(key, self.default))
+
+        return limiter
+
+    def slot(self, url: str):
+        """
+        reserva uma vaga pra uma requisição pra url, ver HostLimiter.slot
+        """
+
+        return self.get(url).slot()
+
+    def slot_async(self, url: str):
+        """
+        versão pra corrotinas de slot, ver HostLimiter.slot_async
+        """
+
+        return self.get(url).slot_async()
+
+# escalonador usado por todas as requisições de saída do app
+scheduler = OutboundScheduler()